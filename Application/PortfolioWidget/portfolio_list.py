@@ -1,6 +1,7 @@
 from PyQt6.QtWidgets import QTreeView, QMessageBox
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QFont, QStandardItemModel, QStandardItem
+from Infrastructure.Utilities.portfolio_repository import PortfolioRepository, DEFAULT_PORTFOLIO
 
 
 class StandardItem(QStandardItem):
@@ -17,12 +18,14 @@ class StandardItem(QStandardItem):
         Starting date of the ptf.
     curr : `str`
         Starting currency of the ptf.
+    ptf_id : `int`, optional
+        Id of the ptf in the portfolio repository.
     font_size : `int`, optional
         Font size of the label.
     set_bold : `bool`, optional
         Sets label text to bold if set to True.
     """
-    def __init__(self, name='', cash=0.0, date='', curr='USD', font_size=10, set_bold=False):
+    def __init__(self, name='', cash=0.0, date='', curr='USD', ptf_id=None, font_size=10, set_bold=False):
         super().__init__()
         fnt = QFont('Calibri', font_size)
         fnt.setBold(set_bold)
@@ -33,22 +36,38 @@ class StandardItem(QStandardItem):
         self.setData(cash, Qt.ItemDataRole.UserRole+1)
         self.setData(date, Qt.ItemDataRole.UserRole+2)
         self.setData(curr, Qt.ItemDataRole.UserRole+3)
+        self.setData(ptf_id, Qt.ItemDataRole.UserRole+4)
 
 
 class PortfolioList(QTreeView):
     """
-    This class defines portfolio list widget using QTreeView object.
+    This class defines portfolio list widget using QTreeView object. The portfolios are read from the portfolio
+    repository, which only holds the main portfolio on first start. Only their definitions are read, the trades of a
+    portfolio are loaded when it is opened.
+
+    Parameters
+    ----------
+    repository : `PortfolioRepository`, optional
+        Store of the portfolios. Defaults to the one in the directory configured in settings.
     """
-    def __init__(self):
+    def __init__(self, repository=None):
         QTreeView.__init__(self, None)
         self.setHeaderHidden(True)
         self.treeModel = QStandardItemModel()
         self.rootNode = self.treeModel.invisibleRootItem()
 
+        self.repository = repository if repository is not None else PortfolioRepository()
+        portfolios = self.repository.portfolios()
+        if not portfolios:
+            self.repository.add_portfolio(**DEFAULT_PORTFOLIO)
+            portfolios = self.repository.portfolios()
+
         self.portfolio_list = StandardItem('Portfolio List', set_bold=True)
-        portfolio_one = StandardItem('Main Portfolio', cash=100000.0, date='2022-01-01', curr='USD')
+        for portfolio in portfolios:
+            self.portfolio_list.appendRow(StandardItem(portfolio['name'], cash=portfolio['cash'],
+                                                       date=portfolio['start_date'], curr=portfolio['currency'],
+                                                       ptf_id=portfolio['id']))
 
-        self.portfolio_list.appendRow(portfolio_one)
         self.rootNode.appendRow(self.portfolio_list)
         self.setModel(self.treeModel)
         self.expandAll()
@@ -82,7 +101,7 @@ class PortfolioList(QTreeView):
 
     def add_portfolio(self, name, cash, date, currency):
         """
-        This method is used to add a new portfolio item to the portfolio list.
+        This method is used to add a new portfolio to the portfolio repository and the portfolio list.
 
         Parameters
         ----------
@@ -95,13 +114,14 @@ class PortfolioList(QTreeView):
         currency : `str`
             Currency of the portfolio. Default is USD.
         """
-        portfolio_item = StandardItem(name, cash, date, currency, 10)
+        ptf_id = self.repository.add_portfolio(name, cash, date, currency)
+        portfolio_item = StandardItem(name, cash, date, currency, ptf_id, 10)
         self.portfolio_list.appendRow(portfolio_item)
 
     def delete_portfolio(self):
         """
-        This method is used to delete portfolio from the QTreeView. Method doesn't produce anything if no item is
-        selected, otherwise dialog box is produced to validate deletion.
+        This method is used to delete portfolio from the QTreeView and the portfolio repository. Method doesn't
+        produce anything if no item is selected, otherwise dialog box is produced to validate deletion.
         """
         index = self.currentIndex()
         selection = index.row()
@@ -116,6 +136,8 @@ class PortfolioList(QTreeView):
                     QMessageBox.information(self, "Warning!", "Cannot delete the main portfolio!")
                 else:
                     self._deleted_ptf = self.portfolio_list.child(selection).text()
+                    self.repository.delete_portfolio(self.portfolio_list.child(selection).data(
+                        Qt.ItemDataRole.UserRole+4))
                     index.model().removeRow(selection, index.parent())
 
     def list_portfolios(self):
@@ -146,6 +168,7 @@ class PortfolioList(QTreeView):
         data_dict = {"Ptf_Name": val.data(Qt.ItemDataRole.UserRole),
                      "Ptf_Cash": val.data(Qt.ItemDataRole.UserRole+1),
                      "Ptf_Start": val.data(Qt.ItemDataRole.UserRole+2),
-                     "Ptf_Curr": val.data(Qt.ItemDataRole.UserRole+3)}
+                     "Ptf_Curr": val.data(Qt.ItemDataRole.UserRole+3),
+                     "Ptf_Id": val.data(Qt.ItemDataRole.UserRole+4)}
 
         print(data_dict)
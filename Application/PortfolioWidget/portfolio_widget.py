@@ -2,17 +2,40 @@ import numpy as np
 import pandas as pd
 from PyQt6.QtWidgets import QMainWindow, QScrollArea, QWidget, QTableView, QHBoxLayout, QVBoxLayout, QGroupBox, \
     QHeaderView, QMessageBox, QLabel, QComboBox, QPushButton, QTabWidget, QSpinBox
-from PyQt6.QtCore import QItemSelectionModel
-from Infrastructure.portfolio_constructor import PortfolioConstructor, yf
+from PyQt6.QtCore import QItemSelectionModel, QThreadPool
+from Infrastructure.statistics_engine import StatisticsEngine
 from Infrastructure.Utilities.business_day_check import BDay
-from Application.WidgetTemplates.pandas_table_model import PandasModel
+from Infrastructure.Utilities.trade_files import read_trades, write_trades, file_columns
+from Application.PortfolioWidget.portfolio_worker import PortfolioWorker
+from Application.WidgetTemplates.pandas_table_model import PandasModel, percent_format, integer_format
 from Application.WidgetTemplates.chart_custom import ChartWidget
+from Application.WidgetTemplates.derived_series import DerivedSeries
 from datetime import date
-yf.pdr_override()
 
 
 class PortfolioWidget(QMainWindow):
-    def __init__(self, portfolio_name, starting_balance, starting_date, portfolio_currency):
+    """
+    Window of a portfolio with its statistics tables, charts, positions and transactions. A portfolio stored in the
+    portfolio repository loads its trades when it is opened, writes every trade edit back and shows the time series
+    of its last computation until it is loaded again.
+
+    Parameters
+    ----------
+    portfolio_name : `str`
+        Name of the portfolio.
+    starting_balance : `float`
+        Starting balance of the portfolio.
+    starting_date : `str`
+        Starting date of the portfolio.
+    portfolio_currency : `str`
+        Currency of the portfolio.
+    repository : `PortfolioRepository`, optional
+        Store of the portfolio. Trades are only kept in memory without it.
+    portfolio_id : `int`, optional
+        Id of the portfolio in the repository.
+    """
+    def __init__(self, portfolio_name, starting_balance, starting_date, portfolio_currency, repository=None,
+                 portfolio_id=None):
         super().__init__()
         self.ptf_name = portfolio_name
         self.ptf_cash = starting_balance
@@ -20,6 +43,12 @@ class PortfolioWidget(QMainWindow):
         self.ptf_curr = portfolio_currency
         self.setObjectName(self.ptf_name)
 
+        # Portfolio repository, trades version of the stored trades and of the trades of the running computation
+        self.repository = repository if portfolio_id is not None else None
+        self.portfolio_id = portfolio_id
+        self.trades_version = None
+        self.computed_version = None
+
         # Portfolio metrics table placeholders
         self.prop_table = None
         self.prop_model = None
@@ -35,6 +64,10 @@ class PortfolioWidget(QMainWindow):
                               'R-Squared', 'Up Capture', 'Down Capture', 'Batting Ratio']
         self.prop2_dataframe = pd.DataFrame(self.prop2_data, columns=self.prop2_headers)
 
+        # Statistics tables are numeric, percentages and durations are formatted by their models
+        self.statistics_formatters = {metric: percent_format for metric in StatisticsEngine.percent_metrics}
+        self.statistics_formatters.update({metric: integer_format for metric in StatisticsEngine.integer_metrics})
+
         # Returns  metrics table placeholders
         self.distribution_metrics_table = None
         self.distribution_metrics_model = None
@@ -86,7 +119,12 @@ class PortfolioWidget(QMainWindow):
 
         # Placeholder for the returns series, benchmark series, first transaction date and the chart
         self.returns_series = None
+        self.derived_series = None
         self.first_transaction = None
+        # Key of the derived series of this widget, released when it is destroyed. A portfolio reopened under the
+        # same name gets a new key, and the slot must not hold on to the widget.
+        self.series_key = series_key = object()
+        self.destroyed.connect(lambda: DerivedSeries.release(series_key))
         self.source_combo = None
         self.rolling_spinbox = None
         self.equity_chart = ChartWidget()
@@ -96,8 +134,19 @@ class PortfolioWidget(QMainWindow):
         self.monthly_returns_chart = ChartWidget()
         self.rolling_volatility_chart = ChartWidget()
         self.rolling_beta_chart = ChartWidget()
-        
+
+        # Portfolio computations run on the thread pool, only the latest job updates the widget
+        self.thread_pool = QThreadPool.globalInstance()
+        self.worker = None
+        self.benchmark = None
+
+        # Constructor of the last load and date of the earliest trade edited since, for incremental reloads
+        self.constructor = None
+        self.edit_date = None
+
         self.main_layout()
+        if self.repository is not None:
+            self.load_stored_portfolio()
 
     def chart_layout(self):
         source_options_box = QGroupBox()
@@ -186,7 +235,7 @@ class PortfolioWidget(QMainWindow):
         self.prop2_table = QTableView()
         self.prop2_table.verticalHeader().setVisible(False)
         self.prop2_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.prop2_model = PandasModel(self.prop2_dataframe)
+        self.prop2_model = PandasModel(self.prop2_dataframe, self.statistics_formatters)
         self.prop2_table.setModel(self.prop2_model)
 
         portfolio_properties_group = QGroupBox("Portfolio Metrics")
@@ -201,7 +250,7 @@ class PortfolioWidget(QMainWindow):
     def returns_distribution_metrics_table(self):
         self.distribution_metrics_table = QTableView()
         self.distribution_metrics_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.distribution_metrics_model = PandasModel(self.distribution_metrics_dataframe)
+        self.distribution_metrics_model = PandasModel(self.distribution_metrics_dataframe, self.statistics_formatters)
         self.distribution_metrics_table.setModel(self.distribution_metrics_model)
 
         returns_distribution_metrics_group = QGroupBox("Returns Metrics")
@@ -214,7 +263,7 @@ class PortfolioWidget(QMainWindow):
     def performance_distribution_metrics_table(self):
         self.performance_metrics_table = QTableView()
         self.performance_metrics_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.performance_metrics_model = PandasModel(self.performance_metrics_dataframe)
+        self.performance_metrics_model = PandasModel(self.performance_metrics_dataframe, self.statistics_formatters)
         self.performance_metrics_table.setModel(self.performance_metrics_model)
 
         performance_distribution_metrics_group = QGroupBox("Performance Metrics")
@@ -227,7 +276,7 @@ class PortfolioWidget(QMainWindow):
     def risk_distribution_metrics_table(self):
         self.risk_metrics_table = QTableView()
         self.risk_metrics_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.risk_metrics_model = PandasModel(self.risk_metrics_dataframe)
+        self.risk_metrics_model = PandasModel(self.risk_metrics_dataframe, self.statistics_formatters)
         self.risk_metrics_table.setModel(self.risk_metrics_model)
 
         risk_distribution_metrics_group = QGroupBox("Risk Metrics")
@@ -288,67 +337,193 @@ class PortfolioWidget(QMainWindow):
 
     def update_positions_table(self, as_of_date, benchmark):
         """
-        Updates positions table with the calculated position information from the transaction data. Also constructs
-        benchmark timeseries from the selected benchmark and portfolio start date.
+        Starts computing the positions, statistics and benchmark timeseries from the transaction data in the
+        background. The tables and charts are updated in on_update_finished once the job is done. A job that is
+        still running for this portfolio is cancelled.
         """
         trades = self.trans_model.dataframe
         if trades.empty:
             QMessageBox.information(self, "Message", "Portfolio has no trades!")
         else:
-            try:
-                self.first_transaction = trades['Date'].min() - BDay(1)
-                self.first_transaction = pd.to_datetime(self.first_transaction.date())
-                constructor = PortfolioConstructor(self.first_transaction, self.ptf_cash, self.ptf_name, self.ptf_curr)
-                constructor.construct_portfolio_history(trades, as_of_date)
-
-                # Construct returns series to be used for various metrics and plotting
-                self.returns_series = constructor.construct_returns_dataframe(benchmark, as_of_date)
-
-                self.pos_model.dataframe = constructor.holdings
-                self.prop_dataframe.loc[0, "Balance"] = constructor.portfolio.cash
-                self.prop_dataframe.loc[0, "Total MV"] = constructor.portfolio.total_market_value
-                self.prop_dataframe.loc[0, "Total Equity"] = constructor.portfolio.total_equity
-                self.prop_dataframe.loc[0, "Total UPL"] = constructor.portfolio.total_unrealised_pnl
-                self.prop_dataframe.loc[0, "Total RPL"] = constructor.portfolio.total_realised_pnl
-                self.prop_dataframe.loc[0, "Total PnL"] = constructor.portfolio.total_pnl
-                self.prop_model.dataframe = self.prop_dataframe
-
-                self.prop2_dataframe = constructor.construct_additional_statistics(self.returns_series["Ptf Returns"],
-                                                                                   self.returns_series["Bmk Returns"])
-                self.prop2_model.dataframe = self.prop2_dataframe
-
-                # Update returns distribution metrics table
-                self.distribution_metrics_dataframe = constructor.construct_statistics(
-                    self.returns_series["Ptf Returns"],
-                    self.returns_series["Bmk Returns"],
-                    metrics="returns")
-
-                self.distribution_metrics_model.dataframe = self.distribution_metrics_dataframe
-
-                # Update performance distribution metrics table
-                self.performance_metrics_dataframe = constructor.construct_statistics(
-                    self.returns_series["Ptf Returns"],
-                    self.returns_series["Bmk Returns"],
-                    metrics="performance")
-
-                self.performance_metrics_model.dataframe = self.performance_metrics_dataframe
-
-                # Update risk distribution metrics table
-                self.risk_metrics_dataframe = constructor.construct_statistics(self.returns_series["Ptf Returns"],
-                                                                               self.returns_series["Bmk Returns"],
-                                                                               metrics="risk")
-                self.risk_metrics_model.dataframe = self.risk_metrics_dataframe
-
-                # Update portfolio series, benchmark series, first transaction and plot
-
-                ChartWidget.returns_series = self.returns_series
-                ChartWidget.portfolio_label = self.ptf_name
-                ChartWidget.benchmark_label = benchmark
-                self.update_plots(start_date=self.first_transaction, source=self.source_combo.currentText(),
-                                  rolling_period=self.rolling_spinbox.value())
+            self.cancel_update()
+            self.benchmark = benchmark
+            self.computed_version = self.trades_version
+            # The worker owns the constructor while it runs, it is handed back with the result
+            self.worker = PortfolioWorker(trades.copy(), as_of_date, benchmark, self.ptf_cash, self.ptf_name,
+                                          self.ptf_curr, constructor=self.constructor, edit_date=self.edit_date)
+            self.constructor = None
+            self.edit_date = None
+            self.worker.signals.progress.connect(
+                lambda percent, message, job=self.worker: self.on_update_progress(job, percent, message))
+            self.worker.signals.finished.connect(lambda result, job=self.worker: self.on_update_finished(job, result))
+            self.worker.signals.error.connect(lambda message, job=self.worker: self.on_update_error(job, message))
+            self.thread_pool.start(self.worker)
+
+    def cancel_update(self):
+        """
+        Cancels the running portfolio computation, if any. Called when a new computation is started or the as of
+        date changes.
+        """
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker = None
+            self.show_status(f"{self.ptf_name}: portfolio computation cancelled.")
+
+    def show_status(self, message, repaint=False):
+        """
+        Shows a message in the status bar of the main window. With repaint, the status bar is repainted straight
+        away, for progress reported while the event loop is blocked.
+        """
+        main_window = self.window()
+        if isinstance(main_window, QMainWindow):
+            main_window.statusBar().showMessage(message)
+            if repaint:
+                main_window.statusBar().repaint()
+
+    def on_update_progress(self, job, percent, message):
+        if job is self.worker:
+            self.show_status(f"{message} ({percent}%)")
+
+    def on_update_error(self, job, message):
+        if job is self.worker:
+            self.worker = None
+            self.show_status('Ready')
+            QMessageBox.information(self, f"Error!", f"Error computing portfolio: {message}")
+
+    def on_update_finished(self, job, result):
+        """
+        Hands the computed dataframes to the table models and redraws the charts. Runs on the GUI thread. Results of
+        a job that has been cancelled or superseded are dropped.
+
+        Parameters
+        ----------
+        job : `PortfolioWorker`
+            Job that produced the result.
+        result : `dict`
+            Dataframes computed by the job.
+        """
+        if job is not self.worker:
+            return
+        self.worker = None
+        self.apply_result(result, self.benchmark)
+
+    def apply_result(self, result, benchmark):
+        """
+        Updates the tables and charts with a computed portfolio. Also used by the main window to hand over results
+        of a multi-portfolio load.
+
+        Parameters
+        ----------
+        result : `dict`
+            Dataframes computed by compute_portfolio.
+        benchmark : `str`
+            Name of the benchmark.
+        """
+        try:
+            constructor = result['constructor']
+            self.constructor = constructor
+            self.first_transaction = result['first_transaction']
+            self.returns_series = result['returns_series']
+
+            self.pos_model.dataframe = constructor.holdings
+            self.prop_dataframe.loc[0, "Balance"] = constructor.portfolio.cash
+            self.prop_dataframe.loc[0, "Total MV"] = constructor.portfolio.total_market_value
+            self.prop_dataframe.loc[0, "Total Equity"] = constructor.portfolio.total_equity
+            self.prop_dataframe.loc[0, "Total UPL"] = constructor.portfolio.total_unrealised_pnl
+            self.prop_dataframe.loc[0, "Total RPL"] = constructor.portfolio.total_realised_pnl
+            self.prop_dataframe.loc[0, "Total PnL"] = constructor.portfolio.total_pnl
+            self.prop_model.dataframe = self.prop_dataframe
+
+            self.prop2_dataframe = result['additional_statistics']
+            self.prop2_model.dataframe = self.prop2_dataframe
+
+            self.distribution_metrics_dataframe = result['returns_statistics']
+            self.distribution_metrics_model.dataframe = self.distribution_metrics_dataframe
+
+            self.performance_metrics_dataframe = result['performance_statistics']
+            self.performance_metrics_model.dataframe = self.performance_metrics_dataframe
+
+            self.risk_metrics_dataframe = result['risk_statistics']
+            self.risk_metrics_model.dataframe = self.risk_metrics_dataframe
+
+            # Update portfolio series, benchmark series, first transaction and plot
+            self.plot_returns_series(benchmark)
+            self.show_status('Ready')
+
+        except Exception as exception:
+            QMessageBox.information(self, f"Error!", f"Error computing portfolio: {exception}")
+            return
+
+        if self.repository is not None and self.computed_version is not None:
+            timeseries = self.returns_series.join(
+                constructor.portfolio_timeseries.set_index('Date').drop(columns='Total Equity'))
+            self.repository.save_timeseries(self.portfolio_id, timeseries, benchmark, self.computed_version)
+
+    def plot_returns_series(self, benchmark):
+        """
+        Hands the returns series to the charts, the series derived from the previous one are dropped.
 
-            except Exception as exception:
-                QMessageBox.information(self, f"Error!", f"Error computing portfolio: {exception}")
+        Parameters
+        ----------
+        benchmark : `str`
+            Name of the benchmark.
+        """
+        if self.derived_series is not None:
+            self.derived_series.invalidate()
+        self.derived_series = DerivedSeries(self.returns_series, portfolio=self.series_key)
+        self.benchmark = benchmark
+        for chart in (self.equity_chart, self.performance_chart, self.drawdown_chart,
+                      self.returns_distribution_chart, self.monthly_returns_chart, self.rolling_volatility_chart,
+                      self.rolling_beta_chart):
+            chart.set_series(self.derived_series, self.ptf_name, benchmark)
+        self.update_plots(start_date=self.first_transaction, source=self.source_combo.currentText(),
+                          rolling_period=self.rolling_spinbox.value())
+
+    def load_stored_portfolio(self):
+        """
+        Loads the trades of the portfolio from the portfolio repository. If the time series of the last computation
+        is stored and the trades have not changed since, the totals and charts are shown from it without computing
+        the portfolio. The statistics tables are filled on the next load.
+        """
+        self.trades_version = self.repository.trades_version(self.portfolio_id)
+        trades = self.repository.load_trades(self.portfolio_id)
+        if not trades.empty:
+            self.trans_model.dataframe = trades
+
+        stored = self.repository.load_timeseries(self.portfolio_id)
+        if stored is None:
+            return
+
+        timeseries, benchmark = stored
+        self.returns_series = timeseries
+        self.first_transaction = timeseries.index[0]
+
+        last = timeseries.iloc[-1]
+        self.prop_dataframe.loc[0, "Balance"] = last['Total Equity'] - last['Total Market Value']
+        self.prop_dataframe.loc[0, "Total MV"] = last['Total Market Value']
+        self.prop_dataframe.loc[0, "Total Equity"] = last['Total Equity']
+        self.prop_dataframe.loc[0, "Total UPL"] = last['Total UPL']
+        self.prop_dataframe.loc[0, "Total RPL"] = last['Total RPL']
+        self.prop_dataframe.loc[0, "Total PnL"] = last['Total PNL']
+        self.prop_model.dataframe = self.prop_dataframe
+        self.plot_returns_series(benchmark)
+
+    def store_trades(self, new_trades=None):
+        """
+        Writes the trades to the portfolio repository, if the portfolio is stored.
+
+        Parameters
+        ----------
+        new_trades : `list`, optional
+            Lists of trade data appended to the stored trades. The stored trades are replaced by the trade table
+            when omitted.
+        """
+        if self.repository is None:
+            return
+        if new_trades is None:
+            self.trades_version = self.repository.save_trades(self.portfolio_id, self.trans_model.dataframe)
+        else:
+            self.trades_version = self.repository.append_trades(self.portfolio_id, new_trades)
 
     def insert_transaction_row(self, new_transaction_data):
         """
@@ -360,52 +535,83 @@ class PortfolioWidget(QMainWindow):
             List containing new trade data. Must contain data corresponding to trade table headers.
         """
         self.trans_model.insertRows(self.trans_model.rowCount(), 1, new_data=new_transaction_data)
+        self.record_edit(new_transaction_data[3])
+        self.store_trades([new_transaction_data])
+
+    def record_edit(self, trade_date):
+        """
+        Keeps track of the earliest inserted or deleted trade since the last load, the next load only replays the
+        portfolio history from that date.
+
+        Parameters
+        ----------
+        trade_date : `pd.Timestamp`
+            Date of the edited trade.
+        """
+        trade_date = pd.Timestamp(trade_date)
+        self.edit_date = trade_date if self.edit_date is None else min(self.edit_date, trade_date)
 
     def delete_transaction_row(self):
         """
-        This method deletes selected trade from the transaction data list. Designed to do nothing if no row in the
+        This method deletes selected trades from the transaction data list. Designed to do nothing if no row in the
         trade table is selected. 
         """
         index = self.trans_table.selectionModel().selectedIndexes()
         if index:
             confirm = QMessageBox.question(self, "Confirm Delete Trade Request",
-                                           "Delete selected trade from the transactions list?",
+                                           "Delete selected trades from the transactions list?",
                                            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
             if confirm == QMessageBox.StandardButton.Yes:
-                self.trans_model.removeRows(index[0].row(), 1)
+                rows = sorted({selected.row() for selected in index})
+                self.record_edit(self.trans_model.dataframe['Date'].iloc[rows].min())
+                self.trans_model.remove_rows(rows)
+                self.store_trades()
                 self.trans_table.selectionModel().select(self.trans_table.selectionModel().selection(),
                                                          QItemSelectionModel.SelectionFlag.Deselect)
 
     def import_trade_file_dataframe(self, file):
         """
-        Imports trade file. Must be in .csv format and contain headers corresponding to trade table headers.
+        Imports trade file. Must be a .csv, .parquet or Arrow (.arrow, .feather) file and contain headers
+        corresponding to trade table headers. The file is read in chunks, the progress is shown in the status bar.
 
         Parameters
         ----------
         file : `str`
             Name of the trade file. Passed from MainWindow instance.
         """
-        df = pd.read_csv(file)
-        if all(header in df.columns for header in self.trans_headers):
-            try:
-                df["Date"] = pd.to_datetime(df["Date"], format="%Y-%m-%d %H:%M:%S", dayfirst=True)
-            except ValueError:
-                df["Date"] = pd.to_datetime(df["Date"], format="%Y-%m-%d", dayfirst=True)
-            self.trans_model.dataframe = df
-        else:
-            QMessageBox.information(self, "Error!", "Imported file headers do not match transaction table headers!")
+        try:
+            if not all(header in file_columns(file) for header in self.trans_headers):
+                QMessageBox.information(self, "Error!",
+                                        "Imported file headers do not match transaction table headers!")
+                return
+
+            df = read_trades(file, columns=self.trans_headers, progress=lambda rows, percent: self.show_status(
+                f"Importing trades: {rows:,} rows ({percent}%)", repaint=True))
+        except (ImportError, ValueError) as error:
+            # ImportError if pyarrow, needed for Parquet and Arrow files, is not installed
+            self.show_status('Ready')
+            QMessageBox.information(self, "Error!", f"Error importing trade file: {error}")
+            return
+
+        self.trans_model.dataframe = df
+        # A new trade list is always rebuilt from scratch
+        self.constructor = None
+        self.edit_date = None
+        self.store_trades()
+        self.show_status(f"Imported {len(df.index):,} trades.")
 
     def export_trade_file_dataframe(self, file_name):
         """
-        Export file containing current transaction data.
+        Export file containing current transaction data. Files named .parquet, .arrow or .feather are written in
+        that columnar format, any other file as CSV.
 
         Parameters
         ----------
         file_name : `str`
-            Name of the trade file to be exported. Name should contain .csv extension.
+            Name of the trade file to be exported. Name should contain .csv, .parquet, .arrow or .feather extension.
         """
         df = self.trans_model.dataframe
-        df.to_csv(file_name, index=False)
+        write_trades(df, file_name)
 
     def plot_inception_to_date(self):
         """
@@ -439,13 +645,23 @@ class PortfolioWidget(QMainWindow):
                 self.plot_inception_to_date()
 
     def update_plots(self, start_date, source, rolling_period):
-        self.equity_chart.plot_metric(start_date=start_date, source=source, metric="Equity")
-        self.performance_chart.plot_metric(start_date=start_date, source=source, metric="Performance")
-        self.drawdown_chart.plot_metric(start_date=start_date, source=source, metric="Drawdown")
-        self.returns_distribution_chart.plot_returns_distribution(start_date=start_date, source=source)
-        self.monthly_returns_chart.plot_monthly_returns(source=source)
-        self.rolling_volatility_chart.plot_rolling_volatility(source=source, rolling_period=rolling_period)
-        self.rolling_beta_chart.plot_rolling_beta(rolling_period=rolling_period)
+        """
+        Requests every chart. Only the chart of the visible tab is drawn straight away, the others when their tab is
+        selected, and charts whose arguments and data did not change, e.g. the heatmap when only the date range
+        changed, are not redrawn.
+        """
+        self.equity_chart.request_plot(self.equity_chart.plot_metric, start_date=start_date, source=source,
+                                       metric="Equity")
+        self.performance_chart.request_plot(self.performance_chart.plot_metric, start_date=start_date, source=source,
+                                            metric="Performance")
+        self.drawdown_chart.request_plot(self.drawdown_chart.plot_metric, start_date=start_date, source=source,
+                                         metric="Drawdown")
+        self.returns_distribution_chart.request_plot(self.returns_distribution_chart.plot_returns_distribution,
+                                                     start_date=start_date, source=source)
+        self.monthly_returns_chart.request_plot(self.monthly_returns_chart.plot_monthly_returns, source=source)
+        self.rolling_volatility_chart.request_plot(self.rolling_volatility_chart.plot_rolling_volatility,
+                                                   source=source, rolling_period=rolling_period)
+        self.rolling_beta_chart.request_plot(self.rolling_beta_chart.plot_rolling_beta, rolling_period=rolling_period)
 
     def statistics_layout(self):
         horizontal_layout = QHBoxLayout()
@@ -0,0 +1,172 @@
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+from Infrastructure.portfolio_batch import compute_portfolio, compute_portfolios
+
+
+class PortfolioJobCancelled(Exception):
+    """Raised inside a worker when its job has been cancelled."""
+
+
+class PortfolioWorkerSignals(QObject):
+    """
+    Signals of a PortfolioWorker. QRunnable is not a QObject, so the signals live on this helper, which is created on
+    the GUI thread. Signals emitted from the pool thread are therefore queued and their slots run on the GUI thread.
+    """
+    progress = pyqtSignal(int, str)
+    finished = pyqtSignal(object)
+    error = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+
+class PortfolioWorker(QRunnable):
+    """
+    Runs the portfolio pipeline (price download, history, returns and statistics) on a QThreadPool thread so the GUI
+    stays responsive. The worker only computes dataframes, the models and charts are updated by the slots connected
+    to its finished signal.
+
+    Cancellation is cooperative: the job stops at the next stage boundary after cancel() has been called and emits
+    cancelled instead of finished.
+
+    Parameters
+    ----------
+    trades : `pd.DataFrame`
+        Transactions of the portfolio. Should be a copy, the worker must not share it with the GUI thread.
+    as_of_date : `pd.Timestamp`
+        Calculation date.
+    benchmark : `str`
+        Name of the benchmark.
+    ptf_cash : `float`
+        Starting balance of the portfolio.
+    ptf_name : `str`
+        Name of the portfolio.
+    ptf_curr : `str`
+        Currency of the portfolio.
+    constructor : `PortfolioConstructor`, optional
+        Constructor of the previous computation, updated incrementally. The worker takes ownership of it.
+    edit_date : `pd.Timestamp`, optional
+        Date of the earliest trade edited since the previous computation.
+    """
+    def __init__(self, trades, as_of_date, benchmark, ptf_cash, ptf_name, ptf_curr, constructor=None,
+                 edit_date=None):
+        super().__init__()
+        # The widget keeps a reference to the job, so Python owns it rather than the pool
+        self.setAutoDelete(False)
+        self.trades = trades
+        self.as_of_date = as_of_date
+        self.benchmark = benchmark
+        self.ptf_cash = ptf_cash
+        self.ptf_name = ptf_name
+        self.ptf_curr = ptf_curr
+        self.constructor = constructor
+        self.edit_date = edit_date
+        self.signals = PortfolioWorkerSignals()
+        self._cancelled = False
+
+    @property
+    def is_cancelled(self):
+        return self._cancelled
+
+    def cancel(self):
+        """
+        Requests the job to stop. Safe to call from the GUI thread while the job is running.
+        """
+        self._cancelled = True
+
+    def report(self, percent, message):
+        """
+        Emits progress and stops the job if it has been cancelled in the meantime.
+
+        Parameters
+        ----------
+        percent : `int`
+            Completed share of the job.
+        message : `str`
+            Description of the current stage.
+        """
+        if self._cancelled:
+            raise PortfolioJobCancelled()
+        self.signals.progress.emit(percent, message)
+
+    def run(self):
+        try:
+            result = self.compute()
+            if self._cancelled:
+                raise PortfolioJobCancelled()
+        except PortfolioJobCancelled:
+            self.signals.cancelled.emit()
+        except Exception as exception:
+            self.signals.error.emit(str(exception))
+        else:
+            self.signals.finished.emit(result)
+
+    def compute(self):
+        """
+        Computes the portfolio.
+
+        Returns
+        -------
+        `dict`
+            Portfolio constructor, first transaction date, returns series and the statistics dataframes.
+        """
+        return compute_portfolio(self.trades, self.as_of_date, self.benchmark, self.ptf_cash, self.ptf_name,
+                                 self.ptf_curr, progress=self.report, constructor=self.constructor,
+                                 edit_date=self.edit_date)
+
+
+class PortfolioBatchWorkerSignals(QObject):
+    """
+    Signals of a PortfolioBatchWorker. Results and errors carry the name of the portfolio they belong to.
+    """
+    progress = pyqtSignal(int, str)
+    result = pyqtSignal(str, object)
+    error = pyqtSignal(str, str)
+    finished = pyqtSignal()
+
+
+class PortfolioBatchWorker(QRunnable):
+    """
+    Computes several portfolios at the same as of date. Prices are fetched once for all of them and the portfolios
+    are built concurrently on a process pool, see compute_portfolios. Each result is emitted as soon as its portfolio
+    is done. Cancelling stops emitting results and drops the portfolios that have not started yet.
+
+    Parameters
+    ----------
+    portfolios : `list`
+        Dicts with the 'trades', 'ptf_cash', 'ptf_name' and 'ptf_curr' of every portfolio.
+    as_of_date : `pd.Timestamp`
+        Calculation date.
+    benchmark : `str`
+        Name of the benchmark.
+    """
+    def __init__(self, portfolios, as_of_date, benchmark):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.portfolios = portfolios
+        self.as_of_date = as_of_date
+        self.benchmark = benchmark
+        self.signals = PortfolioBatchWorkerSignals()
+        self._cancelled = False
+
+    @property
+    def is_cancelled(self):
+        return self._cancelled
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        total = len(self.portfolios)
+        try:
+            self.signals.progress.emit(0, f"Fetching prices for {total} portfolios...")
+            jobs = compute_portfolios(self.portfolios, self.as_of_date, self.benchmark)
+            for done, (ptf_name, result) in enumerate(jobs, start=1):
+                if self._cancelled:
+                    jobs.close()
+                    break
+                if isinstance(result, Exception):
+                    self.signals.error.emit(ptf_name, str(result))
+                else:
+                    self.signals.result.emit(ptf_name, result)
+                self.signals.progress.emit(int(100 * done / total), f"Loaded {done} of {total} portfolios...")
+        except Exception as exception:
+            self.signals.error.emit('', str(exception))
+        self.signals.finished.emit()
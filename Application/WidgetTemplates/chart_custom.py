@@ -1,82 +1,218 @@
+import numpy as np
 from PyQt6 import QtWidgets
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg, NavigationToolbar2QT
-from matplotlib.figure import Figure
-from matplotlib import cm
-import matplotlib.dates as mdates
-import matplotlib
-from matplotlib.ticker import PercentFormatter
-import matplotlib.pyplot as plt
-import quantstats as qs
-import seaborn as sns
-
-from qbstyles import mpl_style
-mpl_style(dark=True)
-
-matplotlib.use('QtAgg')
-# plt.style.use('dark_background')
-plt.rcParams['axes.facecolor'] = '#101012'
-plt.rcParams['figure.facecolor'] = '#202124'  # #e4e7eb #202124 8ab4f7 161719
-
-
-class NavigationToolbar(QtWidgets.QWidget):
-    def __init__(self, canvas, parent=None):
-        super(NavigationToolbar, self).__init__(parent)
-        self.canvas = canvas
-        layout = QtWidgets.QHBoxLayout()
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.setSpacing(0)
-        self.toolbar = NavigationToolbar2QT(self.canvas, self)
-        self.toolbar.setStyleSheet("background-color: transparent;")
-        layout.addWidget(self.toolbar)
-        self.setLayout(layout)
-
-
-class MplCanvas(FigureCanvasQTAgg):
-    def __init__(self, width=6, height=4, dpi=100):
-        fig = Figure(figsize=(width, height), dpi=dpi)
-        self.ax = fig.add_subplot(111)
-        self.ax.xaxis.grid(linestyle=':')
-        self.ax.yaxis.grid(linestyle=':')
-        super(MplCanvas, self).__init__(fig)
+
+from Infrastructure.Utilities.downsampling import downsample
 
 
 class ChartWidget(QtWidgets.QWidget):
+    """
+    Matplotlib chart of the returns series. Redraws requested through request_plot are deferred until the chart is
+    shown and skipped when neither the plot, its arguments nor the plotted data changed, so charts hidden in other
+    tabs cost nothing and changing the date range leaves the charts that do not depend on it alone.
+
+    Line charts keep their Line2D artists while the same lines are plotted and only replace their data. The plotted
+    series are read from the DerivedSeries of the portfolio, shared with its other charts.
 
-    # Class variables for plotting data on the chart widget canvas object (MplCanvas).
-    start_date = None
-    returns_series = None
-    portfolio_label = None
-    benchmark_label = None
+    Lines and drawdown areas only get the points that can be told apart on screen: the minimum and maximum of the
+    points falling in each pixel column of the visible date range. They are reduced again whenever the chart is
+    zoomed or panned, so long histories stay interactive and zooming in still shows every point.
+    """
 
     def __init__(self):
         super().__init__()
 
-        self.canvas = MplCanvas()
-        self.toolbar = NavigationToolbar(self.canvas, self)
-        self.toolbar.setContentsMargins(50, 0, 50, 0)
-
-        layout = QtWidgets.QVBoxLayout()
-        layout.addWidget(self.canvas)
-        layout.addWidget(self.toolbar)
-        self.setLayout(layout)
+        # Data plotted on the chart widget canvas object (MplCanvas), set by set_series
+        self.start_date = None
+        self.series = None
+        self.portfolio_label = None
+        self.benchmark_label = None
+
+        self._canvas = None
+        self.toolbar = None
+        self.setLayout(QtWidgets.QVBoxLayout())
+
+        # Requested and last drawn plots, as (plot method, keyword arguments, plotted data) tuples
+        self._pending = None
+        self._drawn = None
+        # Labels of the lines on the axes and their artists, reused while the same lines are plotted
+        self._line_labels = None
+        self._lines = []
+        # (set data function, x, y) of the downsampled artists and the date range they were last reduced to
+        self._detail = []
+        self._detail_xlim = None
+
+    @property
+    def canvas(self):
+        """
+        Matplotlib canvas of the chart. Created on first use, so matplotlib is only imported once a chart is drawn.
+        """
+        if self._canvas is None:
+            from Application.WidgetTemplates.mpl_canvas import MplCanvas, NavigationToolbar
+
+            self._canvas = MplCanvas()
+            self.toolbar = NavigationToolbar(self._canvas, self)
+            self.toolbar.setContentsMargins(50, 0, 50, 0)
+            self.layout().addWidget(self._canvas)
+            self.layout().addWidget(self.toolbar)
+        return self._canvas
+
+    def set_series(self, series, portfolio_label, benchmark_label):
+        """
+        Sets the data of the chart. Plots requested afterwards show it.
+
+        Parameters
+        ----------
+        series : `DerivedSeries`
+            Series derived from the returns series of the portfolio.
+        portfolio_label : `str`
+            Legend label of the portfolio.
+        benchmark_label : `str`
+            Legend label of the benchmark.
+        """
+        self.series = series
+        self.portfolio_label = portfolio_label
+        self.benchmark_label = benchmark_label
+
+    def _plot_state(self, plot, kwargs):
+        return plot, kwargs, (self.series, self.portfolio_label, self.benchmark_label)
+
+    @staticmethod
+    def _same_plot(state, other):
+        if state is None or other is None:
+            return False
+        (plot, kwargs, data), (other_plot, other_kwargs, other_data) = state, other
+        # The series are compared by identity, a new load always sets new ones
+        return (plot == other_plot and kwargs == other_kwargs and
+                data[0] is other_data[0] and data[1:] == other_data[1:])
+
+    def request_plot(self, plot, **kwargs):
+        """
+        Requests a plot. It is drawn straight away if the chart is visible and when it is next shown otherwise, unless
+        the chart already shows the same plot of the same data.
+
+        Parameters
+        ----------
+        plot : `method`
+            Plot method of this chart, e.g. plot_metric.
+        **kwargs
+            Arguments of the plot method.
+        """
+        state = self._plot_state(plot, kwargs)
+        if self._same_plot(state, self._drawn):
+            self._pending = None
+            return
+
+        self._pending = state
+        if self.isVisible():
+            self._draw_pending()
+
+    def _draw_pending(self):
+        plot, kwargs, _ = self._pending
+        self._drawn, self._pending = self._pending, None
+        plot(**kwargs)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._pending is not None:
+            self._draw_pending()
+
+    def _clear(self):
+        self.canvas.ax.clear()
+        self._line_labels = None
+        self._lines = []
+        self._detail = []
+        self._detail_xlim = None
+        # Clearing the axes also drops their callbacks
+        self.canvas.ax.callbacks.connect('xlim_changed', self._update_detail)
+
+    @staticmethod
+    def _xy(series):
+        import matplotlib.dates as mdates
+
+        return mdates.date2num(series.index), series.to_numpy(dtype=np.float64)
+
+    def _downsample(self, x, y, xlim=(None, None)):
+        return downsample(x, y, self.canvas.ax.bbox.width, *xlim)
+
+    def _update_detail(self, ax=None):
+        """
+        Reduces the downsampled artists to the points visible in the current date range.
+        """
+        xlim = self.canvas.ax.get_xlim()
+        if xlim == self._detail_xlim:
+            return
+
+        self._detail_xlim = xlim
+        for set_data, x, y in self._detail:
+            set_data(*self._downsample(x, y, xlim))
+
+    def _plot_lines(self, lines):
+        """
+        Plots series as lines. When the axes already show lines with the same labels only their data is replaced,
+        the axes are rescaled to it and nothing else is redrawn from scratch.
+
+        Parameters
+        ----------
+        lines : `list`
+            (label, series) tuples, one per line.
+        """
+        labels = [label for label, _ in lines]
+        if labels != self._line_labels:
+            self._clear()
+            self.canvas.ax.xaxis_date()
+            self._lines = [self.canvas.ax.plot([], [], label=label)[0] for label in labels]
+            self._line_labels = labels
+
+        # Reduced over the whole range first, which keeps the extremes the axes are scaled to
+        self._detail = [(line.set_data, *self._xy(series)) for line, (_, series) in zip(self._lines, lines)]
+        self._detail_xlim = None
+        for set_data, x, y in self._detail:
+            set_data(*self._downsample(x, y))
+        # A new plot resets a zoomed or panned view, like clearing the axes does
+        self.canvas.ax.set_autoscale_on(True)
+        self.canvas.ax.relim()
+        self.canvas.ax.autoscale_view()
+        self._update_detail()
+
+    def _fill_area(self, label, series):
+        """
+        Fills the area between a series and zero, e.g. a drawdown.
+
+        Parameters
+        ----------
+        label : `str`
+            Legend label.
+        series : `pd.Series`
+            Values indexed by date.
+        """
+        x, y = self._xy(series)
+        self.canvas.ax.xaxis_date()
+        area = self.canvas.ax.fill_between(*self._downsample(x, y), label=label, alpha=0.5)
+
+        def set_data(x, y):
+            area.set_verts([np.column_stack([np.concatenate([x, x[::-1]]), np.concatenate([y, np.zeros(len(y))])])])
+
+        self._detail.append((set_data, x, y))
 
     def plot_metric(self, start_date=None, source="Portfolio", metric="Equity"):
-        self.canvas.ax.clear()
+        import matplotlib.dates as mdates
+        from matplotlib.ticker import PercentFormatter
+
+        if metric == "Drawdown" or self.series is None:
+            self._clear()
         self.start_date = start_date
 
-        if self.returns_series is not None:
-            filtered_data = self.returns_series.loc[self.start_date:]
-            ptf_ret = filtered_data['Total Equity'].pct_change().fillna(0.0)
-            bmk_ret = filtered_data['Benchmark'].pct_change().fillna(0.0)
-            x_data = filtered_data.index
+        if self.series is not None:
+            series = self.series
 
             if metric == "Equity":
                 if source == "Portfolio":
-                    sns.lineplot(data=filtered_data['Total Equity'], ax=self.canvas.ax, label=self.portfolio_label)
+                    self._plot_lines([(self.portfolio_label, series.equity("Portfolio", self.start_date))])
                 elif source == "Benchmark":
-                    sns.lineplot(data=filtered_data['Benchmark'], ax=self.canvas.ax, label=self.benchmark_label)
+                    self._plot_lines([(self.benchmark_label, series.equity("Benchmark", self.start_date))])
                 else:
-                    sns.lineplot(data=filtered_data[['Total Equity', 'Benchmark']], ax=self.canvas.ax, dashes=False)
+                    self._plot_lines([('Total Equity', series.equity("Portfolio", self.start_date)),
+                                      ('Benchmark', series.equity("Benchmark", self.start_date))])
 
                 self.canvas.ax.set_ylabel(f"{source} Equity")
                 self.canvas.ax.format_coord = lambda x, y: f"Date = {mdates.num2date(x).strftime('%Y-%m-%d')} " \
@@ -84,16 +220,12 @@ class ChartWidget(QtWidgets.QWidget):
                 
             elif metric == "Performance":
                 if source == "Portfolio":
-                    sns.lineplot(data=(ptf_ret.add(1).cumprod() - 1) * 100,
-                                 ax=self.canvas.ax, label=self.portfolio_label)
+                    self._plot_lines([(self.portfolio_label, series.cumulative_returns("Portfolio", self.start_date))])
                 elif source == "Benchmark":
-                    sns.lineplot(data=(bmk_ret.add(1).cumprod() - 1) * 100,
-                                 ax=self.canvas.ax, label=self.benchmark_label)
+                    self._plot_lines([(self.benchmark_label, series.cumulative_returns("Benchmark", self.start_date))])
                 else:
-                    sns.lineplot(data=(ptf_ret.add(1).cumprod() - 1) * 100,
-                                 ax=self.canvas.ax, label=self.portfolio_label)
-                    sns.lineplot(data=(bmk_ret.add(1).cumprod() - 1) * 100,
-                                 ax=self.canvas.ax, label=self.benchmark_label)
+                    self._plot_lines([(self.portfolio_label, series.cumulative_returns("Portfolio", self.start_date)),
+                                      (self.benchmark_label, series.cumulative_returns("Benchmark", self.start_date))])
 
                 self.canvas.ax.set_ylabel(f"{source} Performance")
                 self.canvas.ax.yaxis.set_major_formatter(PercentFormatter())
@@ -102,16 +234,12 @@ class ChartWidget(QtWidgets.QWidget):
 
             elif metric == "Drawdown":
                 if source == "Portfolio":
-                    y_drawdown = qs.stats.to_drawdown_series(ptf_ret)
-                    self.canvas.ax.fill_between(x_data, y_drawdown, label=self.portfolio_label, alpha=0.5)
+                    self._fill_area(self.portfolio_label, series.drawdown("Portfolio", self.start_date))
                 elif source == "Benchmark":
-                    y_drawdown = qs.stats.to_drawdown_series(bmk_ret)
-                    self.canvas.ax.fill_between(x_data, y_drawdown, label=self.benchmark_label, alpha=0.5)
+                    self._fill_area(self.benchmark_label, series.drawdown("Benchmark", self.start_date))
                 else:
-                    y_drawdown = qs.stats.to_drawdown_series(ptf_ret)
-                    self.canvas.ax.fill_between(x_data, y_drawdown, label=self.portfolio_label, alpha=0.5)
-                    y_drawdown = qs.stats.to_drawdown_series(bmk_ret)
-                    self.canvas.ax.fill_between(x_data, y_drawdown, label=self.benchmark_label, alpha=0.5)
+                    self._fill_area(self.portfolio_label, series.drawdown("Portfolio", self.start_date))
+                    self._fill_area(self.benchmark_label, series.drawdown("Benchmark", self.start_date))
 
                 self.canvas.ax.set_ylabel(f"{source} Drawdown")
                 self.canvas.ax.yaxis.set_major_formatter(PercentFormatter())
@@ -130,13 +258,15 @@ class ChartWidget(QtWidgets.QWidget):
             self.canvas.draw()
 
     def plot_returns_distribution(self, start_date=None, source="Portfolio"):
-        self.canvas.ax.clear()
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
+        self._clear()
         self.start_date = start_date
 
-        if self.returns_series is not None:
-            filtered_data = self.returns_series.loc[self.start_date:]
-            ptf_ret = filtered_data['Total Equity'].pct_change().fillna(0.0)
-            bmk_ret = filtered_data['Benchmark'].pct_change().fillna(0.0)
+        if self.series is not None:
+            ptf_ret = self.series.returns("Portfolio", self.start_date)
+            bmk_ret = self.series.returns("Benchmark", self.start_date)
 
             if source == "Portfolio":
                 sns.histplot(ptf_ret, kde=True, ax=self.canvas.ax, label=self.portfolio_label)
@@ -156,24 +286,16 @@ class ChartWidget(QtWidgets.QWidget):
             self.canvas.draw()
 
     def plot_monthly_returns(self, source="Portfolio"):
-        self.canvas.ax.clear()
+        import matplotlib
+        import seaborn as sns
 
-        if self.returns_series is not None:
-            if source == "Portfolio":
-                monthly_returns = qs.stats.monthly_returns(self.returns_series['Ptf Returns']) * 100
-                sns.heatmap(data=monthly_returns, annot=True, fmt="0.2f", linewidth=.5, ax=self.canvas.ax,
-                            cbar=False, annot_kws={"size": 8}, center=0, cmap=cm.get_cmap("RdYlGn"))
-
-            elif source == "Benchmark":
-                monthly_returns = qs.stats.monthly_returns(self.returns_series['Bmk Returns']) * 100
-                sns.heatmap(data=monthly_returns, annot=True, fmt="0.2f", linewidth=.5, ax=self.canvas.ax,
-                            cbar=False, annot_kws={"size": 8}, center=0, cmap=cm.get_cmap("RdYlGn"))
+        self._clear()
 
-            else:
-                active_returns = qs.stats.monthly_returns(self.returns_series['Ptf Returns']) - \
-                                 qs.stats.monthly_returns(self.returns_series['Bmk Returns']) * 100
-                sns.heatmap(data=active_returns, annot=True, fmt="0.2f", linewidth=.5, ax=self.canvas.ax,
-                            cbar=False, annot_kws={"size": 8}, center=0, cmap=cm.get_cmap("RdYlGn"))
+        if self.series is not None:
+            # Portfolio, benchmark or active returns, in percent
+            monthly_returns = self.series.monthly_returns(source)
+            sns.heatmap(data=monthly_returns, annot=True, fmt="0.2f", linewidth=.5, ax=self.canvas.ax,
+                        cbar=False, annot_kws={"size": 8}, center=0, cmap=matplotlib.colormaps["RdYlGn"])
 
             self.canvas.ax.set_title(f'Monthly {source} Returns (%)', fontweight='bold')
             self.canvas.ax.set_ylabel(None)
@@ -182,26 +304,21 @@ class ChartWidget(QtWidgets.QWidget):
             self.canvas.draw()
 
     def plot_rolling_volatility(self, source="Portfolio", rolling_period=63):
-        self.canvas.ax.clear()
+        import matplotlib.dates as mdates
+
+        if self.series is None:
+            self._clear()
 
-        if self.returns_series is not None:
+        if self.series is not None:
             if source == "Portfolio":
-                rolling_volatility = (qs.stats.rolling_volatility(self.returns_series['Ptf Returns'],
-                                                                  rolling_period=rolling_period) * 100)
-                sns.lineplot(data=rolling_volatility, ax=self.canvas.ax, label=self.portfolio_label)
+                self._plot_lines([(self.portfolio_label, self.series.rolling_volatility("Portfolio", rolling_period))])
 
             elif source == "Benchmark":
-                rolling_volatility = (qs.stats.rolling_volatility(self.returns_series['Bmk Returns'],
-                                                                  rolling_period=rolling_period) * 100)
-                sns.lineplot(data=rolling_volatility, ax=self.canvas.ax, label=self.benchmark_label)
+                self._plot_lines([(self.benchmark_label, self.series.rolling_volatility("Benchmark", rolling_period))])
 
             else:
-                rolling_volatility = (qs.stats.rolling_volatility(self.returns_series['Ptf Returns'],
-                                                                  rolling_period=rolling_period) * 100)
-                sns.lineplot(data=rolling_volatility, ax=self.canvas.ax, label=self.portfolio_label)
-                rolling_volatility = (qs.stats.rolling_volatility(self.returns_series['Bmk Returns'],
-                                                                  rolling_period=rolling_period) * 100)
-                sns.lineplot(data=rolling_volatility, ax=self.canvas.ax, label=self.benchmark_label)
+                self._plot_lines([(self.portfolio_label, self.series.rolling_volatility("Portfolio", rolling_period)),
+                                  (self.benchmark_label, self.series.rolling_volatility("Benchmark", rolling_period))])
 
             self.canvas.ax.set_ylabel(f'{source} Rolling {rolling_period}-Day Volatility (%)')
             self.canvas.ax.yaxis.get_label().set_fontsize(8)
@@ -215,12 +332,13 @@ class ChartWidget(QtWidgets.QWidget):
             self.canvas.draw()
 
     def plot_rolling_beta(self, rolling_period=63):
-        self.canvas.ax.clear()
+        import matplotlib.dates as mdates
+
+        if self.series is None:
+            self._clear()
 
-        if self.returns_series is not None:
-            rolling_greeks = qs.stats.rolling_greeks(self.returns_series['Ptf Returns'],
-                                                     self.returns_series['Bmk Returns'], periods=rolling_period)
-            sns.lineplot(data=rolling_greeks['beta'], ax=self.canvas.ax, label='Beta')
+        if self.series is not None:
+            self._plot_lines([('Beta', self.series.rolling_beta(rolling_period))])
 
             self.canvas.ax.set_ylabel(f'Rolling {rolling_period}-Day Beta')
             self.canvas.ax.yaxis.get_label().set_fontsize(8)
@@ -0,0 +1,202 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from Infrastructure.Utilities import custom_statistics as cs
+
+# Equity and returns columns of the returns series, by chart source
+SOURCE_COLUMNS = {
+    "Portfolio": ('Total Equity', 'Ptf Returns'),
+    "Benchmark": ('Benchmark', 'Bmk Returns')
+}
+
+
+class DerivedSeriesCache:
+    """
+    Least recently used store of series derived from the returns series of
+    the open portfolios, keyed by (portfolio, start_date, rolling_period,
+    source, series name). When full, the series used the longest time ago
+    are dropped first.
+
+    Parameters
+    ----------
+    maxsize : `int`, optional
+        Maximum number of series kept.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._series = OrderedDict()
+
+    def __len__(self):
+        return len(self._series)
+
+    def get(self, key, compute):
+        """
+        Returns the series stored under key, computing and storing it first
+        if it is not stored.
+
+        Parameters
+        ----------
+        key : `tuple`
+            (portfolio, start_date, rolling_period, source, series name).
+        compute : `callable`
+            Computes the series when it is not stored.
+        """
+        if key in self._series:
+            self._series.move_to_end(key)
+            return self._series[key]
+
+        series = compute()
+        self._series[key] = series
+        if len(self._series) > self.maxsize:
+            self._series.popitem(last=False)
+        return series
+
+    def invalidate(self, portfolio):
+        """
+        Drops every series of a portfolio.
+        """
+        for key in [key for key in self._series if key[0] == portfolio]:
+            del self._series[key]
+
+
+_session_cache = DerivedSeriesCache()
+
+
+def _rolling(kernel, rolling_period, series, *other_series):
+    """
+    Evaluates a custom_statistics kernel over every rolling window of the series in one call. The first
+    rolling_period - 1 values are NaN, like a pandas rolling window.
+    """
+    result = np.full(len(series), np.nan)
+    if len(series) >= rolling_period:
+        windows = [cs.rolling_windows(values.to_numpy(dtype=np.float64), rolling_period)
+                   for values in (series, *other_series)]
+        result[rolling_period - 1:] = kernel(*windows)
+    return pd.Series(result, index=series.index, name=series.name)
+
+
+class DerivedSeries:
+    """
+    Series the charts derive from the returns series of a portfolio: returns,
+    cumulative returns, drawdowns, rolling volatility and beta and monthly
+    returns. Each is computed once per start date, rolling period and source
+    and read from the cache afterwards, so charts showing the same series do
+    not recompute it. A new load of the portfolio gets a new DerivedSeries
+    and drops the series of the previous one.
+
+    Drawdowns and rolling statistics are evaluated by the custom_statistics
+    kernels. Monthly returns are still tabulated by quantstats, whose year by
+    month table, with its EOY column, the heatmap shows as is.
+
+    Parameters
+    ----------
+    returns_series : `pd.DataFrame`
+        Returns series of the portfolio, with 'Total Equity', 'Benchmark',
+        'Ptf Returns' and 'Bmk Returns' columns.
+    cache : `DerivedSeriesCache`, optional
+        Store of the series. Defaults to the one shared by every portfolio of
+        the session.
+    portfolio : `hashable`, optional
+        Key of the portfolio in the cache, e.g. a token of its widget, so its
+        series can be released once the portfolio is closed. Defaults to the
+        instance.
+    """
+
+    def __init__(self, returns_series, cache=None, portfolio=None):
+        self.returns_series = returns_series
+        self.cache = cache if cache is not None else _session_cache
+        self.portfolio = portfolio if portfolio is not None else self
+
+    def _get(self, name, compute, start_date=None, rolling_period=None, source=None):
+        start_date = pd.Timestamp(start_date) if start_date is not None else None
+        return self.cache.get((self.portfolio, start_date, rolling_period, source, name), compute)
+
+    def invalidate(self):
+        """
+        Drops the cached series of this portfolio.
+        """
+        self.release(self.portfolio, self.cache)
+
+    @staticmethod
+    def release(portfolio, cache=None):
+        """
+        Drops the cached series of a portfolio without holding a reference to
+        its DerivedSeries, e.g. when its widget is destroyed.
+
+        Parameters
+        ----------
+        portfolio : `hashable`
+            Key of the portfolio in the cache.
+        cache : `DerivedSeriesCache`, optional
+            Store of the series. Defaults to the session one.
+        """
+        (cache if cache is not None else _session_cache).invalidate(portfolio)
+
+    def equity(self, source, start_date=None):
+        """
+        Equity of the portfolio or benchmark from start_date.
+        """
+        column = SOURCE_COLUMNS[source][0]
+        return self._get('equity', lambda: self.returns_series[column].loc[start_date:],
+                         start_date=start_date, source=source)
+
+    def returns(self, source, start_date=None):
+        """
+        Daily returns of the equity from start_date, the first one being zero.
+        """
+        return self._get('returns', lambda: self.equity(source, start_date).pct_change().fillna(0.0),
+                         start_date=start_date, source=source)
+
+    def cumulative_returns(self, source, start_date=None):
+        """
+        Compounded returns from start_date, in percent.
+        """
+        return self._get('cumulative returns', lambda: (self.returns(source, start_date).add(1).cumprod() - 1) * 100,
+                         start_date=start_date, source=source)
+
+    def drawdown(self, source, start_date=None):
+        """
+        Drawdown series of the returns from start_date.
+        """
+        def compute():
+            returns = self.returns(source, start_date)
+            return pd.Series(cs.to_drawdown_series(returns.to_numpy(dtype=np.float64)), index=returns.index,
+                             name=returns.name)
+
+        return self._get('drawdown', compute, start_date=start_date, source=source)
+
+    def rolling_volatility(self, source, rolling_period):
+        """
+        Annualised rolling volatility of the daily returns, in percent.
+        """
+        column = SOURCE_COLUMNS[source][1]
+        return self._get('rolling volatility',
+                         lambda: _rolling(cs.volatility, rolling_period, self.returns_series[column]) * 100,
+                         rolling_period=rolling_period, source=source)
+
+    def rolling_beta(self, rolling_period):
+        """
+        Rolling beta of the portfolio to the benchmark.
+        """
+        return self._get('rolling beta',
+                         lambda: _rolling(cs.beta, rolling_period, self.returns_series['Ptf Returns'],
+                                          self.returns_series['Bmk Returns']).rename('beta'),
+                         rolling_period=rolling_period)
+
+    def monthly_returns(self, source):
+        """
+        Monthly returns by year and month, in percent. The "Ptf vs Bmk"
+        source gives the portfolio returns in excess of the benchmark ones.
+        """
+        import quantstats as qs
+
+        if source in SOURCE_COLUMNS:
+            column = SOURCE_COLUMNS[source][1]
+            return self._get('monthly returns', lambda: qs.stats.monthly_returns(self.returns_series[column]) * 100,
+                             source=source)
+        return self._get('monthly returns',
+                         lambda: self.monthly_returns("Portfolio") - self.monthly_returns("Benchmark"),
+                         source=source)
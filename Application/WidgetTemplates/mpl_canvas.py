@@ -0,0 +1,40 @@
+"""
+Matplotlib canvas of the chart widgets. Importing matplotlib and applying the
+chart style is slow, so chart_custom only imports this module when the first
+chart is drawn.
+"""
+from PyQt6 import QtWidgets
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg, NavigationToolbar2QT
+from matplotlib.figure import Figure
+import matplotlib
+import matplotlib.pyplot as plt
+
+from qbstyles import mpl_style
+mpl_style(dark=True)
+
+matplotlib.use('QtAgg')
+# plt.style.use('dark_background')
+plt.rcParams['axes.facecolor'] = '#101012'
+plt.rcParams['figure.facecolor'] = '#202124'  # #e4e7eb #202124 8ab4f7 161719
+
+
+class NavigationToolbar(QtWidgets.QWidget):
+    def __init__(self, canvas, parent=None):
+        super(NavigationToolbar, self).__init__(parent)
+        self.canvas = canvas
+        layout = QtWidgets.QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
+        self.toolbar = NavigationToolbar2QT(self.canvas, self)
+        self.toolbar.setStyleSheet("background-color: transparent;")
+        layout.addWidget(self.toolbar)
+        self.setLayout(layout)
+
+
+class MplCanvas(FigureCanvasQTAgg):
+    def __init__(self, width=6, height=4, dpi=100):
+        fig = Figure(figsize=(width, height), dpi=dpi)
+        self.ax = fig.add_subplot(111)
+        self.ax.xaxis.grid(linestyle=':')
+        self.ax.yaxis.grid(linestyle=':')
+        super(MplCanvas, self).__init__(fig)
@@ -5,12 +5,180 @@ import numpy as np
 import math
 
 
+def percent_format(value):
+    """Renders a fraction as a percentage with 2 dp, e.g. 0.1234 -> '12.34 %'."""
+    return f'{value * 100:,.2f} %'
+
+
+def integer_format(value):
+    """Renders a number rounded to an integer with a thousand separator."""
+    return f'{value:,.0f}'
+
+
+def render_value(value, formatter=None):
+    """
+    Renders a cell value to its display string, with the formatter if one is given, by its type otherwise.
+    """
+    if formatter is not None and value is not None:
+        return formatter(value)
+
+    if isinstance(value, datetime):
+        # Render time to YYYY-MM-DD.
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+
+    if isinstance(value, float):
+        # Render float to 2 dp and a thousand separator
+        return f'{value:,.2f}'
+
+    if isinstance(value, (int, np.int64)):
+        # Render int with a thousand separator
+        return f'{value:,}'
+
+    if value is None:
+        return ''
+
+    return str(value)
+
+
 class PandasModel(QAbstractTableModel):
-    """A model to interface a Qt view with pandas dataframe """
+    """
+    A model to interface a Qt view with pandas dataframe. Values are rendered by their type unless a formatter is
+    given for their column or row label, so dataframes can stay numeric and leave the display format to the view.
+
+    Painting does not touch the dataframe. Its columns are converted to NumPy arrays once per reset and the display
+    strings are rendered per chunk of chunk_size rows of a column the first time one of its cells is painted. Edits,
+    inserts and removals only drop the chunks they affect. Dataframes longer than fetch_size rows are shown
+    incrementally, the view fetches fetch_size more rows whenever it scrolls to the end of the loaded ones.
+
+    Inserted rows are kept in an append buffer. When one of the new cells is read only the new rows are converted
+    and appended to the column arrays, which grow by doubling, and they are concatenated to the dataframe, in one go,
+    when the dataframe is read. Entering many trades one at a time therefore stays linear. A new row changing the
+    dtype of a column, removals and sorting convert the whole dataframe again. append_rows and remove_rows insert or
+    remove many rows with a single pair of model signals.
+
+    Parameters
+    ----------
+    data : `pd.DataFrame`
+        Dataframe to display.
+    formatters : `dict`, optional
+        Functions rendering a value to a string, keyed by column or row label.
+    fetch_size : `int`, optional
+        Number of rows loaded at once. Defaults to the class attribute.
+    """
+
+    chunk_size = 256
+    fetch_size = 5000
 
-    def __init__(self, data):
+    def __init__(self, data, formatters=None, fetch_size=None):
         super().__init__()
         self._data = data
+        self._formatters = formatters or {}
+        if fetch_size is not None:
+            self.fetch_size = fetch_size
+
+        self._columns = []
+        self._column_formatters = []
+        self._row_formatters = None
+        self._chunks = []
+        self._pending = []
+        self._unmerged = []
+        self._rows = 0
+        self._loaded = 0
+        self._rebuild()
+        self._loaded = min(len(self._data.index), self.fetch_size)
+
+    def _rebuild(self):
+        """
+        Converts the columns to NumPy arrays, resolves the formatters of every column and row and drops every
+        rendered chunk.
+        """
+        self._columns = [self._data.iloc[:, column].to_numpy() for column in range(len(self._data.columns))]
+        self._rows = len(self._data.index)
+        self._column_formatters = [self._formatters.get(label) for label in self._data.columns] \
+            if self._formatters else [None] * len(self._columns)
+        self._row_formatters = None
+        if self._formatters and any(label in self._formatters for label in self._data.index):
+            self._row_formatters = [self._formatters.get(label) for label in self._data.index]
+        self._chunks = [{} for _ in self._columns]
+
+    def _flush(self):
+        """
+        Converts the rows of the append buffer and appends them to the column arrays. The whole dataframe is only
+        converted again if the new rows change the dtype of a column or the rows have formatters.
+        """
+        if not self._pending:
+            return
+
+        first_row = self._rows
+        new_rows = pd.DataFrame(self._pending, columns=self._data.columns)
+        self._pending = []
+        self._unmerged.append(new_rows)
+
+        if self._data.empty or self._row_formatters is not None:
+            self._merge()
+            self._refresh_rows(first_row)
+            return
+
+        # The last row gives the new rows the dtypes the concatenation to the whole dataframe would
+        combined = pd.concat([self._data.iloc[-1:], new_rows], ignore_index=True)
+        if not combined.dtypes.equals(self._data.dtypes):
+            # Every rendered value of the column may change with its dtype
+            self._merge()
+            self._rebuild()
+            return
+
+        for column in range(len(self._columns)):
+            self._columns[column] = self._append_values(self._columns[column], combined.iloc[1:, column].to_numpy())
+            self._chunks[column].pop(first_row // self.chunk_size, None)
+        self._rows += len(new_rows.index)
+
+    def _append_values(self, values, new_values):
+        """
+        Writes new values after the first _rows values of a column array, doubling its capacity when it is full.
+        """
+        end = self._rows + len(new_values)
+        if end > len(values):
+            grown = np.empty(max(end, 2 * len(values)), dtype=values.dtype)
+            grown[:self._rows] = values[:self._rows]
+            values = grown
+        values[self._rows:end] = new_values
+        return values
+
+    def _merge(self):
+        """
+        Concatenates the converted rows of the append buffer to the dataframe.
+        """
+        if not self._unmerged:
+            return
+
+        self._data = pd.concat([self._data if not self._data.empty else None, *self._unmerged], ignore_index=True)
+        self._unmerged = []
+
+    def _invalidate_rows(self, first_row):
+        """
+        Drops the rendered chunks from the one holding first_row onward, in every column.
+        """
+        first_chunk = first_row // self.chunk_size
+        for chunks in self._chunks:
+            for chunk in [chunk for chunk in chunks if chunk >= first_chunk]:
+                del chunks[chunk]
+
+    def _render_chunk(self, column, chunk):
+        start = chunk * self.chunk_size
+        values = self._columns[column][start:min(start + self.chunk_size, self._rows)]
+        formatter = self._column_formatters[column]
+
+        if formatter is None and self._row_formatters is None and values.dtype.kind == 'M':
+            dates = pd.DatetimeIndex(values)
+            strings = np.where(dates.isna(), '', dates.strftime("%Y-%m-%d %H:%M:%S")).tolist()
+        elif formatter is None and self._row_formatters is not None:
+            row_formatters = self._row_formatters[start:start + self.chunk_size]
+            strings = [render_value(value, row_formatter) for value, row_formatter in zip(values, row_formatters)]
+        else:
+            strings = [render_value(value, formatter) for value in values]
+
+        self._chunks[column][chunk] = strings
+        return strings
 
     @property
     def dataframe(self):
@@ -22,6 +190,8 @@ class PandasModel(QAbstractTableModel):
         `pd.Dataframe`
             Dataframe with the current data.
         """
+        self._flush()
+        self._merge()
         return self._data
 
     @dataframe.setter
@@ -36,32 +206,43 @@ class PandasModel(QAbstractTableModel):
         """
         self.beginResetModel()
         self._data = new_dataframe
+        self._pending = []
+        self._unmerged = []
+        self._rebuild()
+        self._loaded = min(len(self._data.index), self.fetch_size)
         self.endResetModel()
 
     def data(self, index, role=Qt.ItemDataRole.DisplayRole):
         if index.isValid():
             if role == Qt.ItemDataRole.DisplayRole or role == Qt.ItemDataRole.EditRole:
-                value = self._data.iloc[index.row(), index.column()]
-
-                if isinstance(value, datetime):
-                    # Render time to YYYY-MM-DD.
-                    return value.strftime("%Y-%m-%d %H:%M:%S")
+                row, column = index.row(), index.column()
+                if row >= self._rows:
+                    self._flush()
+                chunk = row // self.chunk_size
+                strings = self._chunks[column].get(chunk)
+                if strings is None:
+                    strings = self._render_chunk(column, chunk)
+                return strings[row - chunk * self.chunk_size]
 
-                if isinstance(value, float):
-                    # Render float to 2 dp and a thousand separator
-                    return f'{value:,.2f}'
-
-                if isinstance(value, (int, np.int64)):
-                    # Render int with a thousand separator
-                    return f'{value:,}'
+    def rowCount(self, parent=QModelIndex()):
+        return self._loaded
 
-                if value is None:
-                    return ''
+    def _total_rows(self):
+        return self._rows + len(self._pending)
 
-                return str(value)
+    def canFetchMore(self, parent=QModelIndex()):
+        return self._loaded < self._total_rows()
 
-    def rowCount(self, parent=QModelIndex()):
-        return len(self._data.index)
+    def fetchMore(self, parent=QModelIndex()):
+        """
+        Shows the next fetch_size rows of the dataframe.
+        """
+        remaining = self._total_rows() - self._loaded
+        if remaining > 0:
+            rows = min(remaining, self.fetch_size)
+            self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + rows - 1)
+            self._loaded += rows
+            self.endInsertRows()
 
     def columnCount(self, parent=QModelIndex()):
         return len(self._data.columns)
@@ -71,7 +252,13 @@ class PandasModel(QAbstractTableModel):
 
     def setData(self, index, value, role=Qt.ItemDataRole.DisplayRole):
         if role == Qt.ItemDataRole.DisplayRole or role == Qt.ItemDataRole.EditRole:
-            self._data.iloc[index.row(), index.column()] = value
+            row, column = index.row(), index.column()
+            self._flush()
+            self._merge()
+            self._data.iloc[row, column] = value
+            # The assignment may change the dtype of the column
+            self._columns[column] = self._data.iloc[:, column].to_numpy()
+            self._chunks[column].pop(row // self.chunk_size, None)
             self.dataChanged.emit(index, index)
             return True
 
@@ -81,12 +268,18 @@ class PandasModel(QAbstractTableModel):
             if orientation == Qt.Orientation.Horizontal:
                 return self._data.columns[section]
             else:
+                if section >= self._rows:
+                    self._flush()
+                # Concatenating the appended rows renumbers the whole index
+                if self._unmerged:
+                    return str(section)
                 return str(self._data.index[section])
         return QVariant()
 
     def insertRows(self, position, rows, parent=QModelIndex(), new_data=None):
         """
-        This method inserts a new row into the pandas dataframe model.
+        This method inserts new rows into the pandas dataframe model. Rows are appended to the dataframe through the
+        append buffer, they are only shown straight away if all the rows before them are loaded.
 
         Parameters
         ----------
@@ -101,38 +294,107 @@ class PandasModel(QAbstractTableModel):
         """
         start, end = position, position + rows - 1
         if 0 <= start <= end:
-            self.beginInsertRows(parent, start, end)
-            for index in range(start, end + 1):
-                if isinstance(new_data, list):
-                    new_row = [[i] for i in new_data]
-                else:
-                    raise ValueError("Input must be a list")
-                new_df = pd.DataFrame(dict(zip(list(self._data.columns), new_row)))
-                self._data = pd.concat([self._data if not self._data.empty else None, new_df])
-            self._data = self._data.reset_index(drop=True)
-            self.endInsertRows()
-            return True
+            if not isinstance(new_data, list):
+                raise ValueError("Input must be a list")
+            return self.append_rows([new_data] * rows, parent)
         return False
 
+    def append_rows(self, new_rows, parent=QModelIndex()):
+        """
+        Appends many rows with a single pair of model signals, e.g. for a bulk trade entry.
+
+        Parameters
+        ----------
+        new_rows : `list`
+            Lists of values, one list per row in the order of the columns.
+        parent : `QModelIndex`
+            Parent index.
+
+        Returns
+        -------
+        `bool`
+            Whether any row was appended.
+        """
+        new_rows = [list(row) for row in new_rows]
+        if not new_rows:
+            return False
+
+        visible = not self.canFetchMore()
+        if visible:
+            first_row = self._total_rows()
+            self.beginInsertRows(parent, first_row, first_row + len(new_rows) - 1)
+        self._pending.extend(new_rows)
+        if visible:
+            self._loaded += len(new_rows)
+            self.endInsertRows()
+        return True
+
+    def _refresh_rows(self, first_row):
+        """
+        Reconverts the columns after rows have been inserted or removed and drops the rendered chunks from the first
+        affected row onward. A row count change also invalidates the row formatters.
+        """
+        chunks = self._chunks
+        self._rebuild()
+        self._chunks = chunks
+        self._invalidate_rows(first_row)
+
     def removeRows(self, position, rows, parent=QModelIndex()):
         start, end = position, position + rows - 1
         if 0 <= start <= end < self.rowCount(parent):
             self.beginRemoveRows(parent, start, end)
-            for index in range(start, end + 1):
-                self._data.drop(index, inplace=True)
-            self._data.reset_index(drop=True, inplace=True)
+            self._drop_rows(np.arange(start, end + 1))
             self.endRemoveRows()
             return True
         return False
 
+    def remove_rows(self, rows, parent=QModelIndex()):
+        """
+        Removes many rows, not necessarily adjacent, with a single pair of model signals: a row removal for a block
+        of adjacent rows, a model reset otherwise.
+
+        Parameters
+        ----------
+        rows : `list`
+            Positions of the rows to remove.
+        parent : `QModelIndex`
+            Parent index.
+
+        Returns
+        -------
+        `bool`
+            Whether any row was removed.
+        """
+        rows = np.unique(np.asarray(rows, dtype=np.int64))
+        if not len(rows) or rows[0] < 0 or rows[-1] >= self.rowCount(parent):
+            return False
+
+        if rows[-1] - rows[0] + 1 == len(rows):
+            return self.removeRows(int(rows[0]), len(rows), parent)
+
+        self.beginResetModel()
+        self._drop_rows(rows)
+        self.endResetModel()
+        return True
+
+    def _drop_rows(self, rows):
+        self._flush()
+        self._merge()
+        self._data = self._data.drop(self._data.index[rows]).reset_index(drop=True)
+        self._refresh_rows(int(rows[0]))
+        self._loaded -= len(rows)
+
     def sort(self, ncol, order):
         """Sort table by given column number.
         """
         try:
             self.layoutAboutToBeChanged.emit()
+            self._flush()
+            self._merge()
             self._data.sort_values(self._data.columns[ncol], ascending=order == Qt.SortOrder.DescendingOrder,
                                    inplace=True)
             self._data.reset_index(drop=True, inplace=True)
+            self._rebuild()
             self.layoutChanged.emit()
         except Exception as e:
             print(e)
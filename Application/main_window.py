@@ -12,8 +12,13 @@ from Application.PortfolioWidget.create_ptf_dialog import CreatePortfolio
 from Application.PortfolioWidget.new_trade_dialog import NewTrade
 from Application.PortfolioWidget.ptf_funds_dialog import NewSubRed
 from Application.PortfolioWidget.portfolio_widget import PortfolioWidget
+from Application.PortfolioWidget.portfolio_worker import PortfolioBatchWorker
+from PyQt6.QtCore import QThreadPool
 import pandas as pd
 
+# File dialog filters of the trade files that can be imported and exported
+TRADE_FILE_TYPES = 'Comma Delimited Files (*.csv);;Parquet Files (*.parquet);;Arrow Files (*.arrow *.feather)'
+
 
 class MainWindow(QMainWindow):
     """
@@ -54,6 +59,11 @@ class MainWindow(QMainWindow):
         self._load_portfolio_action = self.add_action("Load Portfolio", "load_portfolio",
                                                       "Initialize Selected Portfolio", True, self.on_load_portfolio)
 
+        self._load_all_portfolios_action = self.add_action("Load All", "load_portfolio",
+                                                           "Initialize All Open Portfolios", True,
+                                                           self.on_load_all_portfolios)
+        self._batch_worker = None
+
         self._ptf_dropdown = RibbonDropdown(self._portfolio_tree.list_portfolios())
         self._ptf_dropdown.currentTextChanged.connect(self.on_ptf_dropdown_selection)
 
@@ -88,15 +98,17 @@ class MainWindow(QMainWindow):
                                                       "Withdraw funds from the Selected Portfolio",
                                                       True, lambda: self.on_create_funds_transaction("withdrawal"))
 
-        # Portfolio Dock
-        self._main_dock_widget = self.add_dock("Main Portfolio",
-                                               PortfolioWidget("Main Portfolio", 100000.0, '2022-01-01', 'USD'),
+        # Portfolio Dock, the first portfolio of the list is the main portfolio
+        main_portfolio = self._portfolio_tree.portfolio_list.child(0).index()
+        self._main_dock_widget = self.add_dock(main_portfolio.data(Qt.ItemDataRole.UserRole),
+                                               self.new_portfolio_widget(main_portfolio),
                                                delete_on_close=False, tabify=False)
         self.tabifiedDockWidgetActivated.connect(self.on_docked_tab_click)
 
         # Ribbon
 
         self._calendar = RibbonCalendar()
+        self._calendar.dateChanged.connect(self.on_as_of_date_changed)
         self._ribbon = RibbonWidget(self)
         self.addToolBar(self._ribbon)
         self.init_ribbon()
@@ -183,6 +195,7 @@ class MainWindow(QMainWindow):
 
         initialization_pane = portfolio_tab.add_ribbon_pane("Initialize Portfolio")
         initialization_pane.add_ribbon_widget(RibbonButton(self, self._load_portfolio_action, True))
+        initialization_pane.add_ribbon_widget(RibbonButton(self, self._load_all_portfolios_action, True))
         grid = initialization_pane.add_grid_widget(300)
         grid.addWidget(QLabel("Portfolio:"), 1, 1)
         grid.addWidget(QLabel("Benchmark:"), 2, 1)
@@ -219,6 +232,9 @@ class MainWindow(QMainWindow):
                                      "Quit application?", QMessageBox.StandardButton.Yes |
                                      QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
+            self.cancel_batch_load()
+            for ptf in self.findChildren(PortfolioWidget):
+                ptf.cancel_update()
             event.accept()
         else:
             event.ignore()
@@ -292,13 +308,13 @@ class MainWindow(QMainWindow):
 
     def on_import_trade_file(self):
         """
-        This method opens a file dialog to import trade file. Must be a .csv file and headers must be identical
-        to the table headers. File will be imported to the currently selected portfolio.
+        This method opens a file dialog to import trade file. Must be a .csv, .parquet or Arrow file and headers must
+        be identical to the table headers. File will be imported to the currently selected portfolio.
         """
         ptf_name = self._ptf_dropdown.currentText()
         dlg = QFileDialog()
         options = QFileDialog.Option.DontUseNativeDialog
-        file_types = 'Comma Delimited Files (*.csv)'
+        file_types = TRADE_FILE_TYPES
         file_name, file_type = dlg.getOpenFileName(
             parent=self,
             caption='Select a file containing transaction data',
@@ -317,12 +333,13 @@ class MainWindow(QMainWindow):
 
     def on_export_trade_file(self):
         """
-        This method exports trade table dataframe to a .csv file from the currently selected portfolio.
+        This method exports trade table dataframe to a .csv, .parquet or Arrow file from the currently selected
+        portfolio.
         """
         ptf_name = self._ptf_dropdown.currentText()
         dlg = QFileDialog()
         options = QFileDialog.Option.DontUseNativeDialog
-        file_types = 'Comma Delimited Files (*.csv)'
+        file_types = TRADE_FILE_TYPES
         file_name, file_type = dlg.getSaveFileName(
             parent=self,
             caption='Save transaction data',
@@ -364,16 +381,33 @@ class MainWindow(QMainWindow):
             Index of a portfolio view item.
         """
         ptf_name = index.data(Qt.ItemDataRole.UserRole)
-        ptf_cash = index.data(Qt.ItemDataRole.UserRole + 1)
-        ptf_start = index.data(Qt.ItemDataRole.UserRole + 2)
-        ptf_curr = index.data(Qt.ItemDataRole.UserRole + 3)
         self._ptf_dropdown.setCurrentText(ptf_name)
         if self.findChild(DockWidget, ptf_name) is None:
-            add_new_ptf = PortfolioWidget(ptf_name, ptf_cash, ptf_start, ptf_curr)
+            add_new_ptf = self.new_portfolio_widget(index)
             self.add_dock(ptf_name, add_new_ptf)
         else:
             self.findChild(DockWidget, ptf_name).raise_()
 
+    def new_portfolio_widget(self, index):
+        """
+        Creates the portfolio widget of a portfolio list item. Stored portfolios load their trades from the portfolio
+        repository.
+
+        Parameters
+        ----------
+        index : `QModelIndex`
+            Index of a portfolio view item.
+
+        Returns
+        -------
+        `PortfolioWidget`
+            Portfolio widget.
+        """
+        return PortfolioWidget(index.data(Qt.ItemDataRole.UserRole), index.data(Qt.ItemDataRole.UserRole + 1),
+                               index.data(Qt.ItemDataRole.UserRole + 2), index.data(Qt.ItemDataRole.UserRole + 3),
+                               repository=self._portfolio_tree.repository,
+                               portfolio_id=index.data(Qt.ItemDataRole.UserRole + 4))
+
     def on_ptf_dropdown_selection(self, selection):
         """
         This method connects to the open portfolio dock widget and raises it when the selection in portfolio
@@ -410,5 +444,72 @@ class MainWindow(QMainWindow):
         ptf = self.findChild(PortfolioWidget, ptf_name)
         ptf.update_positions_table(calculation_date, bmk_name)
 
+    def on_as_of_date_changed(self):
+        """
+        This slot is called when a new as of date is picked. Portfolio computations still running for the previous
+        date are cancelled.
+        """
+        self.cancel_batch_load()
+        for ptf in self.findChildren(PortfolioWidget):
+            ptf.cancel_update()
+
+    def on_load_all_portfolios(self):
+        """
+        This slot is called when load all button is clicked. It computes every open portfolio with trades at the
+        selected as of date and benchmark. Prices are fetched once for all portfolios and the portfolios are built
+        in parallel processes, each one is updated as soon as its result is ready.
+        """
+        bmk_name = self._bmk_dropdown.currentText()
+        calculation_date = pd.to_datetime(self._calendar.text(), dayfirst=True)
+        portfolios = []
+        for ptf in self.findChildren(PortfolioWidget):
+            ptf.cancel_update()
+            trades = ptf.trans_model.dataframe
+            if not trades.empty:
+                # Rebuilt from scratch, the results come with fresh constructors
+                ptf.constructor = None
+                ptf.edit_date = None
+                ptf.computed_version = ptf.trades_version
+                portfolios.append({'trades': trades.copy(), 'ptf_cash': ptf.ptf_cash, 'ptf_name': ptf.ptf_name,
+                                   'ptf_curr': ptf.ptf_curr})
+
+        if not portfolios:
+            QMessageBox.information(self, "Message", "No open portfolio has trades!")
+            return
+
+        self.cancel_batch_load()
+        self._batch_worker = PortfolioBatchWorker(portfolios, calculation_date, bmk_name)
+        signals, job = self._batch_worker.signals, self._batch_worker
+        signals.progress.connect(
+            lambda percent, message: job is self._batch_worker and
+            self.statusBar().showMessage(f"{message} ({percent}%)"))
+        signals.result.connect(
+            lambda ptf_name, result: job is self._batch_worker and self.on_batch_result(ptf_name, result, bmk_name))
+        signals.error.connect(
+            lambda ptf_name, message: job is self._batch_worker and self.on_batch_error(ptf_name, message))
+        signals.finished.connect(lambda: job is self._batch_worker and self.on_batch_finished())
+        QThreadPool.globalInstance().start(self._batch_worker)
+
+    def on_batch_result(self, ptf_name, result, bmk_name):
+        ptf = self.findChild(PortfolioWidget, ptf_name)
+        if ptf is not None and ptf.worker is None:
+            ptf.apply_result(result, bmk_name)
+
+    def on_batch_error(self, ptf_name, message):
+        QMessageBox.information(self, "Error!", f"Error computing portfolio {ptf_name}: {message}")
+
+    def on_batch_finished(self):
+        self._batch_worker = None
+        self.statusBar().showMessage('Ready')
+
+    def cancel_batch_load(self):
+        """
+        Cancels a running multi-portfolio load, if any.
+        """
+        if self._batch_worker is not None:
+            self._batch_worker.cancel()
+            self._batch_worker = None
+            self.statusBar().showMessage('Portfolio computation cancelled.')
+
     def placeholder(self):
         pass
@@ -1,11 +1,9 @@
 import copy
-import datetime
 import logging
 
-import pandas as pd
-
 from Infrastructure import settings
 from Infrastructure.Portfolio.portfolio_event import PortfolioEvent
+from Infrastructure.Portfolio.portfolio_ledger import PortfolioLedger
 from Infrastructure.Portfolio.position_handler import PositionHandler
 
 
@@ -51,15 +49,12 @@ class Portfolio:
         self.name = name
 
         self.pos_handler = PositionHandler()
-        self.history = []
+        self.history = PortfolioLedger()
 
         self.logger = logging.getLogger('Portfolio')
-        self.logger.setLevel(logging.DEBUG)
-        self.logger.info(
-            '(%s) Portfolio "%s" instance initialised' % (
-                self.current_dt.strftime(settings.LOGGING["DATE_FORMAT"]),
-                self.portfolio_id
-            )
+        self._log_event(
+            self.current_dt, 'Portfolio "%s" instance initialised',
+            self.portfolio_id
         )
 
         self._initialise_portfolio_with_cash()
@@ -78,14 +73,22 @@ class Portfolio:
                 )
             )
 
+        self._log_event(
+            self.current_dt, 'Funds subscribed to portfolio "%s" '
+            '- Credit: %0.2f, Balance: %0.2f',
+            self.portfolio_id, self.starting_cash, self.starting_cash
+        )
+
+    def _log_event(self, dt, message, *args):
+        """
+        Logs a portfolio event at INFO level. Nothing is formatted in the
+        quiet events mode or when the logger would discard the record.
+        """
+        if settings.EVENTS_MODE == 'quiet' or not self.logger.isEnabledFor(logging.INFO):
+            return
         self.logger.info(
-            '(%s) Funds subscribed to portfolio "%s" '
-            '- Credit: %0.2f, Balance: %0.2f' % (
-                self.current_dt.strftime(settings.LOGGING["DATE_FORMAT"]),
-                self.portfolio_id,
-                round(self.starting_cash, 2),
-                round(self.starting_cash, 2)
-            )
+            '(%s) ' + message,
+            dt.strftime(settings.LOGGING["DATE_FORMAT"]), *args
         )
 
     @property
@@ -147,13 +150,10 @@ class Portfolio:
             PortfolioEvent.create_subscription(self.current_dt, amount, self.cash)
         )
 
-        self.logger.info(
-            '(%s) Funds subscribed to portfolio "%s" '
-            '- Credit: %0.2f, Balance: %0.2f' % (
-                self.current_dt.strftime(settings.LOGGING["DATE_FORMAT"]),
-                self.portfolio_id, round(amount, 2),
-                round(self.cash, 2)
-            )
+        self._log_event(
+            self.current_dt, 'Funds subscribed to portfolio "%s" '
+            '- Credit: %0.2f, Balance: %0.2f',
+            self.portfolio_id, amount, self.cash
         )
 
     def withdraw_funds(self, dt, amount):
@@ -192,13 +192,10 @@ class Portfolio:
             PortfolioEvent.create_withdrawal(self.current_dt, amount, self.cash)
         )
 
-        self.logger.info(
-            '(%s) Funds withdrawn from portfolio "%s" '
-            '- Debit: %0.2f, Balance: %0.2f' % (
-                self.current_dt.strftime(settings.LOGGING["DATE_FORMAT"]),
-                self.portfolio_id, round(amount, 2),
-                round(self.cash, 2)
-            )
+        self._log_event(
+            self.current_dt, 'Funds withdrawn from portfolio "%s" '
+            '- Debit: %0.2f, Balance: %0.2f',
+            self.portfolio_id, amount, self.cash
         )
 
     def transact_asset(self, txn):
@@ -217,7 +214,7 @@ class Portfolio:
         txn_total_cost = txn_share_cost + txn.commission
 
         if txn_total_cost > self.cash:
-            if settings.PRINT_EVENTS:
+            if settings.PRINT_EVENTS and settings.EVENTS_MODE != 'quiet':
                 print(
                     'WARNING: Not enough cash in the portfolio to '
                     'carry out transaction. Transaction cost of %s '
@@ -231,43 +228,26 @@ class Portfolio:
 
         self.cash -= txn_total_cost
 
-        # Form Portfolio history details
-        direction = "LONG" if txn.direction > 0 else "SHORT"
-        description = "%s %s %s %0.2f %s" % (
-            direction, txn.quantity, txn.asset.upper(),
-            txn.price, datetime.datetime.strftime(txn.dt, "%d/%m/%Y")
-        )
-        if direction == "LONG":
-            pe = PortfolioEvent(
-                dt=txn.dt, type='asset_transaction',
-                description=description,
-                debit=round(txn_total_cost, 2), credit=0.0,
-                balance=round(self.cash, 2)
-            )
-            self.logger.info(
-                '(%s) Asset "%s" transacted LONG in portfolio "%s" '
-                '- Debit: %0.2f, Balance: %0.2f' % (
-                    txn.dt.strftime(settings.LOGGING["DATE_FORMAT"]),
-                    txn.asset, self.portfolio_id,
-                    round(txn_total_cost, 2), round(self.cash, 2)
-                )
+        # Form Portfolio history details, the description is
+        # rendered by the ledger when the history is displayed
+        if txn.direction > 0:
+            debit, credit = round(txn_total_cost, 2), 0.0
+            self._log_event(
+                txn.dt, 'Asset "%s" transacted LONG in portfolio "%s" '
+                '- Debit: %0.2f, Balance: %0.2f',
+                txn.asset, self.portfolio_id, txn_total_cost, self.cash
             )
         else:
-            pe = PortfolioEvent(
-                dt=txn.dt, type='asset_transaction',
-                description=description,
-                debit=0.0, credit=-1.0 * round(txn_total_cost, 2),
-                balance=round(self.cash, 2)
-            )
-            self.logger.info(
-                '(%s) Asset "%s" transacted SHORT in portfolio "%s" '
-                '- Credit: %0.2f, Balance: %0.2f' % (
-                    txn.dt.strftime(settings.LOGGING["DATE_FORMAT"]),
-                    txn.asset, self.portfolio_id,
-                    -1.0 * round(txn_total_cost, 2), round(self.cash, 2)
-                )
+            debit, credit = 0.0, -1.0 * round(txn_total_cost, 2)
+            self._log_event(
+                txn.dt, 'Asset "%s" transacted SHORT in portfolio "%s" '
+                '- Credit: %0.2f, Balance: %0.2f',
+                txn.asset, self.portfolio_id, -1.0 * txn_total_cost, self.cash
             )
-        self.history.append(pe)
+        self.history.record_transaction(
+            txn.dt, txn.asset, txn.quantity, txn.price,
+            debit, credit, round(self.cash, 2)
+        )
 
     def portfolio_to_dict(self):
         """
@@ -326,9 +306,6 @@ class Portfolio:
         """
         Creates a Pandas DataFrame of the Portfolio history.
         """
-        records = [pe.to_dict() for pe in self.history]
-        return pd.DataFrame.from_records(
-            records, columns=[
-                "date", "type", "description", "debit", "credit", "balance"
-            ]
+        return self.history.to_frame().rename(
+            columns={"dt": "date"}
         ).set_index(keys=["date"])
@@ -19,6 +19,8 @@ class PortfolioEvent:
         The current cash balance of the portfolio.
     """
 
+    __slots__ = ('dt', 'type', 'description', 'debit', 'credit', 'balance')
+
     def __init__(
         self,
         dt,
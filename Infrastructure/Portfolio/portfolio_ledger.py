@@ -0,0 +1,269 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from Infrastructure.Portfolio.portfolio_event import PortfolioEvent
+
+
+def describe_transaction(asset, quantity, price, dt):
+    """
+    Human-readable description of an asset transaction, e.g.
+    'LONG 100 EQ:AAA 567.00 07/10/2017'.
+    """
+    direction = "LONG" if math.copysign(1, quantity) > 0 else "SHORT"
+    if float(quantity).is_integer():
+        quantity = int(quantity)
+    return "%s %s %s %0.2f %s" % (
+        direction, quantity, asset.upper(), price, dt.strftime("%d/%m/%Y")
+    )
+
+
+class PortfolioLedger:
+    """
+    Columnar, growable store of the cash events of a portfolio. Datetimes,
+    debits, credits and balances live in preallocated NumPy arrays that
+    double in size when full, so appending is amortised O(1). Types and
+    descriptions are stored as integer codes into lists of categories.
+    Asset transactions keep their asset, quantity and price instead of a
+    description, which is only rendered when the events are read.
+
+    The ledger behaves like the list of PortfolioEvent objects it replaces:
+    it supports len(), indexing, iteration and comparison with a list of
+    events, creating the PortfolioEvent objects on access. Events must be
+    appended in datetime order, which the Portfolio already enforces.
+
+    Parameters
+    ----------
+    capacity : `int`, optional
+        Initial number of events the arrays can hold.
+    """
+
+    columns = ['dt', 'type', 'description', 'debit', 'credit', 'balance']
+
+    def __init__(self, capacity=64):
+        self._size = 0
+        self._tz = None
+        self._dt = np.empty(capacity, dtype=np.int64)
+        self._type = np.empty(capacity, dtype=np.int32)
+        self._description = np.empty(capacity, dtype=np.int32)
+        self._debit = np.empty(capacity, dtype=np.float64)
+        self._credit = np.empty(capacity, dtype=np.float64)
+        self._balance = np.empty(capacity, dtype=np.float64)
+        self._asset = np.empty(capacity, dtype=np.int32)
+        self._quantity = np.empty(capacity, dtype=np.float64)
+        self._price = np.empty(capacity, dtype=np.float64)
+        self._types, self._type_codes = [], {}
+        self._descriptions, self._description_codes = [], {}
+        self._assets, self._asset_codes = [], {}
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for index in range(self._size):
+            yield self._event(index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._event(position) for position in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError('PortfolioLedger index out of range')
+        return self._event(index)
+
+    def __eq__(self, other):
+        if not isinstance(other, (PortfolioLedger, list)):
+            return NotImplemented
+        return len(self) == len(other) and all(event == other_event for event, other_event in zip(self, other))
+
+    def __repr__(self):
+        return "PortfolioLedger(%s events)" % self._size
+
+    @staticmethod
+    def _code(value, categories, codes):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(categories)
+            categories.append(value)
+        return code
+
+    def _to_ns(self, dt):
+        dt = pd.Timestamp(dt)
+        if dt.tz is None and self._tz is not None:
+            dt = dt.tz_localize(self._tz)
+        return dt.value
+
+    def _grow(self):
+        capacity = 2 * max(len(self._dt), 1)
+        for name in ('_dt', '_type', '_description', '_debit', '_credit', '_balance', '_asset', '_quantity', '_price'):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def _describe(self, index, dt):
+        code = self._description[index]
+        if code >= 0:
+            return self._descriptions[code]
+        return describe_transaction(
+            self._assets[self._asset[index]], self._quantity[index], self._price[index], dt
+        )
+
+    def _event(self, index):
+        dt = pd.Timestamp(int(self._dt[index]), tz=self._tz)
+        return PortfolioEvent(
+            dt=dt,
+            type=self._types[self._type[index]],
+            description=self._describe(index, dt),
+            debit=float(self._debit[index]),
+            credit=float(self._credit[index]),
+            balance=float(self._balance[index])
+        )
+
+    def record(self, dt, type, description, debit, credit, balance):
+        """
+        Appends an event given by its fields.
+
+        Parameters
+        ----------
+        dt : `pd.Timestamp`
+            Datetime of the event.
+        type : `str`
+            The type of portfolio event, e.g. 'subscription', 'withdrawal'.
+        description : `str`
+            Human-readable portfolio event type.
+        debit : `float`
+            A debit to the cash balance of the portfolio.
+        credit : `float`
+            A credit to the cash balance of the portfolio.
+        balance : `float`
+            The current cash balance of the portfolio.
+        """
+        self._append(dt, type, self._code(description, self._descriptions, self._description_codes),
+                     debit, credit, balance)
+
+    def record_transaction(self, dt, asset, quantity, price, debit, credit, balance):
+        """
+        Appends an asset transaction event. Its description is rendered from
+        the asset, quantity, price and date when the event is read.
+
+        Parameters
+        ----------
+        dt : `pd.Timestamp`
+            Datetime of the transaction.
+        asset : `str`
+            The asset symbol of the transaction.
+        quantity : `int` or `float`
+            The quantity of the transaction, negative for sales.
+        price : `float`
+            The price of the transaction.
+        debit : `float`
+            A debit to the cash balance of the portfolio.
+        credit : `float`
+            A credit to the cash balance of the portfolio.
+        balance : `float`
+            The current cash balance of the portfolio.
+        """
+        index = self._append(dt, 'asset_transaction', -1, debit, credit, balance)
+        self._asset[index] = self._code(asset, self._assets, self._asset_codes)
+        self._quantity[index] = quantity
+        self._price[index] = price
+
+    def _append(self, dt, type, description_code, debit, credit, balance):
+        if self._size == len(self._dt):
+            self._grow()
+        if self._size == 0:
+            self._tz = pd.Timestamp(dt).tz
+
+        index = self._size
+        self._dt[index] = self._to_ns(dt)
+        self._type[index] = self._code(type, self._types, self._type_codes)
+        self._description[index] = description_code
+        self._debit[index] = debit
+        self._credit[index] = credit
+        self._balance[index] = balance
+        self._size += 1
+        return index
+
+    def append(self, event):
+        """
+        Appends a PortfolioEvent.
+
+        Parameters
+        ----------
+        event : `PortfolioEvent`
+            The event to store.
+        """
+        self.record(event.dt, event.type, event.description, event.debit, event.credit, event.balance)
+
+    def truncate(self, size):
+        """
+        Drops every event after the first `size` ones.
+
+        Parameters
+        ----------
+        size : `int`
+            Number of events to keep.
+        """
+        self._size = min(self._size, size)
+
+    def to_frame(self):
+        """
+        Returns the events as a dataframe. The numeric columns are views on
+        the ledger arrays and the type column is a categorical sharing the
+        ledger codes. So is the description column, unless asset
+        transaction descriptions have to be rendered.
+
+        Returns
+        -------
+        `pd.DataFrame`
+            Dataframe with the 'dt', 'type', 'description', 'debit',
+            'credit' and 'balance' columns.
+        """
+        return self._frame(0, self._size)
+
+    def between(self, start, end):
+        """
+        Returns the events with a datetime between two dates, both included.
+
+        Parameters
+        ----------
+        start : `pd.Timestamp`
+            First datetime.
+        end : `pd.Timestamp`
+            Last datetime.
+
+        Returns
+        -------
+        `pd.DataFrame`
+            Dataframe of the events in the range, see to_frame.
+        """
+        dts = self._dt[:self._size]
+        return self._frame(
+            int(np.searchsorted(dts, self._to_ns(start), side='left')),
+            int(np.searchsorted(dts, self._to_ns(end), side='right'))
+        )
+
+    def _frame(self, first, last):
+        dt = pd.DatetimeIndex(self._dt[first:last].view('datetime64[ns]'))
+        if self._tz is not None:
+            dt = dt.tz_localize('UTC').tz_convert(self._tz)
+
+        codes = self._description[first:last]
+        if (codes < 0).any():
+            description = pd.Categorical([
+                self._describe(index, dt[index - first]) for index in range(first, last)
+            ])
+        else:
+            description = pd.Categorical.from_codes(codes, categories=self._descriptions)
+
+        return pd.DataFrame({
+            'dt': dt,
+            'type': pd.Categorical.from_codes(self._type[first:last], categories=self._types),
+            'description': description,
+            'debit': self._debit[first:last],
+            'credit': self._credit[first:last],
+            'balance': self._balance[first:last]
+        }, copy=False)
@@ -1,5 +1,4 @@
-from math import floor
-import numpy as np
+from math import copysign, floor
 
 
 class Position:
@@ -31,8 +30,21 @@ class Position:
         The commission spent on buying assets for this position.
     sell_commission : `float`
         The commission spent on selling assets for this position.
+
+    Notes
+    -----
+    The derived fields (net quantity, average price, P&Ls, market value) are
+    computed once when the position is transacted or re-priced and stored
+    on the instance, so reading them is a plain attribute lookup. Update the
+    position through transact() and update_current_price() only.
     """
 
+    __slots__ = (
+        'asset', 'current_price', 'current_dt', 'buy_quantity', 'sell_quantity', 'avg_bought', 'avg_sold',
+        'buy_commission', 'sell_commission', '_net_quantity', '_direction', '_avg_price', '_commission',
+        '_net_incl_commission', '_realised_pnl', '_market_value', '_unrealised_pnl', '_total_pnl'
+    )
+
     def __init__(
         self,
         asset,
@@ -54,6 +66,8 @@ class Position:
         self.avg_sold = avg_sold
         self.buy_commission = round(buy_commission, 2)
         self.sell_commission = round(sell_commission, 2)
+        self._update_trade_fields()
+        self._update_price_fields()
 
     @classmethod
     def open_from_transaction(cls, transaction):
@@ -132,10 +146,7 @@ class Position:
         `int`
             1 - Long, 0 - No direction, -1 - Short.
         """
-        if self.net_quantity == 0:
-            return 0
-        else:
-            return np.copysign(1, self.net_quantity)
+        return self._direction
 
     @property
     def market_price(self):
@@ -160,7 +171,7 @@ class Position:
         `float`
             The current market value of the Position.
         """
-        return self.current_price * self.net_quantity
+        return self._market_value
 
     @property
     def avg_price(self):
@@ -172,12 +183,7 @@ class Position:
         `float`
             The average price on either the long or short side.
         """
-        if self.net_quantity == 0:
-            return 0.0
-        elif self.net_quantity > 0:
-            return (self.avg_bought * self.buy_quantity + self.buy_commission) / self.buy_quantity
-        else:
-            return (self.avg_sold * self.sell_quantity - self.sell_commission) / self.sell_quantity
+        return self._avg_price
 
     @property
     def net_quantity(self):
@@ -189,7 +195,7 @@ class Position:
         `int`
             The net quantity of assets.
         """
-        return self.buy_quantity - self.sell_quantity
+        return self._net_quantity
 
     @property
     def total_bought(self):
@@ -239,7 +245,7 @@ class Position:
         `float`
             The total commission from assets bought and sold.
         """
-        return round(self.buy_commission + self.sell_commission, 2)
+        return self._commission
 
     @property
     def net_incl_commission(self):
@@ -253,7 +259,7 @@ class Position:
             The net total average cost of assets bought and
             sold including the commission.
         """
-        return round(self.net_total - self.commission, 2)
+        return self._net_incl_commission
 
     @property
     def realised_pnl(self):
@@ -266,26 +272,7 @@ class Position:
         `float`
             The calculated realised P&L.
         """
-        if self.direction == 1:
-            if self.sell_quantity == 0:
-                return 0.0
-            else:
-                return round(
-                    ((self.avg_sold - self.avg_bought) * self.sell_quantity) -
-                    ((self.sell_quantity / self.buy_quantity) * self.buy_commission) -
-                    self.sell_commission, 2
-                )
-        elif self.direction == -1:
-            if self.buy_quantity == 0:
-                return 0.0
-            else:
-                return round(
-                    ((self.avg_sold - self.avg_bought) * self.buy_quantity) -
-                    ((self.buy_quantity / self.sell_quantity) * self.sell_commission) -
-                    self.buy_commission, 2
-                )
-        else:
-            return self.net_incl_commission
+        return self._realised_pnl
 
     @property
     def unrealised_pnl(self):
@@ -299,7 +286,7 @@ class Position:
         `float`
             The calculated unrealised P&L.
         """
-        return round((self.current_price - self.avg_price), 2) * self.net_quantity
+        return self._unrealised_pnl
 
     @property
     def total_pnl(self):
@@ -311,7 +298,53 @@ class Position:
         `float`
             The sum of the unrealised and realised P&L.
         """
-        return round(self.realised_pnl + self.unrealised_pnl, 2)
+        return self._total_pnl
+
+    def _update_trade_fields(self):
+        """
+        Recomputes the fields derived from the bought and sold legs.
+        """
+        net_quantity = self.buy_quantity - self.sell_quantity
+        self._net_quantity = net_quantity
+        self._direction = 0 if net_quantity == 0 else copysign(1, net_quantity)
+        self._commission = round(self.buy_commission + self.sell_commission, 2)
+        self._net_incl_commission = round(self.net_total - self._commission, 2)
+
+        if net_quantity == 0:
+            self._avg_price = 0.0
+        elif net_quantity > 0:
+            self._avg_price = (self.avg_bought * self.buy_quantity + self.buy_commission) / self.buy_quantity
+        else:
+            self._avg_price = (self.avg_sold * self.sell_quantity - self.sell_commission) / self.sell_quantity
+
+        if self._direction == 1:
+            if self.sell_quantity == 0:
+                self._realised_pnl = 0.0
+            else:
+                self._realised_pnl = round(
+                    ((self.avg_sold - self.avg_bought) * self.sell_quantity) -
+                    ((self.sell_quantity / self.buy_quantity) * self.buy_commission) -
+                    self.sell_commission, 2
+                )
+        elif self._direction == -1:
+            if self.buy_quantity == 0:
+                self._realised_pnl = 0.0
+            else:
+                self._realised_pnl = round(
+                    ((self.avg_sold - self.avg_bought) * self.buy_quantity) -
+                    ((self.buy_quantity / self.sell_quantity) * self.sell_commission) -
+                    self.buy_commission, 2
+                )
+        else:
+            self._realised_pnl = self._net_incl_commission
+
+    def _update_price_fields(self):
+        """
+        Recomputes the fields derived from the current market price.
+        """
+        self._market_value = self.current_price * self._net_quantity
+        self._unrealised_pnl = round((self.current_price - self._avg_price), 2) * self._net_quantity
+        self._total_pnl = round(self._realised_pnl + self._unrealised_pnl, 2)
 
     def update_current_price(self, market_price, dt=None):
         """
@@ -334,6 +367,7 @@ class Position:
             )
         else:
             self.current_price = market_price
+            self._update_price_fields()
 
     def _transact_buy(self, quantity, price, commission):
         """
@@ -408,7 +442,8 @@ class Position:
                 transaction.commission
             )
 
-        # Update the current trade information
+        # Update the derived fields and the current trade information
+        self._update_trade_fields()
         self.update_current_price(transaction.price, transaction.dt)
         self.current_dt = transaction.dt
 
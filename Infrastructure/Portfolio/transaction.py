@@ -1,4 +1,5 @@
-import numpy as np
+from math import copysign
+
 import pandas as pd
 import pytz
 
@@ -24,6 +25,8 @@ class Transaction:
         The trading commission
     """
 
+    __slots__ = ('asset', 'quantity', 'direction', 'dt', 'price', 'order_id', 'commission')
+
     def __init__(
         self,
         asset,
@@ -35,7 +38,7 @@ class Transaction:
     ):
         self.asset = asset
         self.quantity = quantity
-        self.direction = np.copysign(1, self.quantity)
+        self.direction = copysign(1, self.quantity)
         # if isinstance(dt, str):
         #     self.dt = pd.Timestamp(dt, tz=pytz.UTC)  # pd.to_datetime(dt, dayfirst=True)
         # else:
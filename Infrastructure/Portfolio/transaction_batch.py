@@ -0,0 +1,87 @@
+import pandas as pd
+
+from Infrastructure.Portfolio.transaction import Transaction
+
+
+class TransactionBatch:
+    """
+    Columnar store of transactions built straight from a trade dataframe.
+    The columns are kept as lists and Transaction objects are only created
+    when the batch is iterated or indexed, e.g. for the transactions of a
+    single day.
+
+    Parameters
+    ----------
+    assets : `list`
+        Asset symbols.
+    quantities : `list`
+        Quantities, positive for buys and negative for sells.
+    dates : `pd.DatetimeIndex`
+        Transaction datetimes.
+    prices : `list`
+        Transaction prices.
+    commissions : `list`
+        Trading commissions.
+    order_id : `int`, optional
+        Order identifier given to every transaction.
+    """
+
+    __slots__ = ('assets', 'quantities', 'dates', 'prices', 'commissions', 'order_id')
+
+    def __init__(self, assets, quantities, dates, prices, commissions, order_id=1):
+        self.assets = assets
+        self.quantities = quantities
+        self.dates = dates
+        self.prices = prices
+        self.commissions = commissions
+        self.order_id = order_id
+
+    @classmethod
+    def from_dataframe(cls, trade_dataframe, order_id=1):
+        """
+        Builds a batch from a trade dataframe, keeping its row order.
+
+        Parameters
+        ----------
+        trade_dataframe : `pd.DataFrame`
+            Dataframe with 'Symbol', 'Quantity', 'Date', 'Price' and
+            'Commission' columns.
+        order_id : `int`, optional
+            Order identifier given to every transaction.
+
+        Returns
+        -------
+        `TransactionBatch`
+            The transactions of the dataframe.
+        """
+        return cls(
+            trade_dataframe['Symbol'].tolist(),
+            trade_dataframe['Quantity'].tolist(),
+            pd.DatetimeIndex(trade_dataframe['Date']),
+            trade_dataframe['Price'].tolist(),
+            trade_dataframe['Commission'].tolist(),
+            order_id
+        )
+
+    def __len__(self):
+        return len(self.assets)
+
+    def __getitem__(self, index):
+        """
+        Returns the transaction at a position, or a batch for a slice.
+        """
+        if isinstance(index, slice):
+            return TransactionBatch(
+                self.assets[index], self.quantities[index], self.dates[index],
+                self.prices[index], self.commissions[index], self.order_id
+            )
+        return Transaction(
+            self.assets[index], self.quantities[index], self.dates[index],
+            self.prices[index], self.order_id, self.commissions[index]
+        )
+
+    def __iter__(self):
+        for asset, quantity, dt, price, commission in zip(
+            self.assets, self.quantities, self.dates, self.prices, self.commissions
+        ):
+            yield Transaction(asset, quantity, dt, price, self.order_id, commission)
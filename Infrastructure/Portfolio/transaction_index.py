@@ -0,0 +1,100 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+from Infrastructure.Portfolio.transaction_batch import TransactionBatch
+
+
+class TransactionIndex:
+    """
+    Buckets a date-sorted list of transactions by the business day on
+    which they are processed, so that simulating a day only touches the
+    transactions falling on it.
+
+    Transactions dated on a non-business day are assigned to the next
+    business day and dispatched dated at its start, so they are never
+    earlier than the positions marked to market on that day. Transactions
+    before the first or after the last day of the date index are left out.
+
+    Parameters
+    ----------
+    transactions : `list` or `TransactionBatch`
+        Transactions sorted by their datetime.
+    date_index : `pd.DatetimeIndex`
+        Business days of the portfolio history.
+    """
+
+    def __init__(self, transactions, date_index):
+        self.transactions = transactions
+        self.date_index = date_index
+        if isinstance(transactions, TransactionBatch):
+            dates = transactions.dates
+        else:
+            dates = pd.DatetimeIndex([txn.dt for txn in transactions])
+        self.days = self.assign_days(dates, date_index)
+
+        # Transactions are sorted, so each day owns a contiguous slice. Those
+        # before the first day sort below it and those after the last above it.
+        ordinal = np.where(self.days >= 0, self.days, len(date_index))
+        if len(date_index):
+            ordinal = np.where(dates.normalize() < date_index[0], -1, ordinal)
+        self._bounds = np.searchsorted(ordinal, np.arange(len(date_index) + 1), side='left')
+
+    @staticmethod
+    def assign_days(dates, date_index):
+        """
+        Maps transaction datetimes to the position of their processing
+        day in the date index.
+
+        Parameters
+        ----------
+        dates : `list-like`
+            Transaction datetimes.
+        date_index : `pd.DatetimeIndex`
+            Business days of the portfolio history.
+
+        Returns
+        -------
+        `np.ndarray`
+            Day positions of the transactions, -1 for those outside the index.
+        """
+        days = pd.DatetimeIndex(dates).normalize()
+        positions = date_index.searchsorted(days, side='left')
+        outside = (positions >= len(date_index))
+        if len(date_index):
+            outside |= days < date_index[0]
+        return np.where(outside, -1, positions).astype(np.int64)
+
+    def on_day(self, day):
+        """
+        Returns the transactions processed on the given day.
+
+        Parameters
+        ----------
+        day : `int`
+            Position of the day in the date index.
+
+        Returns
+        -------
+        `list` or `TransactionBatch`
+            Transactions of the day in date order.
+        """
+        transactions = self.transactions[self._bounds[day]:self._bounds[day + 1]]
+        day_start = self.date_index[day]
+
+        if isinstance(transactions, TransactionBatch):
+            if len(transactions) and transactions.dates[0] < day_start:
+                transactions.dates = transactions.dates.where(transactions.dates >= day_start, day_start)
+            return transactions
+
+        moved = []
+        for txn in transactions:
+            if txn.dt < day_start:
+                txn = copy.copy(txn)
+                txn.dt = day_start
+            moved.append(txn)
+        return moved
+
+    def __len__(self):
+        return int((self.days >= 0).sum())
@@ -0,0 +1,284 @@
+from math import floor
+
+import numpy as np
+import pandas as pd
+
+from Infrastructure.Portfolio.transaction_batch import TransactionBatch
+from Infrastructure.Portfolio.transaction_index import TransactionIndex
+
+
+class VectorisedHistory:
+    """
+    Builds the daily portfolio history with array operations instead of
+    stepping every Position through every business day.
+
+    The trades are replayed once through the Portfolio (an O(trades)
+    average-cost state machine) and a snapshot of the affected position
+    is recorded after each fill. Every business day is then mapped to the
+    last fill of each symbol, which turns the per-day valuation into
+    lookups on a (days x symbols) position matrix multiplied by the
+    forward-filled price matrix.
+
+    Parameters
+    ----------
+    portfolio : `Portfolio`
+        The portfolio to replay the trades through. Its final state matches
+        the one produced by the object-based construction.
+    data_handler : `PriceDataSource`
+        Price history of the traded symbols.
+    date_index : `pd.DatetimeIndex`
+        Business days of the portfolio history.
+    """
+
+    position_columns = ['Symbol', 'Quantity', 'Market Price', 'Market Value', 'Avg Price', 'Total Cost',
+                        'Unrealized PL', 'Realized PL', 'Total PL', 'Holding Date']
+    timeseries_columns = ['Date', 'Total Equity', 'Total Market Value', 'Total RPL', 'Total UPL', 'Total PNL']
+
+    def __init__(self, portfolio, data_handler, date_index):
+        self.portfolio = portfolio
+        self.data_handler = data_handler
+        self.date_index = date_index
+
+    def _assign_trade_days(self, trades):
+        """
+        Maps every trade to the position of its processing day in the date
+        index. Trades falling outside the index are marked with -1.
+
+        Parameters
+        ----------
+        trades : `pd.DataFrame`
+            Dataframe containing the trades, sorted by date.
+
+        Returns
+        -------
+        `np.ndarray`
+            Day positions of the trades.
+        """
+        return TransactionIndex.assign_days(trades['Date'], self.date_index)
+
+    def _replay_trades(self, trades, days):
+        """
+        Replays the trades through the portfolio and records the position
+        state after every fill.
+
+        Parameters
+        ----------
+        trades : `pd.DataFrame`
+            Dataframe containing the trades, sorted by date.
+        days : `np.ndarray`
+            Day positions of the trades.
+
+        Returns
+        -------
+        `dict`
+            Per-fill arrays of the replayed state.
+        """
+        kept = days >= 0
+        batch = TransactionBatch.from_dataframe(trades[kept])
+
+        count = len(batch)
+        state = np.full((count, 6), np.nan)
+        fill_price = np.full(count, np.nan)
+        price_set = np.zeros(count, dtype=bool)
+        cash = np.empty(count)
+
+        positions = self.portfolio.pos_handler.positions
+        for k, txn in enumerate(batch):
+            asset = txn.asset
+            if asset == "SUBSCRIPTION":
+                self.portfolio.subscribe_funds(txn.dt, txn.quantity)
+            elif asset == "WITHDRAWAL":
+                self.portfolio.withdraw_funds(txn.dt, txn.quantity)
+            else:
+                existed = asset in positions
+                self.portfolio.transact_asset(txn)
+                pos = positions[asset]
+                state[k] = (pos.buy_quantity, pos.sell_quantity, pos.avg_bought, pos.avg_sold,
+                            pos.buy_commission, pos.sell_commission)
+                fill_price[k] = pos.current_price
+                price_set[k] = not existed or int(floor(txn.quantity)) != 0
+            cash[k] = self.portfolio.cash
+
+        return {
+            'symbols': np.array(batch.assets, dtype=object), 'days': days[kept], 'state': state,
+            'fill_price': fill_price, 'price_set': price_set, 'cash': cash
+        }
+
+    def _price_matrix(self, symbols):
+        """
+        Aligns the price history to the date index and the traded symbols.
+
+        Parameters
+        ----------
+        symbols : `list`
+            Traded symbols in order of their first fill.
+
+        Returns
+        -------
+        `tuple`
+            Price matrix (days x symbols) and a mask of available prices.
+        """
+        rows = self.data_handler.dates.get_indexer(self.date_index)
+        cols = self.data_handler.symbol_columns(symbols)
+        prices = self.data_handler.prices_for(rows[:, None], cols[None, :])
+
+        return prices, ~np.isnan(prices)
+
+    @staticmethod
+    def _position_metrics(state, price):
+        """
+        Vectorised equivalent of the Position accounting properties.
+
+        Parameters
+        ----------
+        state : `np.ndarray`
+            Array (..., 6) of buy/sell quantities, averages and commissions.
+        price : `np.ndarray`
+            Current market prices.
+
+        Returns
+        -------
+        `dict`
+            Arrays of the position metrics.
+        """
+        buy_q, sell_q, avg_b, avg_s, buy_c, sell_c = np.moveaxis(state, -1, 0)
+        net = buy_q - sell_q
+        direction = np.sign(net)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            avg_price = np.where(
+                net > 0, (avg_b * buy_q + buy_c) / buy_q,
+                np.where(net < 0, (avg_s * sell_q - sell_c) / sell_q, 0.0)
+            )
+            long_rpl = np.where(
+                sell_q == 0, 0.0,
+                np.round((avg_s - avg_b) * sell_q - (sell_q / buy_q) * buy_c - sell_c, 2)
+            )
+            short_rpl = np.where(
+                buy_q == 0, 0.0,
+                np.round((avg_s - avg_b) * buy_q - (buy_q / sell_q) * sell_c - buy_c, 2)
+            )
+
+        commission = np.round(buy_c + sell_c, 2)
+        net_incl_commission = np.round(avg_s * sell_q - avg_b * buy_q - commission, 2)
+        realised = np.where(direction == 1, long_rpl, np.where(direction == -1, short_rpl, net_incl_commission))
+        unrealised = np.round(price - avg_price, 2) * net
+
+        return {
+            'quantity': net, 'market_value': price * net, 'avg_price': avg_price,
+            'net_incl_commission': net_incl_commission, 'realised_pnl': realised,
+            'unrealised_pnl': unrealised, 'total_pnl': np.round(realised + unrealised, 2)
+        }
+
+    def _mark_final_prices(self, symbols, current_price, last_event, fill_mask):
+        """
+        Marks the replayed positions to their last available price so the
+        portfolio totals reflect the end of the history.
+        """
+        if not len(self.date_index):
+            return
+
+        for j, symbol in enumerate(symbols):
+            day = last_event[-1, j]
+            if day >= 0 and not fill_mask[day, j]:
+                self.portfolio.pos_handler.positions[symbol].update_current_price(
+                    current_price[-1, j], self.date_index[day]
+                )
+
+    def build(self, trades, end_date):
+        """
+        Builds the portfolio timeseries and the holdings as of the end date.
+
+        Parameters
+        ----------
+        trades : `pd.DataFrame`
+            Dataframe containing the trades, sorted by date.
+        end_date : `pd.Timestamp`
+            End date of the portfolio history.
+
+        Returns
+        -------
+        `tuple`
+            Portfolio timeseries dataframe and holdings as of date dataframe.
+        """
+        n_days = len(self.date_index)
+        starting_cash = self.portfolio.cash
+        fills = self._replay_trades(trades, self._assign_trade_days(trades))
+
+        asset_fills = ~np.isin(fills['symbols'], ("SUBSCRIPTION", "WITHDRAWAL"))
+        symbols = list(dict.fromkeys(fills['symbols'][asset_fills]))
+        prices, available = self._price_matrix(symbols)
+
+        day_range = np.arange(n_days)
+        state_end = np.full((n_days, len(symbols), 6), np.nan)
+        state_pre = np.full((n_days, len(symbols), 6), np.nan)
+        held_end = np.zeros((n_days, len(symbols)), dtype=bool)
+        held_pre = np.zeros((n_days, len(symbols)), dtype=bool)
+        event_price = np.full((n_days, len(symbols)), np.nan)
+        event_mask = np.zeros((n_days, len(symbols)), dtype=bool)
+        fill_mask = np.zeros((n_days, len(symbols)), dtype=bool)
+
+        for j, symbol in enumerate(symbols):
+            fill_idx = np.flatnonzero(fills['symbols'] == symbol)
+            fill_days = fills['days'][fill_idx]
+
+            # Last fill on or before each day, and strictly before each day
+            last_end = np.searchsorted(fill_days, day_range, side='right') - 1
+            last_pre = np.searchsorted(fill_days, day_range, side='left') - 1
+            held_end[:, j] = last_end >= 0
+            held_pre[:, j] = last_pre >= 0
+            state_end[held_end[:, j], j] = fills['state'][fill_idx[last_end[held_end[:, j]]]]
+            state_pre[held_pre[:, j], j] = fills['state'][fill_idx[last_pre[held_pre[:, j]]]]
+
+            # Existing positions are marked to market before the day's fills,
+            # the fills then set the price of the traded positions
+            marked = held_pre[:, j] & available[:, j]
+            event_price[marked, j] = prices[marked, j]
+            event_mask[marked, j] = True
+            priced = fills['price_set'][fill_idx]
+            event_price[fill_days[priced], j] = fills['fill_price'][fill_idx[priced]]
+            event_mask[fill_days[priced], j] = True
+            fill_mask[fill_days[priced], j] = True
+
+        # Forward fill the latest price event of each symbol
+        last_event = np.where(event_mask, day_range[:, None], -1)
+        last_event = np.maximum.accumulate(last_event, axis=0)
+        current_price = np.where(
+            last_event >= 0, np.take_along_axis(event_price, np.maximum(last_event, 0), axis=0), np.nan
+        )
+
+        self._mark_final_prices(symbols, current_price, last_event, fill_mask)
+
+        end_metrics = self._position_metrics(state_end, current_price)
+        total_mv = np.where(held_end, end_metrics['market_value'], 0.0).sum(axis=1)
+        total_rpl = np.where(held_end, end_metrics['realised_pnl'], 0.0).sum(axis=1)
+        total_upl = np.where(held_end, end_metrics['unrealised_pnl'], 0.0).sum(axis=1)
+        total_pnl = np.where(held_end, end_metrics['total_pnl'], 0.0).sum(axis=1)
+
+        last_cash = np.searchsorted(fills['days'], day_range, side='right') - 1
+        cash = np.where(last_cash >= 0, fills['cash'][np.maximum(last_cash, 0)], starting_cash)
+
+        portfolio_timeseries = pd.DataFrame({
+            'Date': self.date_index, 'Total Equity': total_mv + cash, 'Total Market Value': total_mv,
+            'Total RPL': total_rpl, 'Total UPL': total_upl, 'Total PNL': total_pnl
+        }, columns=self.timeseries_columns)
+
+        holdings = pd.DataFrame(columns=self.position_columns)
+        if n_days and self.date_index[-1] == end_date:
+            marked = held_pre[-1] & available[-1]
+            pre_metrics = self._position_metrics(state_pre[-1, marked], prices[-1, marked])
+            holdings = pd.DataFrame({
+                'Symbol': np.array(symbols, dtype=object)[marked],
+                'Quantity': pre_metrics['quantity'],
+                'Market Price': prices[-1, marked],
+                'Market Value': pre_metrics['market_value'],
+                'Avg Price': pre_metrics['avg_price'],
+                'Total Cost': pre_metrics['net_incl_commission'],
+                'Unrealized PL': pre_metrics['unrealised_pnl'],
+                'Realized PL': pre_metrics['realised_pnl'],
+                'Total PL': pre_metrics['total_pnl'],
+                'Holding Date': self.date_index[-1]
+            }, columns=self.position_columns)
+
+        return portfolio_timeseries, holdings
+
@@ -0,0 +1,136 @@
+import threading
+
+import pandas as pd
+
+from Infrastructure import settings
+from Infrastructure.Utilities.data_sourcer import fetch_prices
+from Infrastructure.Utilities.price_cache import PriceCache
+from Infrastructure.Utilities.price_providers import get_price_provider
+
+
+class BenchmarkPrices:
+    """
+    In-memory store of the prices of a fixed set of benchmark tickers. The
+    tickers are always fetched together, in one request through the price
+    cache if the provider is cacheable, so switching benchmarks is served
+    from memory.
+
+    Requests outside the stored date range extend it: an earlier start
+    refetches the whole range, a later end only the new dates, starting
+    from the previous end date as its close may have been provisional.
+    The store is shared by the portfolio workers, access is serialised.
+
+    Parameters
+    ----------
+    tickers : `list`
+        Benchmark ticker symbols.
+    provider : `PriceProvider`, optional
+        Price provider. Defaults to the one configured in settings.
+    cache : `PriceCache`, optional
+        Local price store used for cacheable providers. Created on the first fetch when omitted.
+    """
+
+    def __init__(self, tickers, provider=None, cache=None):
+        self.tickers = list(tickers)
+        self.provider = provider if provider is not None else get_price_provider()
+        self.cache = cache
+        self.prices = None
+        self.start = None
+        self.end = None
+        self.shared = False
+        self._lock = threading.Lock()
+
+    def __reduce_ex__(self, protocol):
+        # A session store sent to another process, e.g. with a constructor computed by a batch worker, resolves to
+        # the session store of that process
+        if self.shared:
+            return session_benchmark_prices, (self.tickers,)
+        return super().__reduce_ex__(protocol)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _fetch(self, start, end):
+        if self.cache is None and self.provider.cacheable:
+            self.cache = PriceCache()
+        return fetch_prices(self.provider, self.tickers, start, end, cache=self.cache)
+
+    def prefetch(self, start, end):
+        """
+        Makes sure the prices of every ticker are stored from start to end.
+
+        Parameters
+        ----------
+        start : `pd.Timestamp`
+            First date.
+        end : `pd.Timestamp`
+            Last date.
+        """
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        with self._lock:
+            if self.prices is None or start < self.start:
+                end = end if self.end is None else max(end, self.end)
+                self.prices = self._fetch(start, end).reindex(columns=self.tickers)
+                self.start, self.end = start, end
+            elif end > self.end:
+                refresh_from = self.end.normalize()
+                new_prices = self._fetch(refresh_from, end).reindex(columns=self.tickers)
+                self.prices = pd.concat([self.prices.loc[self.prices.index < refresh_from], new_prices])
+                self.end = end
+
+    def get_prices(self, ticker, start, end):
+        """
+        Returns the prices of a benchmark, fetching them with the other
+        benchmarks if the range is not stored yet.
+
+        Parameters
+        ----------
+        ticker : `str`
+            Benchmark ticker symbol.
+        start : `pd.Timestamp`
+            First date.
+        end : `pd.Timestamp`
+            Last date.
+
+        Returns
+        -------
+        `pd.Series`
+            Prices indexed by date.
+        """
+        self.prefetch(start, end)
+        with self._lock:
+            prices = self.prices[ticker]
+        return prices.loc[prices.index <= pd.Timestamp(end)]
+
+
+_session_stores = {}
+_session_lock = threading.Lock()
+
+
+def session_benchmark_prices(tickers):
+    """
+    Returns the benchmark store of the session for the price provider
+    configured in settings, creating it on first use.
+
+    Parameters
+    ----------
+    tickers : `list`
+        Benchmark ticker symbols.
+
+    Returns
+    -------
+    `BenchmarkPrices`
+        Store shared by every caller using the configured provider.
+    """
+    key = (tuple(tickers),) + tuple(sorted(settings.PRICE_PROVIDER.items()))
+    with _session_lock:
+        if key not in _session_stores:
+            _session_stores[key] = BenchmarkPrices(tickers)
+            _session_stores[key].shared = True
+        return _session_stores[key]
@@ -1,30 +1,474 @@
+"""
+NumPy kernels of the portfolio statistics.
+
+Every kernel takes returns as an array of shape (periods,) or (periods, series)
+and reduces along the first axis, so many portfolios, or many windows of one
+portfolio (see rolling_windows), are evaluated in a single call. A 1-D input
+gives a float, a 2-D input an array with one value per column. NaN and inf
+returns are treated as missing, and compound as zero returns.
+
+The kernels follow the definitions of quantstats and empyrical, which the
+tests validate them against.
+"""
+import functools
+from statistics import NormalDist
+
 import numpy as np
-import quantstats as qs
+import pandas as pd
+
+
+def _as_matrix(values):
+    values = np.asarray(values, dtype=np.float64)
+    one_dim = values.ndim == 1
+    if one_dim:
+        values = values[:, np.newaxis]
+    return np.where(np.isfinite(values), values, np.nan), one_dim
+
+
+def _kernel(function):
+    """
+    Wraps a kernel written for 2-D returns (and benchmark) matrices so it
+    also accepts 1-D series, and silences the float errors of flat or short
+    series, which are reported as inf or NaN.
+    """
+    @functools.wraps(function)
+    def wrapper(returns, *args, **kwargs):
+        returns, one_dim = _as_matrix(returns)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = np.asarray(function(returns, *args, **kwargs), dtype=np.float64)
+        if not one_dim:
+            return result
+        return result[:, 0] if result.ndim == 2 else result.item()
+    return wrapper
+
+
+def _paired(returns, benchmark):
+    """
+    Broadcasts the benchmark against the returns and masks the periods where either is missing.
+    """
+    benchmark = np.asarray(benchmark, dtype=np.float64)
+    if benchmark.ndim == 1:
+        benchmark = benchmark[:, np.newaxis]
+    benchmark = np.broadcast_to(np.where(np.isfinite(benchmark), benchmark, np.nan), returns.shape)
+    missing = np.isnan(returns) | np.isnan(benchmark)
+    return np.where(missing, np.nan, returns), np.where(missing, np.nan, benchmark)
+
+
+def _excess(returns, rf, periods):
+    if rf == 0:
+        return returns
+    return returns - (np.power(1 + rf, 1.0 / periods) - 1.0)
+
+
+def _count(returns):
+    return (~np.isnan(returns)).sum(axis=0)
+
+
+def rolling_windows(returns, window):
+    """
+    Stacks every window of a return series as the columns of a matrix, a
+    view of shape (window, periods - window + 1), so a kernel evaluates a
+    rolling statistic in one call.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    return np.lib.stride_tricks.sliding_window_view(returns, window, axis=0).T
+
 
+@_kernel
+def comp(returns):
+    """
+    Total compounded return.
+    """
+    return np.nanprod(1.0 + returns, axis=0) - 1.0
+
+
+@_kernel
+def cagr(returns, periods=252):
+    """
+    Compound annual growth rate, counting `periods` returns per year.
+    """
+    wealth = comp(returns) + 1.0
+    return np.where(wealth < 0, np.nan, np.abs(wealth) ** (periods / _count(returns)) - 1.0)
+
+
+@_kernel
+def expected_return(returns, groups=None):
+    """
+    Geometric mean return per period, or per group of periods when the
+    group (e.g. month) of every period is given.
+    """
+    observations = _count(returns) if groups is None else len(np.unique(groups))
+    return (comp(returns) + 1.0) ** (1.0 / observations) - 1.0
+
+
+@_kernel
+def volatility(returns, periods=252):
+    """
+    Annualised standard deviation of the returns.
+    """
+    return np.nanstd(returns, axis=0, ddof=1) * np.sqrt(periods)
+
+
+@_kernel
+def sharpe(returns, rf=0.0, periods=252):
+    """
+    Annualised Sharpe ratio, rf is an annual risk-free rate.
+    """
+    returns = _excess(returns, rf, periods)
+    return np.nanmean(returns, axis=0) / np.nanstd(returns, axis=0, ddof=1) * np.sqrt(periods)
+
+
+@_kernel
+def sortino(returns, rf=0.0, periods=252):
+    """
+    Annualised Sortino ratio, the mean return over the downside deviation.
+    """
+    returns = _excess(returns, rf, periods)
+    downside = np.sqrt(np.nansum(np.where(returns < 0, returns ** 2, 0.0), axis=0) / _count(returns))
+    return np.where(downside == 0, np.nan, np.nanmean(returns, axis=0) / downside * np.sqrt(periods))
 
+
+@_kernel
 def omega(returns, rf=0.0, required_return=0.0, periods=252):
     """
     Determines the Omega ratio of a strategy.
     See https://en.wikipedia.org/wiki/Omega_ratio for more details.
     """
-    if len(returns) < 2:
-        return np.nan
-
     if required_return <= -1:
-        return np.nan
-
-    returns = qs.utils._prepare_returns(returns, rf, periods)
+        return np.full(returns.shape[1], np.nan)
 
     if periods == 1:
         return_threshold = required_return
     else:
         return_threshold = (1 + required_return) ** (1.0 / periods) - 1
 
-    returns_less_thresh = returns - return_threshold
-    numer = returns_less_thresh[returns_less_thresh > 0.0].sum()
-    denom = -1.0 * returns_less_thresh[returns_less_thresh < 0.0].sum()
+    returns_less_thresh = _excess(returns, rf, periods) - return_threshold
+    numer = np.nansum(np.where(returns_less_thresh > 0.0, returns_less_thresh, 0.0), axis=0)
+    denom = -1.0 * np.nansum(np.where(returns_less_thresh < 0.0, returns_less_thresh, 0.0), axis=0)
+
+    return np.where((denom > 0.0) & (_count(returns) > 1), numer / denom, np.nan)
+
+
+@_kernel
+def win_rate(returns):
+    """
+    Share of the non-zero returns that are positive, 0 if all are zero.
+    """
+    wins = (returns > 0).sum(axis=0)
+    non_zero = wins + (returns < 0).sum(axis=0)
+    return np.where(non_zero > 0, wins / np.maximum(non_zero, 1), 0.0)
+
+
+@_kernel
+def avg_win(returns):
+    """
+    Mean of the positive returns.
+    """
+    return np.nanmean(np.where(returns > 0, returns, np.nan), axis=0)
+
+
+@_kernel
+def avg_loss(returns):
+    """
+    Mean of the negative returns.
+    """
+    return np.nanmean(np.where(returns < 0, returns, np.nan), axis=0)
+
+
+@_kernel
+def payoff_ratio(returns):
+    """
+    Average win over the absolute average loss.
+    """
+    losses = avg_loss(returns)
+    return np.where(losses == 0, np.nan, avg_win(returns) / np.abs(losses))
+
+
+@_kernel
+def profit_factor(returns):
+    """
+    Sum of the gains over the absolute sum of the losses.
+    """
+    wins = np.nansum(np.where(returns >= 0, returns, 0.0), axis=0)
+    losses = np.abs(np.nansum(np.where(returns < 0, returns, 0.0), axis=0))
+    return np.where(losses == 0, np.where(wins == 0, 0.0, np.inf), wins / losses)
+
+
+@_kernel
+def kelly_criterion(returns):
+    """
+    Kelly fraction p - q / b of the win rate p and the payoff ratio b.
+    """
+    payoff, wins = payoff_ratio(returns), win_rate(returns)
+    return np.where(payoff == 0, np.nan, (payoff * wins - (1.0 - wins)) / payoff)
+
+
+@_kernel
+def cpc_index(returns):
+    """
+    Profit factor x win rate x payoff ratio.
+    """
+    return profit_factor(returns) * win_rate(returns) * payoff_ratio(returns)
+
+
+@_kernel
+def outlier_win_ratio(returns, quantile=0.99):
+    """
+    High quantile of the returns over the mean non-negative return.
+    """
+    gains = np.nanmean(np.where(returns >= 0, returns, np.nan), axis=0)
+    return np.where(gains == 0, np.nan, np.nanquantile(returns, quantile, axis=0) / gains)
+
+
+@_kernel
+def outlier_loss_ratio(returns, quantile=0.01):
+    """
+    Low quantile of the returns over the mean negative return.
+    """
+    losses = avg_loss(returns)
+    return np.where(losses == 0, np.nan, np.nanquantile(returns, quantile, axis=0) / losses)
+
+
+@_kernel
+def tail_ratio(returns, cutoff=0.95):
+    """
+    Absolute ratio of the right tail quantile to the left tail quantile.
+    """
+    upper, lower = np.nanquantile(returns, [cutoff, 1 - cutoff], axis=0)
+    return np.where(lower == 0, np.nan, np.abs(upper / lower))
+
+
+@_kernel
+def value_at_risk(returns, sigma=1, confidence=0.95):
+    """
+    Parametric (normal) value at risk.
+    """
+    return np.nanmean(returns, axis=0) + sigma * np.nanstd(returns, axis=0, ddof=1) * \
+        NormalDist().inv_cdf(1 - confidence)
+
+
+@_kernel
+def conditional_value_at_risk(returns, sigma=1, confidence=0.95):
+    """
+    Parametric (normal) expected shortfall.
+    """
+    alpha = 1 - confidence
+    mean, std = np.nanmean(returns, axis=0), sigma * np.nanstd(returns, axis=0, ddof=1)
+    normal = NormalDist()
+    shortfall = mean - std * normal.pdf(normal.inv_cdf(alpha)) / alpha
+    return np.where((std == 0) | np.isnan(std), mean, shortfall)
+
+
+@_kernel
+def risk_of_ruin(returns):
+    """
+    Likelihood of losing all capital given the win rate.
+    """
+    wins = win_rate(returns)
+    return ((1.0 - wins) / (1.0 + wins)) ** _count(returns)
+
+
+def _central_moments(returns):
+    deviations = returns - np.nanmean(returns, axis=0)
+    count = _count(returns).astype(np.float64)
+    m2 = np.nansum(deviations ** 2, axis=0)
+    # Constant series have no skewness or kurtosis, m2 is floating point noise
+    flat = m2 <= (np.finfo(np.float64).eps * np.nanmax(np.abs(returns), axis=0)) ** 2 * count
+    return deviations, count, m2, flat
+
+
+@_kernel
+def skew(returns):
+    """
+    Sample skewness, adjusted for bias as pandas does.
+    """
+    deviations, n, m2, flat = _central_moments(returns)
+    m3 = np.nansum(deviations ** 3, axis=0)
+    return np.where(flat, 0.0, n * np.sqrt(n - 1) / (n - 2) * m3 / m2 ** 1.5)
+
+
+@_kernel
+def kurtosis(returns):
+    """
+    Sample excess kurtosis, adjusted for bias as pandas does.
+    """
+    deviations, n, m2, flat = _central_moments(returns)
+    m4 = np.nansum(deviations ** 4, axis=0)
+    return np.where(flat, 0.0, n * (n + 1) * (n - 1) * m4 / ((n - 2) * (n - 3) * m2 ** 2)
+                    - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3)))
+
+
+@_kernel
+def to_drawdown_series(returns):
+    """
+    Drawdown of the compounded wealth from its highest value so far,
+    starting from an initial wealth of 1.
+    """
+    wealth = np.cumprod(1.0 + np.nan_to_num(returns), axis=0)
+    return wealth / np.maximum.accumulate(np.maximum(wealth, 1.0), axis=0) - 1.0
+
+
+@_kernel
+def max_drawdown(returns):
+    """
+    Deepest drawdown, 0 if the wealth never falls below a previous peak.
+    """
+    return to_drawdown_series(returns).min(axis=0)
+
+
+def drawdown_details(drawdown, dates=None):
+    """
+    Details of every period spent below a previous peak: first, deepest and
+    last row, length and deepest drawdown. Lengths are in calendar days when
+    the dates of the rows are given, in rows otherwise.
+
+    Parameters
+    ----------
+    drawdown : `np.ndarray`
+        Drawdown series of shape (periods,) or (periods, series), see to_drawdown_series.
+    dates : `pd.DatetimeIndex`, optional
+        Dates of the rows.
+
+    Returns
+    -------
+    `pd.DataFrame` or `list`
+        Dataframe with the 'start', 'valley', 'end', 'days' and 'max drawdown' columns, one per column of a 2-D
+        drawdown.
+    """
+    drawdown = np.asarray(drawdown, dtype=np.float64)
+    if drawdown.ndim == 2:
+        return [drawdown_details(drawdown[:, col], dates) for col in range(drawdown.shape[1])]
+
+    in_drawdown = np.concatenate([[False], drawdown < 0, [False]])
+    edges = np.flatnonzero(np.diff(in_drawdown.astype(np.int8)))
+    starts, ends = edges[::2], edges[1::2] - 1
 
-    if denom > 0.0:
-        return numer / denom
+    if dates is None:
+        days = ends - starts + 1
+    else:
+        dates = pd.DatetimeIndex(dates)
+        days = (dates[ends] - dates[starts]).days.to_numpy() + 1
+
+    return pd.DataFrame({
+        'start': starts,
+        'valley': [start + np.argmin(drawdown[start:end + 1]) for start, end in zip(starts, ends)],
+        'end': ends,
+        'days': np.asarray(days, dtype=np.int64),
+        'max drawdown': np.minimum.reduceat(drawdown, starts) if len(starts) else np.zeros(0)
+    })
+
+
+@_kernel
+def calmar(returns, periods=252, max_dd=None):
+    """
+    CAGR over the absolute maximum drawdown. The maximum drawdown can be
+    passed when it is already known.
+    """
+    max_dd = max_drawdown(returns) if max_dd is None else max_dd
+    return cagr(returns, periods) / np.abs(max_dd)
 
-    return np.nan
+
+@_kernel
+def recovery_factor(returns, max_dd=None):
+    """
+    Absolute sum of the returns over the absolute maximum drawdown.
+    """
+    max_dd = max_drawdown(returns) if max_dd is None else max_dd
+    return np.where(max_dd == 0, np.nan, np.abs(np.nansum(returns, axis=0) / max_dd))
+
+
+@_kernel
+def beta(returns, benchmark):
+    """
+    Beta of the returns to the benchmark returns.
+    """
+    returns, benchmark = _paired(returns, benchmark)
+    residual = benchmark - np.nanmean(benchmark, axis=0)
+    variance = np.nanmean(residual ** 2, axis=0)
+    return np.where(variance < 1e-30, np.nan, np.nanmean(residual * returns, axis=0) / variance)
+
+
+@_kernel
+def alpha(returns, benchmark, periods=252, _beta=None):
+    """
+    Annualised alpha of the returns to the benchmark returns.
+    """
+    factor = beta(returns, benchmark) if _beta is None else _beta
+    returns, benchmark = _paired(returns, benchmark)
+    result = (1.0 + np.nanmean(returns - factor * benchmark, axis=0)) ** periods - 1.0
+    return np.where(_count(returns) < 2, np.nan, result)
+
+
+def alpha_beta(returns, benchmark, periods=252):
+    """
+    Annualised alpha and beta of the returns to the benchmark returns.
+    """
+    factor = beta(returns, benchmark)
+    return alpha(returns, benchmark, periods, _beta=factor), factor
+
+
+@_kernel
+def information_ratio(returns, benchmark):
+    """
+    Mean active return over the tracking error, 0 without tracking error.
+    """
+    active = np.subtract(*_paired(returns, benchmark))
+    tracking_error = np.nanstd(active, axis=0, ddof=1)
+    return np.where(tracking_error == 0, 0.0, np.nanmean(active, axis=0) / tracking_error)
+
+
+@_kernel
+def treynor_ratio(returns, benchmark, rf=0.0):
+    """
+    Total compounded return in excess of rf over beta, 0 if beta is 0 or undefined.
+    """
+    factor = np.nan_to_num(beta(returns, benchmark))
+    return np.where(factor == 0, 0.0, (comp(returns) - rf) / factor)
+
+
+@_kernel
+def r_squared(returns, benchmark):
+    """
+    Squared correlation of the returns and the benchmark returns.
+    """
+    returns, benchmark = _paired(returns, benchmark)
+    returns = returns - np.nanmean(returns, axis=0)
+    benchmark = benchmark - np.nanmean(benchmark, axis=0)
+    return np.nansum(returns * benchmark, axis=0) ** 2 / \
+        (np.nansum(returns ** 2, axis=0) * np.nansum(benchmark ** 2, axis=0))
+
+
+def _capture(returns, benchmark, periods, up):
+    returns, benchmark = _paired(returns, benchmark)
+    selected = benchmark > 0 if up else benchmark < 0
+    count = selected.sum(axis=0)
+
+    def annual_return(values):
+        return np.prod(np.where(selected, 1.0 + values, 1.0), axis=0) ** (periods / count) - 1.0
+
+    return annual_return(returns) / annual_return(benchmark)
+
+
+@_kernel
+def up_capture(returns, benchmark, periods=252):
+    """
+    Annualised return over the annualised benchmark return, on the periods the benchmark rose.
+    """
+    return _capture(returns, benchmark, periods, up=True)
+
+
+@_kernel
+def down_capture(returns, benchmark, periods=252):
+    """
+    Annualised return over the annualised benchmark return, on the periods the benchmark fell.
+    """
+    return _capture(returns, benchmark, periods, up=False)
+
+
+@_kernel
+def batting_average(returns, benchmark):
+    """
+    Share of the periods in which the returns beat the benchmark returns.
+    """
+    returns, benchmark = _paired(returns, benchmark)
+    return (returns > benchmark).sum(axis=0) / _count(returns)
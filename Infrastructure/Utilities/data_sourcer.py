@@ -1,29 +1,216 @@
-import yfinance as yf
+import copy
+
+import numpy as np
 import pandas as pd
 from Infrastructure.Utilities.business_day_check import BDay
+from Infrastructure.Utilities.price_cache import PriceCache
+from Infrastructure.Utilities.price_providers import get_price_provider
 
 # 2LX41QJP5T79I4MF - Alpha vantage API key
 
 
 class PriceDataSource:
-    def __init__(self, trade_dataframe, as_of_date):
+    """
+    Price history of the traded symbols, exposed both as a dataframe and as
+    a dense float64 matrix of dates x symbols for fast lookups.
+
+    The matrix has one extra trailing row and column filled with NaN, so a
+    date row or symbol column of -1 (not found) resolves to NaN.
+    """
+
+    def __init__(self, trade_dataframe, as_of_date, cache=None, provider=None):
         self.trade_dataframe = trade_dataframe
         self.as_of_date = as_of_date
+        self.cache = cache
+        self.provider = provider if provider is not None else get_price_provider()
         self.history = self.get_price_history()
 
+        self.dates = None
+        self.symbols = None
+        self.date_map = None
+        self.symbol_map = None
+        self.prices = None
+        self.build_price_matrix()
+
     def get_price_history(self, adjusted=True):
         tickers = self.trade_dataframe["Symbol"].unique()
         tickers = [ticker for ticker in tickers.tolist() if ticker not in ('SUBSCRIPTION', 'WITHDRAWAL')]
         start_date = self.trade_dataframe["Date"].min()
-        start_date = start_date.strftime("%Y-%m-%d")
-        prices = yf.download(tickers, start=start_date, end=self.as_of_date + BDay(1))
 
-        if adjusted:
-            return prices["Adj Close"]
-        else:
-            return prices["Close"]
+        return self.fetch_prices(tickers, start_date, self.as_of_date, adjusted)
+
+    def fetch_prices(self, tickers, start_date, end_date, adjusted=True):
+        """
+        Fetches prices from the provider, through the price cache if the provider is cacheable.
+        """
+        if self.cache is None and self.provider.cacheable:
+            self.cache = PriceCache()
+        return fetch_prices(self.provider, tickers, start_date, end_date, adjusted, self.cache)
+
+    def extend(self, as_of_date, adjusted=True):
+        """
+        Extends the price history to a later as of date, fetching only the new dates. The bar of the previous as
+        of date is fetched again, as it may have been a provisional close.
+
+        Parameters
+        ----------
+        as_of_date : `pd.Timestamp`
+            New last date of the price history.
+        adjusted : `bool`, optional
+            Adjusted or raw closing prices.
+        """
+        if as_of_date <= self.as_of_date:
+            return
+
+        refresh_from = pd.Timestamp(self.as_of_date).normalize()
+        new_prices = self.fetch_prices(self.symbols, refresh_from, as_of_date, adjusted)
+        history = self.history.to_frame() if isinstance(self.history, pd.Series) else self.history
+
+        self.history = pd.concat([history.loc[history.index < refresh_from],
+                                  new_prices.reindex(columns=history.columns)])
+        self.as_of_date = as_of_date
+        self.build_price_matrix()
+
+    def subset(self, trade_dataframe):
+        """
+        Returns the prices of the symbols traded in a trade dataframe from its first trade date, e.g. the part of
+        prices shared by several portfolios one of them needs, without fetching anything.
+
+        Parameters
+        ----------
+        trade_dataframe : `pd.DataFrame`
+            Trades, whose symbols are all in the price history.
+
+        Returns
+        -------
+        `PriceDataSource`
+            Price history of the traded symbols.
+        """
+        tickers = [ticker for ticker in trade_dataframe["Symbol"].unique().tolist()
+                   if ticker not in ('SUBSCRIPTION', 'WITHDRAWAL')]
+        history = self.history.to_frame() if isinstance(self.history, pd.Series) else self.history
+        start_date = pd.Timestamp(trade_dataframe["Date"].min()).normalize()
+
+        source = copy.copy(self)
+        source.trade_dataframe = trade_dataframe
+        source.history = history.loc[history.index >= start_date, tickers]
+        source.build_price_matrix()
+        return source
+
+    def build_price_matrix(self):
+        """
+        Builds the dense price matrix and the date -> row and symbol -> column
+        maps from the price history.
+        """
+        history = self.history
+        if isinstance(history, pd.Series):
+            history = history.to_frame()
+
+        self.dates = pd.DatetimeIndex(history.index)
+        self.symbols = list(history.columns)
+        self.date_map = {date: row for row, date in enumerate(self.dates)}
+        self.symbol_map = {symbol: col for col, symbol in enumerate(self.symbols)}
+
+        self.prices = np.full((len(self.dates) + 1, len(self.symbols) + 1), np.nan)
+        self.prices[:-1, :-1] = history.to_numpy(dtype=np.float64, na_value=np.nan)
+
+    def date_row(self, date):
+        """
+        Returns the matrix row of a date, -1 if there are no prices on it.
+        """
+        return self.date_map.get(date, -1)
+
+    def symbol_columns(self, symbols):
+        """
+        Returns the matrix columns of the symbols, -1 for unknown symbols.
+        """
+        return np.array([self.symbol_map.get(symbol, -1) for symbol in symbols], dtype=np.int64)
+
+    def prices_for(self, date_idx, symbol_idxs):
+        """
+        Bulk price lookup.
+
+        Parameters
+        ----------
+        date_idx : `int` or `np.ndarray`
+            Matrix row(s) of the dates.
+        symbol_idxs : `np.ndarray`
+            Matrix columns of the symbols.
+
+        Returns
+        -------
+        `np.ndarray`
+            Prices of the symbols, NaN where missing.
+        """
+        return self.prices[date_idx, symbol_idxs]
 
     def get_price_from_history(self, ticker, date):
-        if isinstance(self.history, pd.Series):
-            return self.history.loc[date]
-        return self.history.loc[date][ticker]
+        return self.prices[self.date_row(date), self.symbol_map.get(ticker, -1)]
+
+
+def fetch_prices(provider, tickers, start_date, end_date, adjusted=True, cache=None):
+    """
+    Fetches the prices of the tickers in one provider request, through the
+    price cache if the provider is cacheable. A cache is created when none
+    is given.
+    """
+    if not provider.cacheable:
+        return provider.get_history(tickers, start_date, end_date, adjusted)
+
+    cache = cache if cache is not None else PriceCache()
+    return cache.get_history(
+        tickers, start_date, end_date,
+        fetch=lambda symbols, start, end: provider.get_history(symbols, start, end, adjusted),
+        adjusted=adjusted
+    )
+
+
+def get_current_prices(symbols, date, provider=None, cache=None, lookback=10, adjusted=True):
+    """
+    Resolves the closing prices of many symbols on a date with a single
+    provider request covering the lookback window before it. A symbol
+    without a close on the date, e.g. on a holiday or a non-trading day,
+    gets its last close in the window and is reported as stale.
+
+    Parameters
+    ----------
+    symbols : `list`
+        Ticker symbols.
+    date : `pd.Timestamp`
+        Valuation date.
+    provider : `PriceProvider`, optional
+        Price provider. Defaults to the one configured in settings.
+    cache : `PriceCache`, optional
+        Price cache used for cacheable providers.
+    lookback : `int`, optional
+        Business days searched back for the last close.
+    adjusted : `bool`, optional
+        Adjusted or raw closing prices.
+
+    Returns
+    -------
+    `pd.DataFrame`
+        Indexed by symbol, with the 'Price', its 'Price Date' and whether it is 'Stale'. Price and date are missing
+        for symbols without a close in the window, which are stale too.
+    """
+    symbols = list(symbols)
+    provider = provider if provider is not None else get_price_provider()
+    date = pd.Timestamp(date).normalize()
+    history = fetch_prices(provider, symbols, date - BDay(lookback), date, adjusted, cache)
+    history = history.loc[history.index <= date].reindex(columns=symbols)
+
+    values = history.to_numpy(dtype=np.float64, na_value=np.nan)
+    available = ~np.isnan(values)
+    # Row of the last close of every symbol, -1 if it has none in the window
+    last_row = np.full(len(symbols), -1)
+    if len(values):
+        last_row = np.where(available.any(axis=0), len(values) - 1 - np.argmax(available[::-1], axis=0), -1)
+    dates = pd.DatetimeIndex(history.index).append(pd.DatetimeIndex([pd.NaT]))
+    prices = np.append(values, np.full((1, len(symbols)), np.nan), axis=0)
+
+    current = pd.DataFrame({
+        'Price': prices[last_row, np.arange(len(symbols))],
+        'Price Date': dates[last_row]
+    }, index=pd.Index(symbols, name='Symbol'))
+    current['Stale'] = (current['Price Date'] != date).to_numpy()
+    return current
@@ -0,0 +1,80 @@
+"""
+Level of detail reduction of long series for charts. A chart can not show
+more than a couple of points per pixel column, so series are reduced to the
+minimum and maximum of every bucket of points falling in one pixel column.
+Unlike averaging or striding, the drawn line keeps every peak and trough,
+e.g. the bottom of a drawdown, and looks the same as the full series.
+"""
+import numpy as np
+
+
+def minmax_indices(values, buckets):
+    """
+    Positions of the points kept when reducing values to the minimum and
+    maximum of each of buckets equal runs of points, plus the first and last
+    point, in increasing order. Missing values are only kept for buckets
+    without any other value, so gaps in a line stay visible.
+
+    Parameters
+    ----------
+    values : `np.ndarray`
+        Values of shape (points,).
+    buckets : `int`
+        Number of buckets, e.g. the width of the chart in pixels.
+
+    Returns
+    -------
+    `np.ndarray`
+        At most 2 * buckets + 2 positions. Every position when there are not
+        more points than that.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    count = len(values)
+    buckets = max(int(buckets), 1)
+    if count <= 2 * buckets + 2:
+        return np.arange(count)
+
+    size = -(-count // buckets)
+    buckets = -(-count // size)
+    padding = buckets * size - count
+
+    missing = np.isnan(values)
+    low = np.concatenate([np.where(missing, np.inf, values), np.full(padding, np.inf)]).reshape(buckets, size)
+    high = np.concatenate([np.where(missing, -np.inf, values), np.full(padding, -np.inf)]).reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+
+    indices = np.concatenate([[0], offsets + low.argmin(axis=1), offsets + high.argmax(axis=1), [count - 1]])
+    return np.unique(np.minimum(indices, count - 1))
+
+
+def downsample(x, y, buckets, start=None, end=None):
+    """
+    Reduces a series to the points drawn on a chart buckets pixels wide
+    showing x from start to end. The points just outside the range are kept
+    so the line runs to the edges of the chart.
+
+    Parameters
+    ----------
+    x : `np.ndarray`
+        Increasing x values of shape (points,).
+    y : `np.ndarray`
+        Values of shape (points,).
+    buckets : `int`
+        Width of the chart in pixels.
+    start : `float`, optional
+        First x value shown. Defaults to the first one.
+    end : `float`, optional
+        Last x value shown. Defaults to the last one.
+
+    Returns
+    -------
+    `tuple`
+        Reduced x and y arrays.
+    """
+    x, y = np.asarray(x), np.asarray(y)
+    first = 0 if start is None else max(int(np.searchsorted(x, start, side='left')) - 1, 0)
+    last = len(x) if end is None else min(int(np.searchsorted(x, end, side='right')) + 1, len(x))
+
+    x, y = x[first:last], y[first:last]
+    indices = minmax_indices(y, buckets)
+    return x[indices], y[indices]
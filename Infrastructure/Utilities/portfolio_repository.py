@@ -0,0 +1,335 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from Infrastructure import settings
+
+TRADE_COLUMNS = ['Symbol', 'Quantity', 'Price', 'Date', 'Commission']
+
+# Symbols of the trades that are subscriptions and withdrawals of funds, stored as cash flows
+CASH_FLOWS = ('SUBSCRIPTION', 'WITHDRAWAL')
+
+# Portfolio created when the repository is empty
+DEFAULT_PORTFOLIO = {'name': 'Main Portfolio', 'cash': 100000.0, 'start_date': '2022-01-01', 'currency': 'USD'}
+
+# Columns of the stored daily time series by the names of the returns series and portfolio timeseries columns
+TIMESERIES_COLUMNS = {
+    'Total Equity': 'total_equity',
+    'Ptf Returns': 'ptf_returns',
+    'Benchmark': 'benchmark',
+    'Bmk Returns': 'bmk_returns',
+    'Total Market Value': 'total_market_value',
+    'Total RPL': 'total_rpl',
+    'Total UPL': 'total_upl',
+    'Total PNL': 'total_pnl'
+}
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class PortfolioRepository:
+    """
+    Persistent store of the portfolios: their definition, trades, cash flows
+    and the daily time series of their last computation. Listing the
+    portfolios only reads their definitions, the trades of a portfolio are
+    read when it is opened.
+
+    Trades and cash flows are kept in the order they were added. Every write
+    of the trades of a portfolio increments its trades version and a stored
+    time series is only returned while it was computed from the current
+    version of the trades.
+
+    Parameters
+    ----------
+    directory : `str`, optional
+        Repository directory. Defaults to settings.PORTFOLIO_STORE['DIRECTORY'].
+    """
+
+    file_name = 'portfolios.sqlite'
+
+    def __init__(self, directory=None):
+        self.directory = directory if directory is not None else settings.PORTFOLIO_STORE['DIRECTORY']
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, self.file_name)
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS portfolios ('
+                'id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, cash REAL NOT NULL, start_date TEXT NOT NULL, '
+                'currency TEXT NOT NULL, trades_version INTEGER NOT NULL DEFAULT 0, timeseries_version INTEGER, '
+                'benchmark TEXT)'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS trades ('
+                'portfolio_id INTEGER NOT NULL, seq INTEGER NOT NULL, date TEXT NOT NULL, symbol TEXT NOT NULL, '
+                'quantity REAL NOT NULL, price REAL NOT NULL, commission REAL, PRIMARY KEY (portfolio_id, seq))'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS trades_date ON trades (portfolio_id, date)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cash_flows ('
+                'portfolio_id INTEGER NOT NULL, seq INTEGER NOT NULL, date TEXT NOT NULL, kind TEXT NOT NULL, '
+                'amount REAL NOT NULL, PRIMARY KEY (portfolio_id, seq))'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS cash_flows_date ON cash_flows (portfolio_id, date)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS timeseries ('
+                'portfolio_id INTEGER NOT NULL, date TEXT NOT NULL, '
+                + ''.join(f'{column} REAL, ' for column in TIMESERIES_COLUMNS.values())
+                + 'PRIMARY KEY (portfolio_id, date))'
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def portfolios(self):
+        """
+        Returns the definition of every stored portfolio, in the order they
+        were added.
+
+        Returns
+        -------
+        `list`
+            Dictionaries with the id, name, cash, start_date and currency of
+            the portfolios.
+        """
+        with self._connect() as conn:
+            rows = conn.execute('SELECT id, name, cash, start_date, currency FROM portfolios ORDER BY id').fetchall()
+        return [dict(zip(('id', 'name', 'cash', 'start_date', 'currency'), row)) for row in rows]
+
+    def add_portfolio(self, name, cash, start_date, currency):
+        """
+        Stores a new portfolio without trades.
+
+        Parameters
+        ----------
+        name : `str`
+            Name of the portfolio.
+        cash : `float`
+            Starting balance of the portfolio.
+        start_date : `str`
+            Starting date of the portfolio.
+        currency : `str`
+            Currency of the portfolio.
+
+        Returns
+        -------
+        `int`
+            Id of the portfolio.
+
+        Raises
+        ------
+        ValueError
+            If a portfolio with the same name is stored.
+        """
+        try:
+            with self._connect() as conn:
+                cursor = conn.execute('INSERT INTO portfolios (name, cash, start_date, currency) VALUES (?, ?, ?, ?)',
+                                      (name, float(cash), str(start_date), currency))
+        except sqlite3.IntegrityError as error:
+            raise ValueError(f"Portfolio '{name}' already exists") from error
+        return cursor.lastrowid
+
+    def delete_portfolio(self, portfolio_id):
+        """
+        Deletes a portfolio with its trades, cash flows and time series.
+        """
+        with self._connect() as conn:
+            for table in ('trades', 'cash_flows', 'timeseries'):
+                conn.execute(f'DELETE FROM {table} WHERE portfolio_id = ?', (portfolio_id,))
+            conn.execute('DELETE FROM portfolios WHERE id = ?', (portfolio_id,))
+
+    def trades_version(self, portfolio_id):
+        """
+        Returns the number of writes of the trades of a portfolio.
+        """
+        with self._connect() as conn:
+            return self._trades_version(conn, portfolio_id)
+
+    @staticmethod
+    def _trades_version(conn, portfolio_id):
+        row = conn.execute('SELECT trades_version FROM portfolios WHERE id = ?', (portfolio_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"No portfolio with id {portfolio_id}")
+        return row[0]
+
+    def load_trades(self, portfolio_id):
+        """
+        Reads the trades and cash flows of a portfolio, cash flows being
+        trades of the SUBSCRIPTION and WITHDRAWAL symbols with a zero price.
+
+        Parameters
+        ----------
+        portfolio_id : `int`
+            Id of the portfolio.
+
+        Returns
+        -------
+        `pd.DataFrame`
+            Trades with the columns of TRADE_COLUMNS, in the order they were
+            added. Symbols are categories and quantities integers if they all
+            are whole numbers.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT seq, symbol, quantity, price, date, commission FROM trades WHERE portfolio_id = ? '
+                'UNION ALL SELECT seq, kind, amount, 0.0, date, 0.0 FROM cash_flows WHERE portfolio_id = ? '
+                'ORDER BY seq',
+                (portfolio_id, portfolio_id)
+            ).fetchall()
+
+        trades = pd.DataFrame([row[1:] for row in rows], columns=TRADE_COLUMNS)
+        trades['Symbol'] = trades['Symbol'].astype('category')
+        for column in ('Quantity', 'Price', 'Commission'):
+            trades[column] = trades[column].astype(np.float64)
+        trades['Date'] = pd.to_datetime(trades['Date'], format='ISO8601')
+
+        quantity = trades['Quantity'].to_numpy()
+        if np.isfinite(quantity).all() and (quantity == np.round(quantity)).all():
+            trades['Quantity'] = quantity.astype(np.int64)
+        return trades
+
+    def save_trades(self, portfolio_id, trades):
+        """
+        Replaces the trades and cash flows of a portfolio.
+
+        Parameters
+        ----------
+        portfolio_id : `int`
+            Id of the portfolio.
+        trades : `pd.DataFrame`
+            Trades with the columns of TRADE_COLUMNS.
+
+        Returns
+        -------
+        `int`
+            New trades version of the portfolio.
+        """
+        with self._connect() as conn:
+            conn.execute('DELETE FROM trades WHERE portfolio_id = ?', (portfolio_id,))
+            conn.execute('DELETE FROM cash_flows WHERE portfolio_id = ?', (portfolio_id,))
+            return self._insert_trades(conn, portfolio_id, trades, 0)
+
+    def append_trades(self, portfolio_id, trades):
+        """
+        Adds trades after the stored trades and cash flows of a portfolio.
+
+        Parameters
+        ----------
+        portfolio_id : `int`
+            Id of the portfolio.
+        trades : `pd.DataFrame` or `list`
+            Trades with the columns of TRADE_COLUMNS, or lists of values in
+            that order.
+
+        Returns
+        -------
+        `int`
+            New trades version of the portfolio.
+        """
+        if not isinstance(trades, pd.DataFrame):
+            trades = pd.DataFrame(list(trades), columns=TRADE_COLUMNS)
+
+        with self._connect() as conn:
+            seq = conn.execute(
+                'SELECT MAX(seq) FROM (SELECT seq FROM trades WHERE portfolio_id = ? '
+                'UNION ALL SELECT seq FROM cash_flows WHERE portfolio_id = ?)',
+                (portfolio_id, portfolio_id)
+            ).fetchone()[0]
+            return self._insert_trades(conn, portfolio_id, trades, 0 if seq is None else seq + 1)
+
+    def _insert_trades(self, conn, portfolio_id, trades, first_seq):
+        version = self._trades_version(conn, portfolio_id) + 1
+        seqs = range(first_seq, first_seq + len(trades.index))
+        dates = pd.to_datetime(trades['Date']).dt.strftime(DATE_FORMAT).tolist()
+        symbols = trades['Symbol'].astype(str).tolist()
+        quantities = trades['Quantity'].astype(np.float64).tolist()
+        prices = trades['Price'].astype(np.float64).tolist()
+        commissions = trades['Commission'].astype(np.float64).tolist()
+
+        rows = list(zip(seqs, dates, symbols, quantities, prices, commissions))
+        conn.executemany(
+            'INSERT INTO trades VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [(portfolio_id, *row) for row in rows if row[2] not in CASH_FLOWS]
+        )
+        conn.executemany(
+            'INSERT INTO cash_flows VALUES (?, ?, ?, ?, ?)',
+            [(portfolio_id, *row[:4]) for row in rows if row[2] in CASH_FLOWS]
+        )
+        conn.execute('UPDATE portfolios SET trades_version = ? WHERE id = ?', (version, portfolio_id))
+        return version
+
+    def save_timeseries(self, portfolio_id, timeseries, benchmark, trades_version):
+        """
+        Replaces the stored daily time series of a portfolio.
+
+        Parameters
+        ----------
+        portfolio_id : `int`
+            Id of the portfolio.
+        timeseries : `pd.DataFrame`
+            Daily values indexed by date, with any of the TIMESERIES_COLUMNS
+            columns.
+        benchmark : `str`
+            Name of the benchmark of the 'Benchmark' and 'Bmk Returns'
+            columns.
+        trades_version : `int`
+            Trades version the time series was computed from.
+        """
+        values = timeseries.reindex(columns=list(TIMESERIES_COLUMNS)).astype(np.float64)
+        dates = pd.DatetimeIndex(values.index).strftime(DATE_FORMAT).tolist()
+        placeholders = ', '.join('?' * (len(TIMESERIES_COLUMNS) + 2))
+
+        with self._connect() as conn:
+            conn.execute('DELETE FROM timeseries WHERE portfolio_id = ?', (portfolio_id,))
+            conn.executemany(
+                f'INSERT INTO timeseries VALUES ({placeholders})',
+                [(portfolio_id, date, *row) for date, row in zip(dates, values.to_numpy().tolist())]
+            )
+            conn.execute('UPDATE portfolios SET timeseries_version = ?, benchmark = ? WHERE id = ?',
+                         (trades_version, benchmark, portfolio_id))
+
+    def load_timeseries(self, portfolio_id):
+        """
+        Reads the stored daily time series of a portfolio if it was computed
+        from its current trades.
+
+        Parameters
+        ----------
+        portfolio_id : `int`
+            Id of the portfolio.
+
+        Returns
+        -------
+        `tuple` or `None`
+            Time series indexed by date with the TIMESERIES_COLUMNS columns
+            and the name of its benchmark. None if no time series is stored
+            or the trades have changed since it was computed.
+        """
+        with self._connect() as conn:
+            row = conn.execute('SELECT trades_version, timeseries_version, benchmark FROM portfolios WHERE id = ?',
+                               (portfolio_id,)).fetchone()
+            if row is None or row[1] != row[0]:
+                return None
+
+            rows = conn.execute(
+                f'SELECT date, {", ".join(TIMESERIES_COLUMNS.values())} FROM timeseries WHERE portfolio_id = ? '
+                f'ORDER BY date',
+                (portfolio_id,)
+            ).fetchall()
+
+        if not rows:
+            return None
+        timeseries = pd.DataFrame([values[1:] for values in rows], columns=list(TIMESERIES_COLUMNS),
+                                  index=pd.to_datetime([values[0] for values in rows], format='ISO8601'),
+                                  dtype=np.float64)
+        timeseries.index.name = 'Date'
+        return timeseries, row[2]
@@ -0,0 +1,256 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+
+import pandas as pd
+
+from Infrastructure import settings
+from Infrastructure.Utilities.business_day_check import BDay
+
+
+class PriceCache:
+    """
+    Persistent store of daily closing prices keyed by symbol, date and the
+    adjusted flag. Requests are served from the store and only the dates it
+    does not cover yet are fetched from the price provider.
+
+    The last cached bar of a symbol may be a provisional close if it was
+    fetched on the same day. Such a tail is re-fetched once it is older than
+    the configured maximum age. In offline mode nothing is fetched and the
+    store is served as is.
+
+    Parameters
+    ----------
+    directory : `str`, optional
+        Cache directory. Defaults to settings.PRICE_CACHE['DIRECTORY'].
+    max_age_hours : `float`, optional
+        Age after which a provisional tail is refreshed. Defaults to
+        settings.PRICE_CACHE['MAX_AGE_HOURS'].
+    offline : `bool`, optional
+        Serve purely from the cache. Defaults to settings.PRICE_CACHE['OFFLINE'].
+    """
+
+    file_name = 'prices.sqlite'
+
+    def __init__(self, directory=None, max_age_hours=None, offline=None):
+        self.directory = directory if directory is not None else settings.PRICE_CACHE['DIRECTORY']
+        self.max_age_hours = max_age_hours if max_age_hours is not None else settings.PRICE_CACHE['MAX_AGE_HOURS']
+        self.offline = offline if offline is not None else settings.PRICE_CACHE['OFFLINE']
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, self.file_name)
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS prices ('
+                'symbol TEXT NOT NULL, adjusted INTEGER NOT NULL, date TEXT NOT NULL, price REAL, '
+                'PRIMARY KEY (symbol, adjusted, date))'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS coverage ('
+                'symbol TEXT NOT NULL, adjusted INTEGER NOT NULL, start TEXT NOT NULL, end TEXT NOT NULL, '
+                'fetched_at TEXT NOT NULL, PRIMARY KEY (symbol, adjusted))'
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _now():
+        return pd.Timestamp.now()
+
+    def coverage(self, symbol, adjusted=True):
+        """
+        Returns the cached date range of a symbol.
+
+        Parameters
+        ----------
+        symbol : `str`
+            Ticker symbol.
+        adjusted : `bool`, optional
+            Adjusted or raw closing prices.
+
+        Returns
+        -------
+        `tuple` or `None`
+            Start date, end date and fetch time of the cached range.
+        """
+        with self._connect() as conn:
+            return self._coverage(conn, symbol, adjusted)
+
+    @staticmethod
+    def _coverage(conn, symbol, adjusted):
+        row = conn.execute(
+            'SELECT start, end, fetched_at FROM coverage WHERE symbol = ? AND adjusted = ?',
+            (symbol, int(adjusted))
+        ).fetchone()
+
+        if row is None:
+            return None
+        return tuple(pd.Timestamp(value) for value in row)
+
+    def missing_ranges(self, symbol, start, end, adjusted=True):
+        """
+        Determines the date ranges of a request that have to be fetched.
+
+        Parameters
+        ----------
+        symbol : `str`
+            Ticker symbol.
+        start : `pd.Timestamp`
+            First date of the request.
+        end : `pd.Timestamp`
+            Last date of the request.
+        adjusted : `bool`, optional
+            Adjusted or raw closing prices.
+
+        Returns
+        -------
+        `list`
+            List of (start, end) tuples to fetch.
+        """
+        cached = self.coverage(symbol, adjusted)
+        if cached is None:
+            return [(start, end)]
+
+        cached_start, cached_end, fetched_at = cached
+        ranges = []
+        if start < cached_start:
+            ranges.append((start, cached_start - pd.Timedelta(days=1)))
+
+        provisional = cached_end >= fetched_at.normalize()
+        expired = self._now() - fetched_at > pd.Timedelta(hours=self.max_age_hours)
+        if provisional and expired and end >= cached_end:
+            ranges.append((cached_end, end))
+        elif end > cached_end:
+            ranges.append((cached_end + pd.Timedelta(days=1), end))
+
+        return ranges
+
+    def store(self, prices, start, end, adjusted=True):
+        """
+        Writes fetched prices to the cache and extends the covered range of
+        the fetched symbols. A range without business days, e.g. a weekend
+        tail, is covered even though it has no prices. Otherwise a symbol
+        without prices is taken as a failed download and left uncovered, so
+        it is retried.
+
+        Parameters
+        ----------
+        prices : `pd.DataFrame`
+            Prices indexed by date with one column per symbol.
+        start : `pd.Timestamp`
+            First date of the fetched range.
+        end : `pd.Timestamp`
+            Last date of the fetched range.
+        adjusted : `bool`, optional
+            Adjusted or raw closing prices.
+        """
+        now = self._now()
+        end = min(end, now.normalize())
+        rows = [
+            (symbol, int(adjusted), date.strftime('%Y-%m-%d'), float(price))
+            for symbol in prices.columns
+            for date, price in prices[symbol].dropna().items()
+        ]
+
+        # Providers return empty columns instead of raising on failed downloads
+        if len(pd.date_range(start, end, freq=BDay())):
+            fetched = prices.columns[prices.notna().any()]
+        else:
+            fetched = prices.columns
+
+        with self._connect() as conn:
+            conn.executemany('INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?)', rows)
+            for symbol in fetched:
+                cached = self._coverage(conn, symbol, adjusted)
+                new_start, new_end, fetched_at = start, end, now
+                if cached is not None:
+                    new_start, new_end = min(start, cached[0]), max(end, cached[1])
+                    # Only a fetch reaching the cached tail refreshes it
+                    if end < cached[1]:
+                        fetched_at = cached[2]
+                conn.execute(
+                    'INSERT OR REPLACE INTO coverage VALUES (?, ?, ?, ?, ?)',
+                    (symbol, int(adjusted), new_start.strftime('%Y-%m-%d'), new_end.strftime('%Y-%m-%d'),
+                     fetched_at.isoformat())
+                )
+
+    def load(self, symbols, start, end, adjusted=True):
+        """
+        Reads cached prices of the symbols between two dates.
+
+        Parameters
+        ----------
+        symbols : `list`
+            Ticker symbols.
+        start : `pd.Timestamp`
+            First date.
+        end : `pd.Timestamp`
+            Last date.
+        adjusted : `bool`, optional
+            Adjusted or raw closing prices.
+
+        Returns
+        -------
+        `pd.DataFrame`
+            Prices indexed by date with one column per symbol.
+        """
+        placeholders = ', '.join('?' * len(symbols))
+        with self._connect() as conn:
+            rows = conn.execute(
+                f'SELECT date, symbol, price FROM prices WHERE adjusted = ? AND symbol IN ({placeholders}) '
+                f'AND date BETWEEN ? AND ?',
+                (int(adjusted), *symbols, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))
+            ).fetchall()
+
+        frame = pd.DataFrame(rows, columns=['Date', 'Symbol', 'Price'])
+        frame['Date'] = pd.to_datetime(frame['Date'])
+        prices = frame.pivot(index='Date', columns='Symbol', values='Price').reindex(columns=list(symbols))
+        prices.columns.name = None
+        return prices.sort_index()
+
+    def get_history(self, symbols, start, end, fetch, adjusted=True):
+        """
+        Returns the price history of the symbols, fetching only the dates
+        missing from the cache.
+
+        Parameters
+        ----------
+        symbols : `list`
+            Ticker symbols.
+        start : `pd.Timestamp`
+            First date.
+        end : `pd.Timestamp`
+            Last date.
+        fetch : `callable`
+            Function (symbols, start, end) returning a price dataframe for
+            the inclusive date range.
+        adjusted : `bool`, optional
+            Adjusted or raw closing prices.
+
+        Returns
+        -------
+        `pd.DataFrame`
+            Prices indexed by date with one column per symbol.
+        """
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+
+        if not self.offline:
+            # Symbols missing the same date range are fetched in one request
+            requests = {}
+            for symbol in symbols:
+                for date_range in self.missing_ranges(symbol, start, end, adjusted):
+                    requests.setdefault(date_range, []).append(symbol)
+
+            for (fetch_start, fetch_end), fetch_symbols in requests.items():
+                prices = fetch(fetch_symbols, fetch_start, fetch_end)
+                prices = prices.reindex(columns=fetch_symbols)
+                self.store(prices, fetch_start, fetch_end, adjusted)
+
+        return self.load(symbols, start, end, adjusted)
@@ -0,0 +1,161 @@
+import os
+import zlib
+from abc import ABCMeta
+
+import numpy as np
+import pandas as pd
+
+from Infrastructure import settings
+from Infrastructure.Utilities.business_day_check import BDay
+
+
+class PriceProvider:
+    """
+    Generic source of daily closing prices. Every price request of the
+    application goes through a provider so the data source can be swapped
+    for a local or synthetic one.
+
+    Subclasses implement get_history, returning prices for an inclusive
+    date range indexed by date with one column per symbol.
+    """
+
+    __metaclass__ = ABCMeta
+
+    name = None
+    cacheable = False
+
+    def get_history(self, symbols, start_date, end_date, adjusted=True):
+        raise NotImplementedError("Should implement get_history()")
+
+
+class YahooPriceProvider(PriceProvider):
+    """
+    Downloads prices from Yahoo Finance through yfinance.
+    """
+
+    name = 'yahoo'
+    cacheable = True
+
+    def get_history(self, symbols, start_date, end_date, adjusted=True):
+        # Imported on first download, yfinance is slow to import and not needed to start the application
+        import yfinance as yf
+
+        symbols = list(symbols)
+        prices = yf.download(symbols, start=pd.Timestamp(start_date).strftime("%Y-%m-%d"),
+                             end=pd.Timestamp(end_date) + BDay(1))
+        prices = prices["Adj Close"] if adjusted else prices["Close"]
+
+        if isinstance(prices, pd.Series):
+            prices = prices.to_frame(symbols[0])
+        prices.index = pd.DatetimeIndex(prices.index).tz_localize(None)
+        return prices.reindex(columns=symbols)
+
+
+class FilePriceProvider(PriceProvider):
+    """
+    Reads daily bars from local files, one file per symbol named
+    <SYMBOL>.parquet or <SYMBOL>.csv. Files must contain a 'Date' column
+    and 'Close' and/or 'Adj Close' columns.
+
+    Parameters
+    ----------
+    directory : `str`
+        Directory containing the bar files.
+    """
+
+    name = 'file'
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _read_bars(self, symbol):
+        parquet_file = os.path.join(self.directory, f"{symbol}.parquet")
+        csv_file = os.path.join(self.directory, f"{symbol}.csv")
+
+        if os.path.exists(parquet_file):
+            bars = pd.read_parquet(parquet_file)
+        elif os.path.exists(csv_file):
+            bars = pd.read_csv(csv_file)
+        else:
+            return None
+
+        bars["Date"] = pd.to_datetime(bars["Date"])
+        return bars.set_index("Date").sort_index()
+
+    def get_history(self, symbols, start_date, end_date, adjusted=True):
+        columns = {}
+        for symbol in symbols:
+            bars = self._read_bars(symbol)
+            if bars is None:
+                continue
+            column = "Adj Close" if adjusted and "Adj Close" in bars.columns else "Close"
+            columns[symbol] = bars[column]
+
+        prices = pd.DataFrame(columns)
+        if not prices.empty:
+            prices = prices.loc[pd.Timestamp(start_date):pd.Timestamp(end_date)]
+        return prices.reindex(columns=list(symbols))
+
+
+class SyntheticPriceProvider(PriceProvider):
+    """
+    Generates deterministic geometric random walk prices on business days.
+
+    Every symbol has its own random stream seeded from the provider seed and
+    the symbol name, and the walk always starts from the same origin date.
+    The price of a symbol on a date therefore does not depend on the other
+    requested symbols or on the requested range.
+
+    Parameters
+    ----------
+    seed : `int`, optional
+        Seed of the random walks.
+    start_price : `float`, optional
+        Price of every symbol on the origin date.
+    drift : `float`, optional
+        Mean daily return.
+    volatility : `float`, optional
+        Standard deviation of the daily returns.
+    origin : `str`, optional
+        First date of the random walks.
+    """
+
+    name = 'synthetic'
+
+    def __init__(self, seed=42, start_price=100.0, drift=0.0003, volatility=0.015, origin='2000-01-03'):
+        self.seed = seed
+        self.start_price = start_price
+        self.drift = drift
+        self.volatility = volatility
+        self.origin = pd.Timestamp(origin)
+
+    def _walk(self, symbol, dates):
+        rng = np.random.default_rng([self.seed, zlib.crc32(symbol.encode())])
+        returns = rng.normal(self.drift, self.volatility, len(dates))
+        returns[:1] = 0.0
+        return self.start_price * np.cumprod(1.0 + returns)
+
+    def get_history(self, symbols, start_date, end_date, adjusted=True):
+        dates = pd.date_range(self.origin, pd.Timestamp(end_date), freq=BDay())
+        prices = pd.DataFrame({symbol: self._walk(symbol, dates) for symbol in symbols}, index=dates)
+        return prices.loc[pd.Timestamp(start_date):].reindex(columns=list(symbols))
+
+
+def get_price_provider():
+    """
+    Creates the price provider configured in settings.PRICE_PROVIDER.
+
+    Returns
+    -------
+    `PriceProvider`
+        The configured price provider.
+    """
+    config = settings.PRICE_PROVIDER
+    if config['NAME'] == 'yahoo':
+        return YahooPriceProvider()
+    if config['NAME'] == 'file':
+        return FilePriceProvider(config['DIRECTORY'])
+    if config['NAME'] == 'synthetic':
+        return SyntheticPriceProvider(seed=config['SEED'])
+
+    raise ValueError(f"Unknown price provider '{config['NAME']}'")
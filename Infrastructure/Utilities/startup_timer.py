@@ -0,0 +1,128 @@
+import builtins
+import importlib.util
+import sys
+import time
+from contextlib import contextmanager
+
+
+class StartupTimer:
+    """
+    Measures where the start-up time of the application goes: the duration
+    of named stages and, like python -X importtime, the self and cumulative
+    time of every module imported while it is active. A disabled timer
+    records nothing and costs nothing.
+
+    Imports are timed by wrapping builtins.__import__, so only modules that
+    are not loaded yet are recorded. Submodules pulled in through the
+    fromlist of another import count towards that import.
+
+    Parameters
+    ----------
+    enabled : `bool`, optional
+        Whether to record anything.
+    stream : file-like, optional
+        Where the report is written. Defaults to sys.stderr.
+    """
+
+    def __init__(self, enabled=True, stream=None):
+        self.enabled = enabled
+        self.stream = stream
+        self.stages = []
+        self.imports = []
+        self._original_import = None
+        self._children = []
+        self._started = time.perf_counter()
+        if enabled:
+            self.install()
+
+    def install(self):
+        """
+        Starts timing imports.
+        """
+        if self._original_import is None:
+            self._original_import = builtins.__import__
+            builtins.__import__ = self._import
+
+    def uninstall(self):
+        """
+        Stops timing imports.
+        """
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    @staticmethod
+    def _module_name(name, globals, level):
+        if level == 0:
+            return name
+        package = (globals or {}).get('__package__') or ''
+        try:
+            return importlib.util.resolve_name('.' * level + name, package)
+        except (ImportError, ValueError):
+            return name
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        module_name = self._module_name(name, globals, level)
+        if module_name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        depth = len(self._children)
+        self._children.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            cumulative = time.perf_counter() - start
+            children = self._children.pop()
+            if self._children:
+                self._children[-1] += cumulative
+            self.imports.append((module_name, cumulative - children, cumulative, depth))
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times the enclosed block as a named stage.
+
+        Parameters
+        ----------
+        name : `str`
+            Name of the stage.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, time.perf_counter() - start))
+
+    def report(self, threshold_ms=1.0):
+        """
+        Stops timing imports and writes the stage durations, followed by
+        the imports taking at least threshold_ms in the -X importtime
+        layout, nested imports indented under the one that triggered them.
+
+        Parameters
+        ----------
+        threshold_ms : `float`, optional
+            Cumulative import time below which imports are left out.
+        """
+        if not self.enabled:
+            return
+
+        self.uninstall()
+        stream = self.stream if self.stream is not None else sys.stderr
+        total = time.perf_counter() - self._started
+
+        stream.write(f"Start-up time: {total * 1000:,.1f} ms\n")
+        for name, duration in self.stages:
+            stream.write(f"  {name:<24}{duration * 1000:>10,.1f} ms\n")
+
+        stream.write("import time: self [us] | cumulative | imported package\n")
+        for module_name, own, cumulative, depth in self.imports:
+            if cumulative * 1000 >= threshold_ms:
+                stream.write(f"import time: {own * 1e6:>9.0f} | {cumulative * 1e6:>10.0f} | "
+                             f"{'  ' * depth}{module_name}\n")
+        stream.flush()
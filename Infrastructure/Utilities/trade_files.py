@@ -0,0 +1,188 @@
+"""
+Reading and writing trade files. CSV files are parsed in chunks and Parquet
+and Arrow IPC (Feather) files in record batches, each converted to the
+trade column dtypes as it is read, so large broker exports never hold more
+than one chunk of raw text in memory. The columns are checked before any
+row is parsed. Parquet and Arrow files need pyarrow.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+TRADE_COLUMNS = ['Symbol', 'Quantity', 'Price', 'Date', 'Commission']
+NUMERIC_COLUMNS = ['Quantity', 'Price', 'Commission']
+REQUIRED_COLUMNS = ['Symbol', 'Quantity', 'Price', 'Date']
+
+# File formats by file name extension, files with other extensions are CSV
+FILE_FORMATS = {
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+    '.ipc': 'arrow'
+}
+
+
+def trade_file_format(file_name):
+    """
+    Returns the format of a trade file, 'csv', 'parquet' or 'arrow', from
+    its extension.
+    """
+    return FILE_FORMATS.get(os.path.splitext(file_name)[1].lower(), 'csv')
+
+
+def file_columns(file_name):
+    """
+    Returns the column names of a trade file, reading only its header or
+    schema.
+    """
+    file_format = trade_file_format(file_name)
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+
+        return pq.read_schema(file_name).names
+    if file_format == 'arrow':
+        import pyarrow as pa
+
+        with pa.memory_map(file_name) as source:
+            return pa.ipc.open_file(source).schema.names
+    return list(pd.read_csv(file_name, nrows=0).columns)
+
+
+def _csv_chunks(file_name, columns, chunksize):
+    with open(file_name, 'rb') as handle:
+        size = max(os.fstat(handle.fileno()).st_size, 1)
+        dtypes = {column: np.float64 for column in NUMERIC_COLUMNS if column in columns}
+        if 'Symbol' in columns:
+            dtypes['Symbol'] = 'category'
+        for chunk in pd.read_csv(handle, usecols=columns, dtype=dtypes, chunksize=chunksize):
+            yield chunk, handle.tell() / size
+
+
+def _parquet_chunks(file_name, columns, chunksize):
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(file_name)
+    total, rows = max(parquet_file.metadata.num_rows, 1), 0
+    for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+        rows += batch.num_rows
+        yield batch.to_pandas(), rows / total
+
+
+def _arrow_chunks(file_name, columns, chunksize):
+    import pyarrow as pa
+
+    with pa.memory_map(file_name) as source:
+        reader = pa.ipc.open_file(source)
+        for index in range(reader.num_record_batches):
+            batch = reader.get_batch(index).select(columns)
+            for start in range(0, max(batch.num_rows, 1), chunksize):
+                yield batch.slice(start, chunksize).to_pandas(), (index + 1) / reader.num_record_batches
+
+
+def _convert_chunk(chunk, columns):
+    chunk = chunk[columns]
+    for column in NUMERIC_COLUMNS:
+        if column in columns and chunk[column].dtype != np.float64:
+            chunk[column] = chunk[column].astype(np.float64)
+    if 'Symbol' in columns and not isinstance(chunk['Symbol'].dtype, pd.CategoricalDtype):
+        chunk['Symbol'] = chunk['Symbol'].astype('category')
+    if 'Date' in columns and chunk['Date'].dtype.kind != 'M':
+        chunk['Date'] = pd.to_datetime(chunk['Date'], format='ISO8601')
+
+    required = [column for column in REQUIRED_COLUMNS if column in columns]
+    missing = chunk[required].isna().any()
+    if missing.any():
+        raise ValueError(f"missing values in the columns {list(missing.index[missing])}")
+    return chunk
+
+
+def read_trades(file_name, columns=None, chunksize=100_000, progress=None):
+    """
+    Reads a CSV, Parquet or Arrow IPC trade file chunk by chunk. Symbols are
+    read as categories, quantities, prices and commissions as float64 and
+    dates as datetime64. Quantities are converted to integers if they all
+    are whole numbers, like pandas infers them from a CSV file.
+
+    Parameters
+    ----------
+    file_name : `str`
+        Name of the trade file. The format is taken from its extension.
+    columns : `list`, optional
+        Columns to read, in order. Defaults to TRADE_COLUMNS. Other columns
+        of the file are skipped.
+    chunksize : `int`, optional
+        Number of rows parsed at once.
+    progress : `callable`, optional
+        Called after every chunk with the number of rows read and the
+        percentage of the file read.
+
+    Returns
+    -------
+    `pd.DataFrame`
+        Trades with the given columns.
+
+    Raises
+    ------
+    ValueError
+        If a column is missing, or a symbol, quantity, price or date is
+        missing or can not be converted.
+    """
+    columns = list(columns if columns is not None else TRADE_COLUMNS)
+    missing = [column for column in columns if column not in file_columns(file_name)]
+    if missing:
+        raise ValueError(f"Trade file {file_name} is missing the columns {missing}")
+
+    chunks = {
+        'csv': _csv_chunks,
+        'parquet': _parquet_chunks,
+        'arrow': _arrow_chunks
+    }[trade_file_format(file_name)](file_name, columns, chunksize)
+
+    frames, rows = [], 0
+    try:
+        for chunk, fraction in chunks:
+            frames.append(_convert_chunk(chunk, columns))
+            rows += len(chunk)
+            if progress is not None:
+                progress(rows, int(round(100 * min(fraction, 1.0))))
+    except (pd.errors.ParserError, TypeError, ValueError) as error:
+        raise ValueError(f"Trade file {file_name} has invalid values: {error}") from error
+
+    if not frames:
+        return pd.DataFrame({column: [] for column in columns})
+
+    symbols = union_categoricals([frame['Symbol'] for frame in frames]) if 'Symbol' in columns else None
+    trades = pd.concat(frames, ignore_index=True)
+    if symbols is not None:
+        trades['Symbol'] = pd.Categorical(symbols)
+
+    if 'Quantity' in columns:
+        quantity = trades['Quantity'].to_numpy()
+        if np.isfinite(quantity).all() and (quantity == np.round(quantity)).all():
+            trades['Quantity'] = quantity.astype(np.int64)
+    return trades
+
+
+def write_trades(trades, file_name):
+    """
+    Writes trades to a CSV, Parquet or Arrow IPC (Feather) file, the format
+    being taken from the extension of file_name. The columnar formats store
+    the dtypes and are read back without parsing.
+
+    Parameters
+    ----------
+    trades : `pd.DataFrame`
+        Trades to write.
+    file_name : `str`
+        Name of the trade file.
+    """
+    file_format = trade_file_format(file_name)
+    if file_format == 'parquet':
+        trades.to_parquet(file_name, index=False)
+    elif file_format == 'arrow':
+        trades.reset_index(drop=True).to_feather(file_name)
+    else:
+        trades.to_csv(file_name, index=False)
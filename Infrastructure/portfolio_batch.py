@@ -0,0 +1,171 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from Infrastructure import settings
+from Infrastructure.portfolio_constructor import PortfolioConstructor
+from Infrastructure.statistics_engine import StatisticsEngine
+from Infrastructure.Utilities.benchmark_prices import BenchmarkPrices, session_benchmark_prices
+from Infrastructure.Utilities.business_day_check import BDay
+from Infrastructure.Utilities.data_sourcer import PriceDataSource
+from Infrastructure.Utilities.price_providers import get_price_provider
+
+
+def shared_price_source(trade_frames, as_of_date, provider=None):
+    """
+    Fetches the prices of every symbol traded by several portfolios in a single request.
+
+    Parameters
+    ----------
+    trade_frames : `list`
+        Trade dataframes of the portfolios.
+    as_of_date : `pd.Timestamp`
+        Last date of the price history.
+    provider : `PriceProvider`, optional
+        Price provider. Defaults to the one configured in settings.
+
+    Returns
+    -------
+    `PriceDataSource`
+        Prices of the union of the traded symbols from the earliest trade date.
+    """
+    trades = pd.concat([frame[['Symbol', 'Date']] for frame in trade_frames], ignore_index=True)
+    return PriceDataSource(trades, as_of_date, provider=provider)
+
+
+def compute_portfolio(trades, as_of_date, benchmark, ptf_cash, ptf_name, ptf_curr, data_handler=None,
+                      benchmark_prices=None, progress=None, constructor=None, edit_date=None):
+    """
+    Computes the history, returns and statistics of a portfolio. When the constructor of a previous computation is
+    given, its history is updated incrementally from the date of the earliest edited trade instead of rebuilt.
+
+    Parameters
+    ----------
+    trades : `pd.DataFrame`
+        Transactions of the portfolio.
+    as_of_date : `pd.Timestamp`
+        Calculation date.
+    benchmark : `str`
+        Name of the benchmark.
+    ptf_cash : `float`
+        Starting balance of the portfolio.
+    ptf_name : `str`
+        Name of the portfolio.
+    ptf_curr : `str`
+        Currency of the portfolio.
+    data_handler : `PriceDataSource`, optional
+        Pre-fetched prices of the traded symbols.
+    benchmark_prices : `pd.Series`, optional
+        Pre-fetched benchmark prices.
+    progress : `callable`, optional
+        Function (percent, message) called at the start of every stage.
+    constructor : `PortfolioConstructor`, optional
+        Constructor of the previous computation of the portfolio. Reused if it starts on the same date.
+    edit_date : `pd.Timestamp`, optional
+        Date of the earliest trade inserted or deleted since the previous computation.
+
+    Returns
+    -------
+    `dict`
+        Portfolio constructor, first transaction date, returns series and the numeric statistics dataframes.
+    """
+    def report(percent, message):
+        if progress is not None:
+            progress(percent, f"{ptf_name}: {message}")
+
+    report(0, "building portfolio history...")
+    first_transaction = pd.to_datetime((trades['Date'].min() - BDay(1)).date())
+    if constructor is not None and constructor.start_date == first_transaction:
+        constructor.update_portfolio_history(trades, as_of_date, edit_date)
+    else:
+        constructor = PortfolioConstructor(first_transaction, ptf_cash, ptf_name, ptf_curr)
+        constructor.construct_portfolio_history(trades, as_of_date, data_handler=data_handler)
+
+    report(50, "loading benchmark returns...")
+    returns_series = constructor.construct_returns_dataframe(benchmark, as_of_date, benchmark_prices)
+    ptf_returns, bmk_returns = returns_series["Ptf Returns"], returns_series["Bmk Returns"]
+
+    report(60, "computing statistics...")
+    statistics = StatisticsEngine(ptf_returns, bmk_returns).compute()
+    result = {
+        'constructor': constructor,
+        'first_transaction': first_transaction,
+        'returns_series': returns_series
+    }
+    for table, dataframe in statistics.items():
+        result[f'{table}_statistics'] = dataframe
+
+    report(100, "portfolio loaded.")
+    return result
+
+
+def _initialise_worker(price_provider, price_cache):
+    """
+    Applies the price settings of the parent process to a spawned worker, which starts from the defaults of the
+    settings module, and silences its portfolio event logs.
+    """
+    settings.PRICE_PROVIDER.update(price_provider)
+    settings.PRICE_CACHE.update(price_cache)
+    settings.set_events_mode('quiet')
+
+
+def compute_portfolios(portfolios, as_of_date, benchmark, provider=None, max_workers=None):
+    """
+    Computes several portfolios concurrently on a process pool. The prices of all traded symbols and the benchmark
+    are fetched once in the calling process and every job gets the part of them its portfolio trades. The benchmark
+    is fetched with the others of bmk_name_map, through the session store when no provider is given. The workers
+    run with the price provider and price cache settings of the calling process.
+
+    Parameters
+    ----------
+    portfolios : `list`
+        Dicts with the 'trades', 'ptf_cash', 'ptf_name' and 'ptf_curr' of every portfolio.
+    as_of_date : `pd.Timestamp`
+        Calculation date.
+    benchmark : `str`
+        Name of the benchmark.
+    provider : `PriceProvider`, optional
+        Price provider. Defaults to the one configured in settings.
+    max_workers : `int`, optional
+        Number of processes. Defaults to the number of cores.
+
+    Yields
+    ------
+    `tuple`
+        Portfolio name and either the result dict of compute_portfolio or the exception raised computing it, in
+        completion order.
+    """
+    benchmark_tickers = list(PortfolioConstructor.bmk_name_map.values())
+    benchmark_store = BenchmarkPrices(benchmark_tickers, provider) if provider is not None \
+        else session_benchmark_prices(benchmark_tickers)
+    provider = provider if provider is not None else get_price_provider()
+    data_handler = shared_price_source([portfolio['trades'] for portfolio in portfolios], as_of_date, provider)
+    start_date = min(portfolio['trades']['Date'].min() for portfolio in portfolios) - BDay(1)
+    benchmark_prices = benchmark_store.get_prices(PortfolioConstructor.bmk_name_map[benchmark], start_date,
+                                                  as_of_date)
+
+    # Workers are spawned rather than forked, forking a process running a Qt event loop is not safe. Spawned
+    # workers do not see settings changed at runtime, so they get a snapshot of the price settings. Nobody reads
+    # their portfolio event logs, so they run in the quiet events mode
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_initialise_worker,
+                             initargs=(dict(settings.PRICE_PROVIDER), dict(settings.PRICE_CACHE))) as executor:
+        # Jobs and their results only carry the prices of their own portfolio
+        futures = {
+            executor.submit(compute_portfolio, portfolio['trades'], as_of_date, benchmark, portfolio['ptf_cash'],
+                            portfolio['ptf_name'], portfolio['ptf_curr'], data_handler.subset(portfolio['trades']),
+                            benchmark_prices):
+                portfolio['ptf_name']
+            for portfolio in portfolios
+        }
+        try:
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result()
+                except Exception as exception:
+                    yield futures[future], exception
+        finally:
+            # Closing the generator early drops the jobs that have not started yet
+            for future in futures:
+                future.cancel()
@@ -1,35 +1,73 @@
+import copy
 import numpy as np
 import pandas as pd
-import yfinance as yf
-import quantstats as qs
-import empyrical as ep
 from Infrastructure.Portfolio.portfolio import Portfolio
-from Infrastructure.Portfolio.transaction import Transaction
+from Infrastructure.Portfolio.transaction_batch import TransactionBatch
+from Infrastructure.Portfolio.transaction_index import TransactionIndex
+from Infrastructure.Portfolio.vectorised_history import VectorisedHistory
+from Infrastructure.statistics_engine import StatisticsEngine, peer_statistics
+from Infrastructure.Utilities.benchmark_prices import BenchmarkPrices, session_benchmark_prices
 from Infrastructure.Utilities.business_day_check import BDay
-from pandas_datareader import data as pdr
-from Infrastructure.Utilities.data_sourcer import PriceDataSource
-from datetime import datetime as _dt
-from dateutil.relativedelta import relativedelta
+from Infrastructure.Utilities.data_sourcer import PriceDataSource, get_current_prices
+from Infrastructure.Utilities.price_providers import get_price_provider
 
-yf.pdr_override()
 pd.set_option('display.max_columns', 20)
 pd.set_option('display.width', 400)
 
 
 class PortfolioConstructor:
-    def __init__(self, start_date, start_cash, ptf_name, ptf_curr):
+
+    engines = ('object', 'vectorised')
+
+    # Business days between two snapshots of the portfolio state taken by the 'object' engine
+    checkpoint_interval = 21
+
+    bmk_name_map = {'S&P 500': '^GSPC', 'NASDAQ': '^IXIC', 'Dow Jones': '^DJI', 'Russell 2000': '^RUT',
+                    'Nikkei 225': '^N225', 'Hang Seng': '^HSI', 'Euro Stoxx 50': '^STOXX50E'}
+
+    def __init__(self, start_date, start_cash, ptf_name, ptf_curr, engine='object', provider=None):
         """
         Constructor for the PortfolioConstructor class. This class is responsible for constructing the portfolio and
         its holdings.
+
+        The history can be built by stepping every position through every business day ('object') or with array
+        operations over the whole date range at once ('vectorised'). Both engines produce the same frames. Prices are
+        requested from the given price provider, or the one configured in settings when omitted.
+
+        The prices of every benchmark in bmk_name_map are fetched together and kept in memory, shared by all the
+        constructors of the session that use the configured provider, so switching benchmarks only re-joins the
+        returns.
+
+        The 'object' engine checkpoints the portfolio state every checkpoint_interval business days, so that after a
+        trade edit update_portfolio_history only replays the history from the last checkpoint before the edit.
         """
+        if engine not in self.engines:
+            raise ValueError(f"Unknown portfolio history engine '{engine}'. Supported engines: {self.engines}")
+
+        self.engine = engine
+        self.provider = provider if provider is not None else get_price_provider()
+        benchmark_tickers = list(self.bmk_name_map.values())
+        self.benchmark_prices = BenchmarkPrices(benchmark_tickers, self.provider) if provider is not None \
+            else session_benchmark_prices(benchmark_tickers)
         self.start_date = pd.to_datetime(start_date, dayfirst=True)
         self.start_cash = float(start_cash)
         self.ptf_name = ptf_name
         self.ptf_curr = ptf_curr
-        self.ptf = Portfolio(self.start_date, self.start_cash, currency=self.ptf_curr, name=self.ptf_name)
+        self.ptf = self._new_portfolio()
         self.holdings_as_of_date = None
         self.portfolio_timeseries = None
 
+        # State kept for incremental updates of the history
+        self.end_date = None
+        self.data_handler = None
+        self.checkpoints = []
+        self._position_info = None
+        self._timeseries = None
+        self._portfolio_returns = None
+
+    def _new_portfolio(self):
+        return Portfolio(self.start_date, self.start_cash, currency=self.ptf_curr, name=self.ptf_name)
+
     @property
     def portfolio(self):
         return self.ptf
@@ -38,10 +76,11 @@ class PortfolioConstructor:
     def holdings(self):
         return self.holdings_as_of_date
 
-    def construct_portfolio_history(self, trades, end_date):
+    def construct_portfolio_history(self, trades, end_date, data_handler=None):
         """
         Method to construct the portfolio history from the trades. This method is used to construct the portfolio
-        holdings as of a given date. Updates the holdings_as_of_date attribute.
+        holdings as of a given date. Updates the holdings_as_of_date attribute. Trades dated on a non-business day
+        are processed on the next business day.
 
         Parameters
         ----------
@@ -49,43 +88,161 @@ class PortfolioConstructor:
             Dataframe containing the trades.
         end_date : `pd.Timestamp`
             End date of the portfolio history.
+        data_handler : `PriceDataSource`, optional
+            Prices of the traded symbols, e.g. shared by several portfolios. Fetched when omitted.
         """
-        data_handler = PriceDataSource(trades, end_date)
+        if data_handler is None:
+            data_handler = PriceDataSource(trades, end_date, provider=self.provider)
+        self.data_handler = data_handler
+        self.end_date = end_date
+        self.checkpoints = []
         date_index = pd.date_range(self.start_date, end_date, freq=BDay())
-        position_info = {'Symbol': [], 'Quantity': [], 'Market Price': [], 'Market Value': [], 'Avg Price': [],
-                         'Total Cost': [], 'Unrealized PL': [], 'Realized PL': [], 'Total PL': [], 'Holding Date': []}
-
-        portfolio_timeseries = {'Date': [], 'Total Equity': [], 'Total Market Value': [], 'Total RPL': [],
-                                'Total UPL': [], 'Total PNL': []}
-
-        transactions = self.construct_transactions(trades)
-        for date in date_index:
-            for asset in self.portfolio.pos_handler.positions.keys():
-                try:
-                    price = data_handler.get_price_from_history(asset, date)
-                    position = self.portfolio.pos_handler.positions[asset]
-                    position.update_current_price(price, date)
-                    position_info["Symbol"].append(position.asset)
-                    position_info["Quantity"].append(position.net_quantity)
-                    position_info["Market Price"].append(position.market_price)
-                    position_info["Market Value"].append(position.market_value)
-                    position_info["Avg Price"].append(position.avg_price)
-                    position_info["Total Cost"].append(position.net_incl_commission)
-                    position_info["Unrealized PL"].append(position.unrealised_pnl)
-                    position_info["Realized PL"].append(position.realised_pnl)
-                    position_info["Total PL"].append(position.total_pnl)
-                    position_info["Holding Date"].append(position.current_dt)
-                except KeyError:
-                    pass
-
-            for transaction in transactions:
-                if date <= transaction.dt <= date + pd.Timedelta(hours=23, minutes=59, seconds=59):
-                    if transaction.asset == "SUBSCRIPTION":
-                        self.portfolio.subscribe_funds(transaction.dt, transaction.quantity)
-                    elif transaction.asset == "WITHDRAWAL":
-                        self.portfolio.withdraw_funds(transaction.dt, transaction.quantity)
-                    else:
-                        self.portfolio.transact_asset(transaction)
+
+        if self.engine == 'vectorised':
+            trades.sort_values(['Date'], inplace=True)
+            engine = VectorisedHistory(self.portfolio, data_handler, date_index)
+            self.portfolio_timeseries, self.holdings_as_of_date = engine.build(trades, end_date)
+            return
+
+        self._position_info = {'Symbol': [], 'Quantity': [], 'Market Price': [], 'Market Value': [], 'Avg Price': [],
+                               'Total Cost': [], 'Unrealized PL': [], 'Realized PL': [], 'Total PL': [],
+                               'Holding Date': []}
+
+        self._timeseries = {'Date': [], 'Total Equity': [], 'Total Market Value': [], 'Total RPL': [],
+                            'Total UPL': [], 'Total PNL': []}
+
+        self._replay_history(trades, date_index, first_day=0)
+
+    def update_portfolio_history(self, trades, end_date, edit_date=None):
+        """
+        Updates the portfolio history after trades have been inserted or deleted and/or the end date has moved. The
+        portfolio is restored to the last checkpoint on or before the earliest affected business day and only the days
+        from there on are replayed. Moving the end date forward only fetches the prices of the new days. Falls back to
+        a full rebuild when there is no history to replay, e.g. for the 'vectorised' engine.
+
+        Parameters
+        ----------
+        trades : `pd.DataFrame`
+            Dataframe containing all the trades after the edit.
+        end_date : `pd.Timestamp`
+            End date of the portfolio history.
+        edit_date : `pd.Timestamp`, optional
+            Date of the earliest inserted or deleted trade. None if the trades have not changed.
+        """
+        if end_date == self.end_date and edit_date is None and self.portfolio_timeseries is not None:
+            return
+
+        date_index = pd.date_range(self.start_date, end_date, freq=BDay())
+        if not self.checkpoints or date_index.empty:
+            self.ptf = self._new_portfolio()
+            self.construct_portfolio_history(trades, end_date)
+            return
+
+        replay_days = []
+        if end_date != self.end_date:
+            # The last day both histories share is replayed too, its close may have been provisional
+            shared_days = pd.date_range(self.start_date, min(end_date, self.end_date), freq=BDay())
+            replay_days.append(max(len(shared_days) - 1, 0))
+        if edit_date is not None:
+            edit_day = TransactionIndex.assign_days([edit_date], date_index)[0]
+            # Trades outside the date range are not part of the history
+            if edit_day >= 0:
+                replay_days.append(edit_day)
+        if not replay_days:
+            return
+
+        # New symbols or earlier trades need prices the current data handler does not have
+        symbols = set(trades['Symbol']) - {'SUBSCRIPTION', 'WITHDRAWAL'}
+        if not symbols.issubset(self.data_handler.symbols) or \
+                trades['Date'].min() < self.data_handler.trade_dataframe['Date'].min():
+            self.data_handler = PriceDataSource(trades, end_date, provider=self.provider)
+        else:
+            self.data_handler.extend(end_date)
+        self.end_date = end_date
+
+        first_day = min(replay_days)
+        checkpoint = [checkpoint for checkpoint in self.checkpoints if checkpoint['day'] <= first_day][-1]
+        self._restore_checkpoint(checkpoint)
+        self._replay_history(trades, date_index, first_day=checkpoint['day'])
+
+    def _checkpoint(self, day):
+        """
+        Snapshot of the portfolio state at the start of a day, before its prices and transactions are applied.
+        Positions only hold scalars, so shallow copies are independent of the live ones.
+        """
+        return {
+            'day': day,
+            'cash': self.portfolio.cash,
+            'current_dt': self.portfolio.current_dt,
+            'history': len(self.portfolio.history),
+            'holdings': len(self._position_info['Symbol']),
+            'positions': {asset: copy.copy(position) for asset, position in self.portfolio.pos_handler.positions.items()}
+        }
+
+    def _restore_checkpoint(self, checkpoint):
+        """
+        Rolls the portfolio state, the recorded rows and the checkpoints back to a checkpoint.
+        """
+        self.portfolio.cash = checkpoint['cash']
+        self.portfolio.current_dt = checkpoint['current_dt']
+        self.portfolio.history.truncate(checkpoint['history'])
+
+        positions = self.portfolio.pos_handler.positions
+        positions.clear()
+        positions.update({asset: copy.copy(position) for asset, position in checkpoint['positions'].items()})
+
+        for values in self._position_info.values():
+            del values[checkpoint['holdings']:]
+        for values in self._timeseries.values():
+            del values[checkpoint['day']:]
+        self.checkpoints = [kept for kept in self.checkpoints if kept['day'] < checkpoint['day']]
+
+    def _replay_history(self, trades, date_index, first_day):
+        """
+        Steps the portfolio through the business days from first_day to the end date, recording the holdings and
+        timeseries rows and taking checkpoints on the way.
+        """
+        data_handler = self.data_handler
+        position_info, portfolio_timeseries = self._position_info, self._timeseries
+
+        transaction_index = TransactionIndex(self.construct_transactions(trades), date_index)
+        date_rows = data_handler.dates.get_indexer(date_index)
+        positions = self.portfolio.pos_handler.positions
+        assets, asset_columns = [], data_handler.symbol_columns([])
+
+        for day in range(first_day, len(date_index)):
+            date = date_index[day]
+            if day % self.checkpoint_interval == 0:
+                self.checkpoints.append(self._checkpoint(day))
+
+            # Positions are only ever added, so the columns change with their count
+            if len(assets) != len(positions):
+                assets = list(positions.keys())
+                asset_columns = data_handler.symbol_columns(assets)
+
+            for asset, price in zip(assets, data_handler.prices_for(date_rows[day], asset_columns)):
+                if np.isnan(price):
+                    continue
+                position = positions[asset]
+                position.update_current_price(price, date)
+                position_info["Symbol"].append(position.asset)
+                position_info["Quantity"].append(position.net_quantity)
+                position_info["Market Price"].append(position.market_price)
+                position_info["Market Value"].append(position.market_value)
+                position_info["Avg Price"].append(position.avg_price)
+                position_info["Total Cost"].append(position.net_incl_commission)
+                position_info["Unrealized PL"].append(position.unrealised_pnl)
+                position_info["Realized PL"].append(position.realised_pnl)
+                position_info["Total PL"].append(position.total_pnl)
+                position_info["Holding Date"].append(position.current_dt)
+
+            for transaction in transaction_index.on_day(day):
+                if transaction.asset == "SUBSCRIPTION":
+                    self.portfolio.subscribe_funds(transaction.dt, transaction.quantity)
+                elif transaction.asset == "WITHDRAWAL":
+                    self.portfolio.withdraw_funds(transaction.dt, transaction.quantity)
+                else:
+                    self.portfolio.transact_asset(transaction)
 
             portfolio_timeseries['Date'].append(date)
             portfolio_timeseries['Total Equity'].append(self.portfolio.total_equity)
@@ -95,26 +252,30 @@ class PortfolioConstructor:
             portfolio_timeseries['Total PNL'].append(self.portfolio.total_pnl)
 
         position_info_df = pd.DataFrame(position_info)
-        self.holdings_as_of_date = position_info_df.loc[position_info_df['Holding Date'] == end_date]
-        portfolio_timeseries_df = pd.DataFrame(portfolio_timeseries)
-        self.portfolio_timeseries = portfolio_timeseries_df
+        self.holdings_as_of_date = position_info_df.loc[position_info_df['Holding Date'] == self.end_date]
+        self.portfolio_timeseries = pd.DataFrame(portfolio_timeseries)
 
     def construct_portfolio_returns(self):
         """
-        Helper method to construct portfolio returns from the total equity.
+        Helper method to construct portfolio returns from the total equity. The returns are kept until the history
+        changes, so joining them with another benchmark does not recompute them.
 
         Returns
         -------
         `pd.DataFrame`
             Portfolio returns dataframe.
         """
+        if self._portfolio_returns is not None and self._portfolio_returns[0] is self.portfolio_timeseries:
+            return self._portfolio_returns[1]
+
         ptf_df = self.portfolio_timeseries[['Date', 'Total Equity']].copy()
         ptf_df['Ptf Returns'] = ptf_df['Total Equity'].pct_change().fillna(0.0)
         ptf_df = ptf_df.set_index('Date')
 
+        self._portfolio_returns = (self.portfolio_timeseries, ptf_df)
         return ptf_df
 
-    def construct_benchmark_returns(self, benchmark, end_date):
+    def construct_benchmark_returns(self, benchmark, end_date, benchmark_prices=None):
         """
         Helper method to construct benchmark returns series.
 
@@ -124,20 +285,21 @@ class PortfolioConstructor:
             Name of the benchmark. Passed from the main window dropdown.
         end_date : `pd.Timestamp`
             End date of the benchmark series.
+        benchmark_prices : `pd.Series`, optional
+            Pre-fetched benchmark prices indexed by date. Taken from the benchmark prices store when omitted.
 
         Returns
         -------
         `pd.DataFrame`
             Dataframe object containing benchmark returns.
         """
-        bmk_name_map = {'S&P 500': '^GSPC', 'NASDAQ': '^IXIC', 'Dow Jones': '^DJI', 'Russell 2000': '^RUT',
-                        'Nikkei 225': '^N225', 'Hang Seng': '^HSI', 'Euro Stoxx 50': '^STOXX50E'}
-        data = pdr.get_data_yahoo(bmk_name_map[benchmark], start=self.start_date, end=end_date + BDay(1))
-        data.rename(columns={'Adj Close': 'Benchmark'}, inplace=True)
+        if benchmark_prices is None:
+            benchmark_prices = self.benchmark_prices.get_prices(self.bmk_name_map[benchmark], self.start_date,
+                                                                end_date)
 
-        return data['Benchmark']
+        return benchmark_prices.loc[self.start_date:end_date].rename('Benchmark')
 
-    def construct_returns_dataframe(self, benchmark, end_date):
+    def construct_returns_dataframe(self, benchmark, end_date, benchmark_prices=None):
         """
         Helper method that construct a combined dataframe containing portfolio and benchmark returns.
 
@@ -147,6 +309,8 @@ class PortfolioConstructor:
             Name of the benchmark. Passed from the main window dropdown.
         end_date : `pd.Timestamp`
             End date of the benchmark series.
+        benchmark_prices : `pd.Series`, optional
+            Pre-fetched benchmark prices indexed by date.
 
         Returns
         -------
@@ -154,7 +318,7 @@ class PortfolioConstructor:
             Dataframe object containing combined portfolio and benchmark returns.
         """
         ptf_returns = self.construct_portfolio_returns()
-        bmk_returns = self.construct_benchmark_returns(benchmark, end_date)
+        bmk_returns = self.construct_benchmark_returns(benchmark, end_date, benchmark_prices)
         returns_df = ptf_returns.join(bmk_returns).ffill()
         returns_df['Bmk Returns'] = returns_df['Benchmark'].pct_change().fillna(0.0)
 
@@ -163,119 +327,25 @@ class PortfolioConstructor:
     @staticmethod
     def construct_statistics(portfolio_returns, benchmark_returns, metrics="returns"):
         """
-        Helper method to construct the statistics dataframe.
+        Helper method to construct one of the statistics dataframes. Use StatisticsEngine.compute to build every
+        table from the same intermediates.
 
         Parameters
         ----------
-        portfolio_returns : `pd.DataFrame`
-            Dataframe containing portfolio returns.
-        benchmark_returns : `pd.DataFrame`
-            Dataframe containing benchmark returns.
+        portfolio_returns : `pd.Series`
+            Series containing portfolio returns.
+        benchmark_returns : `pd.Series`
+            Series containing benchmark returns.
         metrics : `str`
-            Type of metrics to be calculated. Passed from the main window dropdown.
+            Type of metrics to be calculated: "returns", "performance" or "risk".
 
         Returns
         -------
         `pd.DataFrame`
-            Dataframe object containing the statistics.
+            Dataframe object containing the numeric statistics of the portfolio and the benchmark.
         """
-        def returns_statistics(returns):
-
-            today = returns.index[-1]
-            delta_3m = today - relativedelta(months=3)
-            delta_6m = today - relativedelta(months=6)
-            delta_1y = today - relativedelta(years=1)
-
-            stats = [str(np.round(qs.stats.comp(returns) * 100, 2)) + ' %',
-                     str(np.round(qs.stats.cagr(returns, periods=365) * 100, 2)) + ' %',
-                     str(np.round(qs.stats.expected_return(returns) * 100, 2)) + ' %',
-                     str(np.round(qs.stats.expected_return(returns, aggregate="M") * 100, 2)) + ' %',
-                     str(np.round(qs.stats.expected_return(returns, aggregate="A") * 100, 2)) + ' %',
-                     str(np.round(qs.stats.comp(returns[returns.index >= _dt(today.year, today.month, 1)]) * 100,
-                                  2))+' %',
-                     str(np.round(qs.stats.comp(returns[returns.index >= delta_3m]) * 100, 2)) + ' %',
-                     str(np.round(qs.stats.comp(returns[returns.index >= delta_6m]) * 100, 2)) + ' %',
-                     str(np.round(qs.stats.comp(returns[returns.index >= _dt(today.year, 1, 1)]) * 100,
-                                  2)) + ' %',
-                     str(np.round(qs.stats.comp(returns[returns.index >= delta_1y]) * 100, 2)) + ' %']
-
-            return stats
-
-        def performance_statistics(returns, risk_free_rate=0.0, required_return=0.0):
-
-            stats = [np.round(qs.stats.sharpe(returns, rf=risk_free_rate), 2),
-                     np.round(qs.stats.sortino(returns, rf=risk_free_rate), 2),
-                     np.round(ep.stats.omega_ratio(returns, risk_free=risk_free_rate, required_return=required_return),
-                              2),
-                     str(np.round(qs.stats.kelly_criterion(returns) * 100, 2)) + ' %',
-                     np.round(qs.stats.payoff_ratio(returns), 2),
-                     np.round(qs.stats.calmar(returns), 2),
-                     np.round(qs.stats.cpc_index(returns), 2),
-                     np.round(qs.stats.outlier_win_ratio(returns), 2),
-                     np.round(qs.stats.outlier_loss_ratio(returns), 2),
-                     np.round(qs.stats.tail_ratio(returns), 2)]
-
-            return stats
-
-        def risk_statistics(returns):
-            drawdown = qs.stats.to_drawdown_series(returns)
-            drawdown_info = qs.stats.drawdown_details(drawdown)
-
-            max_dd = drawdown_info.sort_values(by="max drawdown", ascending=True)["max drawdown"].values[0]
-            dd_days = drawdown_info.sort_values(by="days", ascending=False)["days"].values[0]
-            avg_dd = drawdown_info["max drawdown"].mean()
-
-            stats = [str(np.round(qs.stats.var(returns) * 100, 2)) + ' %',
-                     str(np.round(qs.stats.cvar(returns) * 100, 2)) + ' %',
-                     str(np.round(qs.stats.risk_of_ruin(returns) * 100, 2)) + ' %',
-                     str(np.round(qs.stats.volatility(returns) * 100, 2)) + ' %',
-                     np.round(qs.stats.skew(returns), 2),
-                     np.round(qs.stats.kurtosis(returns), 2),
-                     str(np.round(max_dd, 2)) + ' %',
-                     int(dd_days),
-                     str(np.round(avg_dd, 2)) + ' %',
-                     np.round(qs.stats.recovery_factor(returns), 2)
-                     ]
-
-            return stats
-
-        if metrics == "returns":
-            ptf_metrics = returns_statistics(portfolio_returns)
-            bmk_metrics = returns_statistics(benchmark_returns)
-
-            combined_metrics = {"Portfolio": ptf_metrics, "Benchmark": bmk_metrics}
-            combined_metrics_df = pd.DataFrame(data=combined_metrics,
-                                               index=['Cum. Return', 'CAGR',
-                                                      'Ex. Return (D)', 'Ex. Return (M)',
-                                                      'Ex. Return (Y)', 'MTD Return',
-                                                      '3M Return', '6M Return', 'YTD Return', '1Y Return'])
-
-            return combined_metrics_df
-
-        if metrics == "performance":
-            ptf_metrics = performance_statistics(portfolio_returns)
-            bmk_metrics = performance_statistics(benchmark_returns)
-
-            combined_metrics = {"Portfolio": ptf_metrics, "Benchmark": bmk_metrics}
-            combined_metrics_df = pd.DataFrame(data=combined_metrics,
-                                               index=['Sharpe Ratio', 'Sortino Ratio',
-                                                      'Omega Ratio', 'Kelly Criterion',
-                                                      'Payoff Ratio', 'Calmar Ratio',
-                                                      'CPC Index', 'Outlier Win',
-                                                      'Outlier Loss', 'Tail Ratio'])
-
-            return combined_metrics_df
-
-        if metrics == "risk":
-            ptf_metrics = risk_statistics(portfolio_returns)
-            bmk_metrics = risk_statistics(benchmark_returns)
-
-            combined_metrics = {"Portfolio": ptf_metrics, "Benchmark": bmk_metrics}
-            combined_metrics_df = pd.DataFrame(data=combined_metrics,
-                                               index=['VaR', 'cVaR', 'Risk of Ruin', 'Volatility', 'Skewness',
-                                                      'Kurtosis', 'Max DD', 'DD Duration', 'Avg. DD', 'Rec. Factor'])
-
-            return combined_metrics_df
+        engine = StatisticsEngine(portfolio_returns, benchmark_returns)
+        return getattr(engine, f'{metrics}_statistics')()
 
     @staticmethod
     def construct_additional_statistics(portfolio_returns, benchmark_returns):
@@ -285,32 +355,36 @@ class PortfolioConstructor:
         Parameters
         ----------
         portfolio_returns : `pd.Series`
-            Dataframe containing portfolio returns.
+            Series containing portfolio returns.
         benchmark_returns : `pd.Series`
-            Dataframe containing benchmark returns.
+            Series containing benchmark returns.
 
         Returns
         -------
         `pd.DataFrame`
-            Dataframe object containing additional statistics.
+            Dataframe object containing the numeric statistics of the portfolio relative to the benchmark.
         """
-        alpha, beta = ep.alpha_beta(portfolio_returns, benchmark_returns)
-        information_ratio = qs.stats.information_ratio(portfolio_returns, benchmark_returns)
-        treynor_ratio = qs.stats.treynor_ratio(portfolio_returns, benchmark_returns)
-        r_squared = qs.stats.r_squared(portfolio_returns, benchmark_returns)
-        up_capture = ep.up_capture(portfolio_returns, benchmark_returns)
-        down_capture = ep.down_capture(portfolio_returns, benchmark_returns)
-        batting_ratio = ep.batting_average(portfolio_returns, benchmark_returns)["batting average"] * 100
+        return StatisticsEngine(portfolio_returns, benchmark_returns).additional_statistics()
 
-        data = [[np.round(alpha, 2), np.round(beta, 2),
-                 np.round(information_ratio, 2), np.round(treynor_ratio, 2),
-                 np.round(r_squared, 2), np.round(up_capture, 2), np.round(down_capture, 2),
-                 str(np.round(batting_ratio, 2)) + ' %']]
+    @staticmethod
+    def construct_peer_statistics(portfolio_returns, benchmark_returns):
+        """
+        Helper method to construct the statistics of many portfolios against many benchmarks, e.g. every benchmark
+        of bmk_name_map, in one pass.
 
-        metrics_df = pd.DataFrame(data=data, columns=['Alpha', 'Beta', 'Information Ratio', 'Treynor Ratio',
-                                                      'R-Squared', 'Up Capture', 'Down Capture', 'Batting Ratio'])
+        Parameters
+        ----------
+        portfolio_returns : `pd.DataFrame`
+            Dataframe containing the returns of one portfolio per column.
+        benchmark_returns : `pd.DataFrame`
+            Dataframe containing the returns of one benchmark per column.
 
-        return metrics_df
+        Returns
+        -------
+        `pd.DataFrame`
+            Tidy dataframe of the statistics of every portfolio and benchmark pair, see peer_statistics.
+        """
+        return peer_statistics(portfolio_returns, benchmark_returns)
 
     @staticmethod
     def construct_transactions(trade_dataframe):
@@ -324,21 +398,18 @@ class PortfolioConstructor:
 
         Returns
         -------
-        `list`
-            List of Transaction objects.
+        `TransactionBatch`
+            Columnar batch of the transactions, sorted by date.
         """
         trades = trade_dataframe
         trades.sort_values(['Date'], inplace=True)
 
-        trans = [Transaction(asset, quantity, dt, price, 1, commission) for asset, quantity, dt, price, commission in
-                 zip(trades['Symbol'], trades['Quantity'], trades['Date'], trades['Price'], trades['Commission'])]
-
-        return trans
+        return TransactionBatch.from_dataframe(trades)
 
     @staticmethod
-    def get_current_price(ticker, date):
+    def get_current_price(ticker, date, provider=None):
         """
-        Helper method to get the current price of a ticker.
+        Helper method to get the current price of a ticker, see get_current_prices.
 
         Parameters
         ----------
@@ -346,14 +417,37 @@ class PortfolioConstructor:
             Ticker symbol.
         date : `pd.Timestamp`
             Date as of which the price is to be fetched.
+        provider : `PriceProvider`, optional
+            Price provider to fetch from. Defaults to the one configured in settings.
 
         Returns
         -------
         `float`
-            Current price of the ticker.
+            Close of the ticker on the date, or its last close before it.
+        """
+        return PortfolioConstructor.get_current_prices([ticker], date, provider).loc[ticker, 'Price']
+
+    @staticmethod
+    def get_current_prices(tickers, date, provider=None):
+        """
+        Helper method to get the current prices of many tickers in a single provider request, served from the price
+        cache when possible. Tickers that did not trade on the date get their last close and are reported as stale.
+
+        Parameters
+        ----------
+        tickers : `list`
+            Ticker symbols.
+        date : `pd.Timestamp`
+            Date as of which the prices are to be fetched.
+        provider : `PriceProvider`, optional
+            Price provider to fetch from. Defaults to the one configured in settings.
+
+        Returns
+        -------
+        `pd.DataFrame`
+            Dataframe indexed by ticker with the 'Price', 'Price Date' and 'Stale' columns.
         """
-        data = pdr.get_data_yahoo(ticker, start=date - BDay(1), end=date)
-        return data.iloc[0]['Adj Close']
+        return get_current_prices(tickers, date, provider)
 
 #     def construct_positions(self, date, trade_dataframe):
 #     """
@@ -383,10 +477,10 @@ class PortfolioConstructor:
 #             else:
 #                 self.portfolio.transact_asset(transaction)
 #
+#     prices = self.get_current_prices(list(self.portfolio.pos_handler.positions.keys()), date)['Price']
 #     for asset in self.portfolio.pos_handler.positions.keys():
-#         price = self.get_current_price(asset, date)
 #         position = self.portfolio.pos_handler.positions[asset]
-#         position.update_current_price(price, date)
+#         position.update_current_price(prices[asset], date)
 #         position_info.append([position.asset, position.net_quantity, position.market_price, position.market_value,
 #                               position.avg_price, position.net_incl_commission, position.unrealised_pnl,
 #                               position.realised_pnl, position.total_pnl, position.current_dt])
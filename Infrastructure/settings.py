@@ -1,3 +1,5 @@
+import os
+
 SUPPORTED = {
     'CURRENCIES': [
         'USD', 'GBP', 'EUR'
@@ -11,9 +13,54 @@ LOGGING = {
     'DATE_FORMAT': '%Y-%m-%d %H:%M:%S'
 }
 
+PRICE_CACHE = {
+    'DIRECTORY': os.path.join(os.path.expanduser('~'), '.quantango', 'cache'),
+    'MAX_AGE_HOURS': 12,
+    'OFFLINE': False
+}
+
+PORTFOLIO_STORE = {
+    'DIRECTORY': os.path.join(os.path.expanduser('~'), '.quantango')
+}
+
+PRICE_PROVIDER = {
+    'NAME': 'yahoo',
+    'DIRECTORY': None,
+    'SEED': 42
+}
+
 PRINT_EVENTS = True
 
+# 'verbose' logs every portfolio event, 'quiet' skips building the event messages altogether, e.g. for batch runs
+EVENTS_MODES = ('verbose', 'quiet')
+EVENTS_MODE = 'verbose'
+
 
 def set_print_events(print_events=True):
     global PRINT_EVENTS
-    PRINT_EVENTS = print_events
\ No newline at end of file
+    PRINT_EVENTS = print_events
+
+
+def set_events_mode(mode='verbose'):
+    global EVENTS_MODE
+    if mode not in EVENTS_MODES:
+        raise ValueError(f"Unknown events mode '{mode}'. Supported modes: {EVENTS_MODES}")
+    EVENTS_MODE = mode
+
+
+def set_offline_mode(offline=True):
+    PRICE_CACHE['OFFLINE'] = offline
+
+
+def set_price_cache_directory(directory):
+    PRICE_CACHE['DIRECTORY'] = directory
+
+
+def set_portfolio_store_directory(directory):
+    PORTFOLIO_STORE['DIRECTORY'] = directory
+
+
+def set_price_provider(name, directory=None, seed=42):
+    PRICE_PROVIDER['NAME'] = name
+    PRICE_PROVIDER['DIRECTORY'] = directory
+    PRICE_PROVIDER['SEED'] = seed
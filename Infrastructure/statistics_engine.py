@@ -0,0 +1,262 @@
+from datetime import datetime as _dt
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+from Infrastructure.Utilities import custom_statistics as cs
+
+
+class StatisticsEngine:
+    """
+    Computes the returns, performance, risk and additional statistics of a portfolio and its benchmark in a single
+    pass. Both return series are stacked into one matrix, so every kernel of custom_statistics evaluates the two of
+    them in one call, and the drawdown series and details shared by several metrics are computed once.
+
+    The tables are numeric. Returns, VaR, volatility, drawdowns, Kelly criterion, risk of ruin and batting ratio are
+    fractions, see percent_metrics, and are formatted as percentages by the view.
+
+    Parameters
+    ----------
+    portfolio_returns : `pd.Series`
+        Daily portfolio returns indexed by date.
+    benchmark_returns : `pd.Series`
+        Daily benchmark returns on the same dates.
+    periods : `int`, optional
+        Number of periods in a year, used to annualise.
+    """
+
+    returns_metrics = ['Cum. Return', 'CAGR', 'Ex. Return (D)', 'Ex. Return (M)', 'Ex. Return (Y)', 'MTD Return',
+                       '3M Return', '6M Return', 'YTD Return', '1Y Return']
+    performance_metrics = ['Sharpe Ratio', 'Sortino Ratio', 'Omega Ratio', 'Kelly Criterion', 'Payoff Ratio',
+                           'Calmar Ratio', 'CPC Index', 'Outlier Win', 'Outlier Loss', 'Tail Ratio']
+    risk_metrics = ['VaR', 'cVaR', 'Risk of Ruin', 'Volatility', 'Skewness', 'Kurtosis', 'Max DD', 'DD Duration',
+                    'Avg. DD', 'Rec. Factor']
+    additional_metrics = ['Alpha', 'Beta', 'Information Ratio', 'Treynor Ratio', 'R-Squared', 'Up Capture',
+                          'Down Capture', 'Batting Ratio']
+    percent_metrics = frozenset(returns_metrics + ['Kelly Criterion', 'VaR', 'cVaR', 'Risk of Ruin', 'Volatility',
+                                                   'Max DD', 'Avg. DD', 'Batting Ratio'])
+    integer_metrics = frozenset(['DD Duration'])
+    columns = ['Portfolio', 'Benchmark']
+
+    def __init__(self, portfolio_returns, benchmark_returns, periods=252):
+        self._set_returns(portfolio_returns.index, np.column_stack([portfolio_returns.to_numpy(dtype=np.float64),
+                                                                    benchmark_returns.to_numpy(dtype=np.float64)]),
+                          periods)
+
+    @classmethod
+    def from_panel(cls, returns, periods=252):
+        """
+        Builds an engine over every column of a returns panel. The returns, performance and risk tables then have
+        one column per series of the panel.
+
+        Parameters
+        ----------
+        returns : `pd.DataFrame`
+            Daily returns indexed by date, one column per series.
+        periods : `int`, optional
+            Number of periods in a year, used to annualise.
+
+        Returns
+        -------
+        `StatisticsEngine`
+        """
+        engine = cls.__new__(cls)
+        engine.columns = list(returns.columns)
+        engine._set_returns(returns.index, returns.to_numpy(dtype=np.float64), periods)
+        return engine
+
+    def _set_returns(self, dates, returns, periods):
+        self.dates = pd.DatetimeIndex(dates)
+        self.periods = periods
+        self.returns = returns
+
+        # Shared by the drawdown, Calmar and recovery statistics
+        self.drawdown = cs.to_drawdown_series(self.returns)
+        self.max_drawdown = self.drawdown.min(axis=0)
+        self.drawdown_details = cs.drawdown_details(self.drawdown, self.dates)
+
+    def _compound_since(self, date):
+        return cs.comp(self.returns[self.dates.searchsorted(pd.Timestamp(date)):])
+
+    def returns_statistics(self):
+        """
+        Returns
+        -------
+        `pd.DataFrame`
+            Cumulative, annualised, expected and period returns.
+        """
+        today = self.dates[-1]
+
+        data = [
+            cs.comp(self.returns),
+            cs.cagr(self.returns, periods=365),
+            cs.expected_return(self.returns),
+            cs.expected_return(self.returns, groups=self.dates.year * 12 + self.dates.month),
+            cs.expected_return(self.returns, groups=self.dates.year),
+            self._compound_since(_dt(today.year, today.month, 1)),
+            self._compound_since(today - relativedelta(months=3)),
+            self._compound_since(today - relativedelta(months=6)),
+            self._compound_since(_dt(today.year, 1, 1)),
+            self._compound_since(today - relativedelta(years=1))
+        ]
+        return pd.DataFrame(data, index=self.returns_metrics, columns=self.columns)
+
+    def performance_statistics(self):
+        """
+        Returns
+        -------
+        `pd.DataFrame`
+            Risk-adjusted return ratios.
+        """
+        data = [
+            cs.sharpe(self.returns, periods=self.periods),
+            cs.sortino(self.returns, periods=self.periods),
+            cs.omega(self.returns, periods=self.periods),
+            cs.kelly_criterion(self.returns),
+            cs.payoff_ratio(self.returns),
+            cs.calmar(self.returns, periods=self.periods, max_dd=self.max_drawdown),
+            cs.cpc_index(self.returns),
+            cs.outlier_win_ratio(self.returns),
+            cs.outlier_loss_ratio(self.returns),
+            cs.tail_ratio(self.returns)
+        ]
+        return pd.DataFrame(data, index=self.performance_metrics, columns=self.columns)
+
+    def risk_statistics(self, confidence=0.95):
+        """
+        Parameters
+        ----------
+        confidence : `float`, optional
+            Confidence level of the parametric VaR and cVaR.
+
+        Returns
+        -------
+        `pd.DataFrame`
+            Tail risk, volatility, moments and drawdown statistics.
+        """
+        data = [
+            cs.value_at_risk(self.returns, confidence=confidence),
+            cs.conditional_value_at_risk(self.returns, confidence=confidence),
+            cs.risk_of_ruin(self.returns),
+            cs.volatility(self.returns, periods=self.periods),
+            cs.skew(self.returns),
+            cs.kurtosis(self.returns),
+            self.max_drawdown,
+            [details['days'].max() if len(details) else 0 for details in self.drawdown_details],
+            [details['max drawdown'].mean() if len(details) else 0.0 for details in self.drawdown_details],
+            cs.recovery_factor(self.returns, max_dd=self.max_drawdown)
+        ]
+        return pd.DataFrame(data, index=self.risk_metrics, columns=self.columns)
+
+    def additional_statistics(self):
+        """
+        Returns
+        -------
+        `pd.DataFrame`
+            Single row of statistics of the portfolio relative to the benchmark.
+        """
+        data = [self.relative_statistics(self.returns[:, 0], self.returns[:, 1])]
+        return pd.DataFrame(data, columns=self.additional_metrics)
+
+    def relative_statistics(self, returns, benchmark):
+        """
+        Statistics of returns relative to benchmark returns, in the order of additional_metrics. Given matrices,
+        column i of the returns is compared with column i of the benchmark.
+
+        Parameters
+        ----------
+        returns : `np.ndarray`
+            Returns of shape (periods,) or (periods, pairs).
+        benchmark : `np.ndarray`
+            Benchmark returns of the same shape.
+
+        Returns
+        -------
+        `list`
+            One float, or one array with a value per pair, for each metric.
+        """
+        alpha, beta = cs.alpha_beta(returns, benchmark, periods=self.periods)
+        return [alpha, beta,
+                cs.information_ratio(returns, benchmark),
+                cs.treynor_ratio(returns, benchmark),
+                cs.r_squared(returns, benchmark),
+                cs.up_capture(returns, benchmark, periods=self.periods),
+                cs.down_capture(returns, benchmark, periods=self.periods),
+                cs.batting_average(returns, benchmark)]
+
+    def compute(self):
+        """
+        Computes every statistics table.
+
+        Returns
+        -------
+        `dict`
+            The 'returns', 'performance', 'risk' and 'additional' statistics dataframes.
+        """
+        return {
+            'returns': self.returns_statistics(),
+            'performance': self.performance_statistics(),
+            'risk': self.risk_statistics(),
+            'additional': self.additional_statistics()
+        }
+
+
+def peer_statistics(portfolio_returns, benchmark_returns, periods=252):
+    """
+    Computes the statistics of every portfolio against every benchmark. The returns, performance and risk statistics
+    are computed once per series over the whole panel and the relative statistics of the N x M pairs in one
+    broadcast call per metric, instead of one StatisticsEngine per pair.
+
+    Parameters
+    ----------
+    portfolio_returns : `pd.DataFrame`
+        Daily returns of N portfolios, one column per portfolio.
+    benchmark_returns : `pd.DataFrame`
+        Daily returns of M benchmarks, one column per benchmark. Only the dates common to both panels are used.
+    periods : `int`, optional
+        Number of periods in a year, used to annualise.
+
+    Returns
+    -------
+    `pd.DataFrame`
+        Tidy dataframe with one row per portfolio, benchmark, table and metric, ordered by portfolio and benchmark.
+        The 'portfolio value' and 'benchmark value' columns hold the 'Portfolio' and 'Benchmark' columns of the
+        StatisticsEngine tables of the pair. The 'additional' statistics are relative to the benchmark and have no
+        benchmark value.
+    """
+    dates = portfolio_returns.index.intersection(benchmark_returns.index).sort_values()
+    portfolios, benchmarks = list(portfolio_returns.columns), list(benchmark_returns.columns)
+    n, m = len(portfolios), len(benchmarks)
+
+    panel = np.column_stack([portfolio_returns.reindex(dates).to_numpy(dtype=np.float64),
+                             benchmark_returns.reindex(dates).to_numpy(dtype=np.float64)])
+    engine = StatisticsEngine.from_panel(pd.DataFrame(panel, index=dates), periods=periods)
+
+    # Pair p compares portfolio ptf_index[p] with benchmark bmk_index[p]
+    ptf_index, bmk_index = np.repeat(np.arange(n), m), np.tile(np.arange(m), n)
+
+    tables, metrics, ptf_values, bmk_values = [], [], [], []
+    for table in ('returns', 'performance', 'risk'):
+        frame = getattr(engine, f'{table}_statistics')()
+        values = frame.to_numpy(dtype=np.float64)
+        tables += [table] * len(frame)
+        metrics += list(frame.index)
+        ptf_values.append(values[:, ptf_index])
+        bmk_values.append(values[:, n + bmk_index])
+
+    relative = np.array(engine.relative_statistics(panel[:, ptf_index], panel[:, n + bmk_index]), ndmin=2)
+    tables += ['additional'] * len(relative)
+    metrics += StatisticsEngine.additional_metrics
+    ptf_values.append(relative)
+    bmk_values.append(np.full_like(relative, np.nan))
+
+    count = len(metrics)
+    return pd.DataFrame({
+        'portfolio': np.repeat(np.array(portfolios, dtype=object)[ptf_index], count),
+        'benchmark': np.repeat(np.array(benchmarks, dtype=object)[bmk_index], count),
+        'table': np.tile(tables, n * m),
+        'metric': np.tile(metrics, n * m),
+        'portfolio value': np.vstack(ptf_values).T.ravel(),
+        'benchmark value': np.vstack(bmk_values).T.ravel()
+    })
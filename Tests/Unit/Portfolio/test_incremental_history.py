@@ -0,0 +1,119 @@
+import pandas as pd
+import pytest
+
+from Infrastructure.portfolio_constructor import PortfolioConstructor
+from Infrastructure.Utilities.price_providers import SyntheticPriceProvider
+
+START_DATE = pd.Timestamp('2021-12-31')
+END_DATE = pd.Timestamp('2022-06-30')
+
+
+def make_trades(rows):
+    return pd.DataFrame(rows, columns=['Symbol', 'Quantity', 'Price', 'Date', 'Commission']).assign(
+        Date=lambda frame: pd.to_datetime(frame['Date'])
+    )
+
+
+BASE_TRADES = [
+    ['AAPL', 100, 100.0, '2022-01-03', 2.0],
+    ['MSFT', 50, 101.0, '2022-01-03', 2.0],
+    ['SUBSCRIPTION', 5000.0, 0.0, '2022-02-14', 0.0],
+    ['AAPL', -40, 102.0, '2022-03-01', 2.0],
+    ['MSFT', -50, 99.0, '2022-05-02', 2.0]
+]
+
+
+class CountingProvider(SyntheticPriceProvider):
+    """
+    Synthetic provider recording the start date of every request.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.starts = []
+
+    def get_history(self, symbols, start_date, end_date, adjusted=True):
+        self.starts.append(pd.Timestamp(start_date))
+        return super().get_history(symbols, start_date, end_date, adjusted)
+
+
+def full_build(trades, end_date=END_DATE, provider=None):
+    provider = provider if provider is not None else SyntheticPriceProvider()
+    constructor = PortfolioConstructor(START_DATE, 100000.0, 'Test', 'USD', provider=provider)
+    constructor.construct_portfolio_history(trades.copy(), end_date)
+    return constructor
+
+
+def assert_same_history(incremental, full):
+    pd.testing.assert_frame_equal(incremental.portfolio_timeseries, full.portfolio_timeseries)
+    pd.testing.assert_frame_equal(incremental.holdings.reset_index(drop=True), full.holdings.reset_index(drop=True))
+    assert incremental.portfolio.cash == full.portfolio.cash
+    assert [pe.to_dict() for pe in incremental.portfolio.history] == [pe.to_dict() for pe in full.portfolio.history]
+
+
+@pytest.mark.parametrize('edited_rows, edit_date', [
+    (BASE_TRADES + [['AAPL', 10, 105.0, '2022-04-05', 1.0]], '2022-04-05'),
+    (BASE_TRADES + [['GS', 10, 300.0, '2022-03-12', 1.0]], '2022-03-12'),
+    (BASE_TRADES[:3] + BASE_TRADES[4:], '2022-03-01'),
+    (BASE_TRADES + [['WITHDRAWAL', 1000.0, 0.0, '2022-06-30', 0.0]], '2022-06-30')
+])
+def test_incremental_update_matches_full_rebuild(edited_rows, edit_date, monkeypatch):
+    """
+    Tests that replaying from the last checkpoint before an inserted or
+    deleted trade gives the same history as a full rebuild, and that the
+    days before the checkpoint are not replayed.
+    """
+    constructor = full_build(make_trades(BASE_TRADES))
+    replayed = []
+    replay = PortfolioConstructor._replay_history
+    monkeypatch.setattr(PortfolioConstructor, '_replay_history',
+                        lambda self, trades, date_index, first_day: (replayed.append(first_day),
+                                                                     replay(self, trades, date_index, first_day)))
+
+    edited = make_trades(edited_rows)
+    constructor.update_portfolio_history(edited.copy(), END_DATE, pd.Timestamp(edit_date))
+
+    edit_day = pd.date_range(START_DATE, END_DATE, freq='B').searchsorted(pd.Timestamp(edit_date))
+    assert replayed == [edit_day - edit_day % PortfolioConstructor.checkpoint_interval]
+    assert replayed[0] > 0
+    assert_same_history(constructor, full_build(edited))
+
+
+def test_update_without_edits_or_with_new_end_date():
+    """
+    Tests that an update without edits keeps the history and that a
+    different end date rebuilds it.
+    """
+    trades = make_trades(BASE_TRADES)
+    constructor = full_build(trades)
+    timeseries = constructor.portfolio_timeseries
+
+    constructor.update_portfolio_history(trades.copy(), END_DATE)
+    assert constructor.portfolio_timeseries is timeseries
+
+    constructor.update_portfolio_history(trades.copy(), pd.Timestamp('2022-07-29'))
+    assert constructor.portfolio_timeseries['Date'].iloc[-1] == pd.Timestamp('2022-07-29')
+    assert constructor.portfolio.cash == full_build(trades).portfolio.cash
+
+
+def test_roll_forward_fetches_only_new_days():
+    """
+    Tests that moving the end date forward or back extends or truncates the
+    history and the returns without refetching the earlier prices, and gives
+    the same result as a full rebuild.
+    """
+    trades = make_trades(BASE_TRADES)
+    provider = CountingProvider()
+    constructor = full_build(trades, provider=provider)
+    constructor.construct_returns_dataframe('S&P 500', END_DATE)
+
+    for end_date in [pd.Timestamp('2022-08-31'), pd.Timestamp('2022-09-03'), pd.Timestamp('2022-05-31')]:
+        provider.starts.clear()
+        previous_end = constructor.end_date
+        constructor.update_portfolio_history(trades.copy(), end_date)
+        returns = constructor.construct_returns_dataframe('S&P 500', end_date)
+
+        assert all(start >= min(previous_end, end_date) for start in provider.starts)
+        full = full_build(trades, end_date)
+        assert_same_history(constructor, full)
+        pd.testing.assert_frame_equal(returns, full.construct_returns_dataframe('S&P 500', end_date))
@@ -2,6 +2,7 @@ import pandas as pd
 import pytz
 import pytest
 
+from Infrastructure import settings
 from Infrastructure.Portfolio.portfolio import Portfolio
 from Infrastructure.Portfolio.portfolio_event import PortfolioEvent
 from Infrastructure.Portfolio.transaction import Transaction
@@ -394,3 +395,29 @@ def test_history_to_df_empty():
     assert sorted(test_df.columns) == sorted(hist_df.columns)
     assert len(test_df) == len(hist_df)
     assert len(hist_df) == 0
+
+
+def test_quiet_events_mode_skips_event_logging(caplog, monkeypatch):
+    """
+    Tests that portfolio events are logged in the verbose events mode and
+    that no message is built in the quiet mode.
+    """
+    start_dt = pd.Timestamp('2017-10-05 08:00:00', tz=pytz.UTC)
+    caplog.set_level('INFO', logger='Portfolio')
+
+    port = Portfolio(start_dt, portfolio_id='1234')
+    port.subscribe_funds(start_dt, 1000.0)
+    assert caplog.messages[-1] == (
+        '(2017-10-05 08:00:00) Funds subscribed to portfolio "1234" '
+        '- Credit: 1000.00, Balance: 1000.00'
+    )
+
+    caplog.clear()
+    monkeypatch.setattr(settings, 'EVENTS_MODE', 'quiet')
+    port.subscribe_funds(start_dt, 1000.0)
+    port.withdraw_funds(start_dt, 500.0)
+    assert caplog.records == []
+    assert port.history[-1].balance == 1500.0
+
+    with pytest.raises(ValueError):
+        settings.set_events_mode('silent')
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+from Infrastructure import settings
+from Infrastructure.portfolio_batch import compute_portfolios, shared_price_source
+from Infrastructure.portfolio_constructor import PortfolioConstructor
+from Infrastructure.Utilities.data_sourcer import PriceDataSource
+from Infrastructure.Utilities.price_providers import SyntheticPriceProvider
+
+
+class CountingProvider(SyntheticPriceProvider):
+    """
+    Synthetic provider recording every request.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    def get_history(self, symbols, start_date, end_date, adjusted=True):
+        self.requests.append((list(symbols), pd.Timestamp(start_date), pd.Timestamp(end_date)))
+        return super().get_history(symbols, start_date, end_date, adjusted)
+
+
+def make_trades(symbols, dates):
+    return pd.DataFrame({
+        'Symbol': symbols,
+        'Quantity': [10.0] * len(symbols),
+        'Price': [100.0] * len(symbols),
+        'Date': pd.to_datetime(dates),
+        'Commission': [1.0] * len(symbols)
+    })
+
+
+def test_shared_price_source_fetches_once():
+    """
+    Tests that the union of the symbols of several portfolios is fetched in
+    a single request starting at the earliest trade.
+    """
+    provider = CountingProvider()
+    first = make_trades(['AAPL', 'MSFT'], ['2022-02-01', '2022-02-02'])
+    second = make_trades(['MSFT', 'GS', 'SUBSCRIPTION'], ['2022-01-10', '2022-01-11', '2022-01-12'])
+
+    source = shared_price_source([first, second], pd.Timestamp('2022-03-31'), provider)
+
+    assert provider.requests == [(['AAPL', 'MSFT', 'GS'], pd.Timestamp('2022-01-10'), pd.Timestamp('2022-03-31'))]
+    assert source.symbols == ['AAPL', 'MSFT', 'GS']
+
+
+def test_history_from_shared_prices_matches_own_fetch():
+    """
+    Tests that building a portfolio from shared prices and pre-fetched
+    benchmark prices gives the same result as fetching its own.
+    """
+    provider = SyntheticPriceProvider()
+    trades = make_trades(['AAPL', 'MSFT'], ['2022-02-01', '2022-02-02'])
+    other = make_trades(['GS'], ['2022-01-03'])
+    end_date = pd.Timestamp('2022-03-31')
+    start_date = pd.Timestamp('2022-01-31')
+
+    own = PortfolioConstructor(start_date, 100000.0, 'Own', 'USD', provider=provider)
+    own.construct_portfolio_history(trades.copy(), end_date)
+    own_returns = own.construct_returns_dataframe('S&P 500', end_date)
+
+    shared = PortfolioConstructor(start_date, 100000.0, 'Shared', 'USD', provider=CountingProvider())
+    data_handler = shared_price_source([trades, other], end_date, provider)
+    benchmark_prices = provider.get_history(['^GSPC'], '2022-01-03', end_date)['^GSPC']
+    shared.construct_portfolio_history(trades.copy(), end_date, data_handler=data_handler)
+    shared_returns = shared.construct_returns_dataframe('S&P 500', end_date, benchmark_prices)
+
+    assert shared.provider.requests == []
+    pd.testing.assert_frame_equal(own.portfolio_timeseries, shared.portfolio_timeseries)
+    pd.testing.assert_frame_equal(own.holdings, shared.holdings)
+    pd.testing.assert_frame_equal(own_returns, shared_returns)
+
+
+def test_subset_matches_own_fetch():
+    """
+    Tests that the part of the shared prices a portfolio trades equals the
+    prices it fetches on its own.
+    """
+    provider = SyntheticPriceProvider()
+    trades = make_trades(['MSFT', 'SUBSCRIPTION', 'AAPL'], ['2022-02-01', '2022-02-01', '2022-02-02'])
+    other = make_trades(['GS'], ['2022-01-03'])
+    end_date = pd.Timestamp('2022-03-31')
+
+    subset = shared_price_source([trades, other], end_date, provider).subset(trades)
+    own = PriceDataSource(trades, end_date, provider=provider)
+
+    assert subset.symbols == own.symbols == ['MSFT', 'AAPL']
+    assert subset.trade_dataframe is trades
+    pd.testing.assert_index_equal(subset.dates, own.dates)
+    np.testing.assert_array_equal(subset.prices, own.prices)
+
+
+def test_workers_use_runtime_price_settings(monkeypatch, tmp_path):
+    """
+    Tests that spawned workers use the price provider set at runtime and
+    only return the prices of their own portfolio.
+    """
+    monkeypatch.setitem(settings.PRICE_PROVIDER, 'NAME', 'synthetic')
+    monkeypatch.setitem(settings.PRICE_PROVIDER, 'SEED', 3)
+    monkeypatch.setitem(settings.PRICE_CACHE, 'DIRECTORY', str(tmp_path))
+    portfolios = [
+        {'trades': make_trades(['AAPL', 'MSFT'], ['2022-02-01', '2022-02-02']), 'ptf_cash': 100000.0,
+         'ptf_name': 'First', 'ptf_curr': 'USD'},
+        {'trades': make_trades(['GS'], ['2022-01-03']), 'ptf_cash': 50000.0, 'ptf_name': 'Second', 'ptf_curr': 'USD'}
+    ]
+
+    results = dict(compute_portfolios(portfolios, pd.Timestamp('2022-03-31'), 'S&P 500', max_workers=2))
+
+    first = results['First']['constructor']
+    assert isinstance(first.provider, SyntheticPriceProvider)
+    assert first.provider.seed == 3
+    assert first.data_handler.symbols == ['AAPL', 'MSFT']
+    assert results['Second']['constructor'].data_handler.symbols == ['GS']
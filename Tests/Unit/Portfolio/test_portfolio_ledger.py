@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Infrastructure.Portfolio.portfolio_event import PortfolioEvent
+from Infrastructure.Portfolio.portfolio_ledger import PortfolioLedger, describe_transaction
+
+
+def _events(tz='UTC'):
+    dates = pd.date_range('2022-01-03', periods=5, freq='D', tz=tz)
+    return [
+        PortfolioEvent.create_subscription(dates[0], 1000.0, 1000.0),
+        PortfolioEvent(dates[1], 'asset_transaction', 'LONG 10 EQ:AAA 50.00 04/01/2022', 501.0, 0.0, 499.0),
+        PortfolioEvent(dates[2], 'asset_transaction', 'SHORT -5 EQ:AAA 60.00 05/01/2022', 0.0, 299.0, 798.0),
+        PortfolioEvent.create_withdrawal(dates[3], 100.0, 698.0),
+        PortfolioEvent.create_subscription(dates[4], 50.0, 748.0),
+    ]
+
+
+@pytest.mark.parametrize('tz', ['UTC', 'Europe/London', None])
+def test_ledger_round_trips_events(tz):
+    """
+    Tests that the ledger returns the appended events, grows past its
+    initial capacity and compares equal to the list of events.
+    """
+    events = _events(tz)
+    ledger = PortfolioLedger(capacity=2)
+    for event in events:
+        ledger.append(event)
+
+    assert len(ledger) == 5
+    assert ledger == events
+    assert list(ledger) == events
+    assert ledger[-1] == events[-1]
+    assert ledger[1:3] == events[1:3]
+    assert ledger != events[:4]
+    with pytest.raises(IndexError):
+        ledger[5]
+
+
+def test_ledger_truncate():
+    """
+    Tests that truncating drops the latest events and later appends reuse
+    the freed rows.
+    """
+    events = _events()
+    ledger = PortfolioLedger()
+    for event in events:
+        ledger.append(event)
+
+    ledger.truncate(2)
+    assert ledger == events[:2]
+    ledger.append(events[3])
+    assert ledger == events[:2] + [events[3]]
+
+
+def test_ledger_to_frame_and_between():
+    """
+    Tests the dataframe of the ledger and slicing it by datetime.
+    """
+    events = _events()
+    ledger = PortfolioLedger()
+    for event in events:
+        ledger.append(event)
+
+    frame = ledger.to_frame()
+    expected = pd.DataFrame([event.to_dict() for event in events])
+    assert list(frame.columns) == PortfolioLedger.columns
+    assert isinstance(frame['type'].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(frame, expected, check_dtype=False, check_categorical=False)
+    assert np.shares_memory(frame['balance'].to_numpy(), ledger._balance)
+
+    window = ledger.between(pd.Timestamp('2022-01-04'), pd.Timestamp('2022-01-06', tz='UTC'))
+    assert window['balance'].tolist() == [499.0, 798.0, 698.0]
+    assert ledger.between(pd.Timestamp('2023-01-01'), pd.Timestamp('2023-02-01')).empty
+
+
+def test_ledger_renders_transaction_descriptions_on_read():
+    """
+    Tests that asset transactions recorded without a description are
+    described when read back, both as events and in the dataframe.
+    """
+    dates = pd.date_range('2017-10-06', periods=3, freq='D', tz='UTC')
+    ledger = PortfolioLedger()
+    ledger.append(PortfolioEvent.create_subscription(dates[0], 1000.0, 1000.0))
+    ledger.record_transaction(dates[1], 'eq:aaa', 100, 5.67, 567.0, 0.0, 433.0)
+    ledger.record_transaction(dates[2], 'EQ:BBB', -2.5, 10.0, 0.0, 25.0, 458.0)
+
+    descriptions = ['SUBSCRIPTION', 'LONG 100 EQ:AAA 5.67 07/10/2017', 'SHORT -2.5 EQ:BBB 10.00 08/10/2017']
+    assert [event.description for event in ledger] == descriptions
+    assert ledger.to_frame()['description'].tolist() == descriptions
+    assert ledger.between(dates[2], dates[2])['description'].tolist() == descriptions[2:]
+    assert describe_transaction('EQ:AAA', 100, 5.67, dates[1]) == descriptions[1]
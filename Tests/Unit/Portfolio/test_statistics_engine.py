@@ -0,0 +1,147 @@
+import warnings
+
+import empyrical as ep
+import numpy as np
+import pandas as pd
+import pytest
+import quantstats as qs
+
+from Infrastructure.statistics_engine import StatisticsEngine, peer_statistics
+
+
+@pytest.fixture(scope='module')
+def returns():
+    rng = np.random.default_rng(7)
+    dates = pd.bdate_range('2021-03-10', '2023-06-20')
+    ptf = pd.Series(rng.normal(0.0005, 0.012, len(dates)), index=dates)
+    bmk = 0.5 * ptf + 0.5 * pd.Series(rng.normal(0.0003, 0.01, len(dates)), index=dates)
+    ptf.iloc[0] = bmk.iloc[0] = 0.0
+    return ptf, bmk
+
+
+@pytest.fixture(scope='module')
+def tables(returns):
+    return StatisticsEngine(*returns).compute()
+
+
+def _library_statistics(returns):
+    today = returns.index[-1]
+    drawdown_info = qs.stats.drawdown_details(qs.stats.to_drawdown_series(returns))
+    return {
+        'Cum. Return': qs.stats.comp(returns),
+        'CAGR': qs.stats.cagr(returns, periods=365),
+        'Ex. Return (D)': qs.stats.expected_return(returns),
+        'Ex. Return (M)': qs.stats.expected_return(returns, aggregate='eom'),
+        'Ex. Return (Y)': qs.stats.expected_return(returns, aggregate='eoy'),
+        'MTD Return': qs.stats.comp(returns[returns.index >= pd.Timestamp(today.year, today.month, 1)]),
+        '3M Return': qs.stats.comp(returns[returns.index >= today - pd.DateOffset(months=3)]),
+        'YTD Return': qs.stats.comp(returns[returns.index >= pd.Timestamp(today.year, 1, 1)]),
+        '1Y Return': qs.stats.comp(returns[returns.index >= today - pd.DateOffset(years=1)]),
+        'Sharpe Ratio': qs.stats.sharpe(returns),
+        'Sortino Ratio': qs.stats.sortino(returns),
+        'Omega Ratio': ep.omega_ratio(returns),
+        'Kelly Criterion': qs.stats.kelly_criterion(returns),
+        'Payoff Ratio': qs.stats.payoff_ratio(returns),
+        'Calmar Ratio': qs.stats.calmar(returns),
+        'CPC Index': qs.stats.cpc_index(returns),
+        'Outlier Win': qs.stats.outlier_win_ratio(returns),
+        'Outlier Loss': qs.stats.outlier_loss_ratio(returns),
+        'Tail Ratio': qs.stats.tail_ratio(returns),
+        'VaR': qs.stats.var(returns),
+        'cVaR': qs.stats.cvar(returns),
+        'Volatility': qs.stats.volatility(returns),
+        'Skewness': qs.stats.skew(returns),
+        'Kurtosis': qs.stats.kurtosis(returns),
+        'Max DD': qs.stats.max_drawdown(returns),
+        'DD Duration': drawdown_info['days'].max(),
+        'Avg. DD': drawdown_info['max drawdown'].mean() / 100,
+        'Rec. Factor': qs.stats.recovery_factor(returns),
+    }
+
+
+@pytest.mark.parametrize('column', [0, 1])
+def test_statistics_match_quantstats(returns, tables, column):
+    """
+    Tests the portfolio and benchmark statistics against quantstats and
+    empyrical.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        expected = _library_statistics(returns[column])
+
+    computed = pd.concat([tables['returns'], tables['performance'], tables['risk']]).iloc[:, column]
+    for metric, value in expected.items():
+        assert computed[metric] == pytest.approx(value, rel=1e-9), metric
+
+
+def test_additional_statistics_match_libraries(returns, tables):
+    """
+    Tests the statistics of the portfolio relative to the benchmark.
+    """
+    ptf, bmk = returns
+    alpha, beta = ep.alpha_beta(ptf, bmk)
+    expected = {
+        'Alpha': alpha,
+        'Beta': beta,
+        'Information Ratio': qs.stats.information_ratio(ptf, bmk),
+        'Treynor Ratio': qs.stats.treynor_ratio(ptf, bmk),
+        'R-Squared': qs.stats.r_squared(ptf, bmk),
+        'Up Capture': ep.up_capture(ptf, bmk),
+        'Down Capture': ep.down_capture(ptf, bmk),
+        'Batting Ratio': (ptf > bmk).mean()
+    }
+
+    assert list(tables['additional'].columns) == StatisticsEngine.additional_metrics
+    for metric, value in expected.items():
+        assert tables['additional'].loc[0, metric] == pytest.approx(value, rel=1e-9), metric
+
+
+def test_tables_are_numeric(tables):
+    assert list(tables['returns'].index) == StatisticsEngine.returns_metrics
+    assert list(tables['risk'].columns) == StatisticsEngine.columns
+    for table in tables.values():
+        assert all(pd.api.types.is_float_dtype(dtype) for dtype in table.dtypes)
+
+
+def test_series_without_drawdown():
+    """
+    Tests that a series that never falls below its peak has no drawdown
+    instead of failing.
+    """
+    dates = pd.bdate_range('2022-01-03', periods=30)
+    rising = pd.Series(0.001, index=dates)
+    rising.iloc[0] = 0.0
+
+    risk = StatisticsEngine(rising, rising).risk_statistics()
+    assert risk.loc['Max DD'].tolist() == [0.0, 0.0]
+    assert risk.loc['DD Duration'].tolist() == [0, 0]
+    assert np.isnan(risk.loc['Rec. Factor']).all()
+
+
+def test_peer_statistics_match_pairwise_engines():
+    """
+    Tests that the statistics of every portfolio and benchmark pair of the
+    panels match the tables of a StatisticsEngine built for that pair.
+    """
+    rng = np.random.default_rng(3)
+    dates = pd.bdate_range('2022-01-03', periods=300)
+    portfolios = pd.DataFrame(rng.normal(0.0004, 0.01, (len(dates), 3)), index=dates, columns=['X', 'Y', 'Z'])
+    benchmarks = pd.DataFrame(rng.normal(0.0002, 0.008, (len(dates) + 5, 2)),
+                              index=pd.bdate_range('2021-12-27', periods=len(dates) + 5), columns=['SPX', 'NDX'])
+
+    peers = peer_statistics(portfolios, benchmarks)
+
+    assert len(peers) == 3 * 2 * (30 + len(StatisticsEngine.additional_metrics))
+    assert list(peers.columns) == ['portfolio', 'benchmark', 'table', 'metric', 'portfolio value', 'benchmark value']
+    assert peers[['portfolio', 'benchmark']].drop_duplicates().values.tolist() == \
+        [['X', 'SPX'], ['X', 'NDX'], ['Y', 'SPX'], ['Y', 'NDX'], ['Z', 'SPX'], ['Z', 'NDX']]
+
+    for (portfolio, benchmark), pair in peers.groupby(['portfolio', 'benchmark']):
+        expected = StatisticsEngine(portfolios[portfolio], benchmarks[benchmark].loc[dates]).compute()
+        for table, rows in pair.groupby('table'):
+            rows = rows.set_index('metric')
+            if table == 'additional':
+                np.testing.assert_allclose(rows['portfolio value'], expected[table].iloc[0], rtol=1e-9)
+                assert rows['benchmark value'].isna().all()
+            else:
+                np.testing.assert_allclose(rows[['portfolio value', 'benchmark value']], expected[table], rtol=1e-9)
@@ -0,0 +1,79 @@
+import copy
+
+import pandas as pd
+
+from Infrastructure.Portfolio.position import Position
+from Infrastructure.Portfolio.transaction import Transaction
+from Infrastructure.Portfolio.transaction_batch import TransactionBatch
+from Infrastructure.Portfolio.transaction_index import TransactionIndex
+from Infrastructure.Utilities.business_day_check import BDay
+
+
+def _trades():
+    return pd.DataFrame({
+        'Symbol': ['EQ:AAA', 'EQ:BBB', 'EQ:AAA'],
+        'Quantity': [10, 5, -4],
+        'Price': [100.0, 50.0, 101.5],
+        'Date': pd.to_datetime(['2022-01-03 09:30:00', '2022-01-05 00:00:00', '2022-01-05 16:00:00']),
+        'Commission': [1.0, 0.5, 1.0]
+    })
+
+
+def test_batch_creates_transactions_on_access():
+    """
+    Tests that the batch yields the same transactions as creating them from
+    the dataframe rows, and that slices stay columnar.
+    """
+    trades = _trades()
+    batch = TransactionBatch.from_dataframe(trades)
+    expected = [
+        Transaction(asset, quantity, dt, price, 1, commission) for asset, quantity, dt, price, commission in
+        zip(trades['Symbol'], trades['Quantity'], trades['Date'], trades['Price'], trades['Commission'])
+    ]
+
+    assert len(batch) == 3
+    assert [repr(txn) for txn in batch] == [repr(txn) for txn in expected]
+    assert repr(batch[2]) == repr(expected[2])
+    assert batch[2].direction == -1
+
+    tail = batch[1:]
+    assert isinstance(tail, TransactionBatch)
+    assert tail.assets == ['EQ:BBB', 'EQ:AAA']
+    assert list(tail.dates) == list(trades['Date'][1:])
+
+
+def test_transaction_index_buckets_batch():
+    """
+    Tests that a transaction index over a batch returns the transactions of
+    every day as a batch.
+    """
+    date_index = pd.date_range('2022-01-03', '2022-01-07', freq=BDay())
+    index = TransactionIndex(TransactionBatch.from_dataframe(_trades()), date_index)
+
+    assert [txn.asset for txn in index.on_day(0)] == ['EQ:AAA']
+    assert len(index.on_day(1)) == 0
+    assert [txn.quantity for txn in index.on_day(2)] == [5, -4]
+
+
+def test_position_derived_fields_follow_updates():
+    """
+    Tests that the stored derived fields of a position are refreshed on
+    every transaction and price update, and are independent in copies.
+    """
+    batch = TransactionBatch.from_dataframe(_trades())
+    position = Position.open_from_transaction(batch[0])
+    snapshot = copy.copy(position)
+
+    position.update_current_price(105.0, pd.Timestamp('2022-01-04'))
+    assert position.market_value == 1050.0
+    assert position.unrealised_pnl == round(105.0 - 100.1, 2) * 10
+
+    position.transact(batch[2])
+    assert position.net_quantity == 6
+    assert position.realised_pnl == round((101.5 - 100.0) * 4 - 0.4 * 1.0 - 1.0, 2)
+    assert position.market_value == 101.5 * 6
+    assert position.total_pnl == round(position.realised_pnl + position.unrealised_pnl, 2)
+
+    assert snapshot.market_value == 1000.0
+    assert snapshot.net_quantity == 10
+    assert not hasattr(position, '__dict__')
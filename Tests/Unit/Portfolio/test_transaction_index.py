@@ -0,0 +1,80 @@
+import pandas as pd
+
+from Infrastructure.Portfolio.transaction import Transaction
+from Infrastructure.Portfolio.transaction_batch import TransactionBatch
+from Infrastructure.Portfolio.transaction_index import TransactionIndex
+from Infrastructure.Utilities.business_day_check import BDay
+
+
+def _transactions(dates):
+    return [
+        Transaction('EQ:AAA', 10, pd.Timestamp(dt), 100.0, order_id=i)
+        for i, dt in enumerate(dates)
+    ]
+
+
+def test_transactions_bucketed_by_business_day():
+    """
+    Tests that every day only returns the transactions falling on it,
+    in date order.
+    """
+    date_index = pd.date_range('2022-01-03', '2022-01-07', freq=BDay())
+    transactions = _transactions([
+        '2022-01-03 09:30:00', '2022-01-03 16:00:00', '2022-01-05 12:00:00', '2022-01-07 23:59:59'
+    ])
+    index = TransactionIndex(transactions, date_index)
+
+    assert index.on_day(0) == transactions[0:2]
+    assert index.on_day(1) == []
+    assert index.on_day(2) == [transactions[2]]
+    assert index.on_day(3) == []
+    assert index.on_day(4) == [transactions[3]]
+    assert len(index) == 4
+
+
+def test_weekend_transactions_assigned_to_next_business_day():
+    """
+    Tests that transactions dated on a weekend are processed on the
+    following Monday rather than dropped, dated at the start of the Monday
+    without changing the original transactions.
+    """
+    date_index = pd.date_range('2022-01-06', '2022-01-11', freq=BDay())
+    transactions = _transactions(['2022-01-07 10:00:00', '2022-01-08 11:00:00', '2022-01-09', '2022-01-10 09:00:00'])
+    index = TransactionIndex(transactions, date_index)
+
+    assert index.on_day(1) == [transactions[0]]
+    monday = index.on_day(2)
+    assert [txn.order_id for txn in monday] == [1, 2, 3]
+    assert [txn.dt for txn in monday] == [pd.Timestamp('2022-01-10')] * 2 + [pd.Timestamp('2022-01-10 09:00:00')]
+    assert monday[2] is transactions[3]
+    assert transactions[1].dt == pd.Timestamp('2022-01-08 11:00:00')
+    assert list(index.days) == [1, 2, 2, 2]
+
+
+def test_weekend_transactions_in_batch_dated_at_next_business_day():
+    date_index = pd.date_range('2022-01-06', '2022-01-11', freq=BDay())
+    batch = TransactionBatch(
+        ['EQ:AAA'] * 3, [10, -5, 3],
+        pd.DatetimeIndex(['2022-01-07 10:00:00', '2022-01-08 11:00:00', '2022-01-10 09:00:00']),
+        [100.0, 101.0, 102.0], [1.0, 1.0, 1.0]
+    )
+    index = TransactionIndex(batch, date_index)
+
+    assert list(index.on_day(2).dates) == [pd.Timestamp('2022-01-10'), pd.Timestamp('2022-01-10 09:00:00')]
+    assert batch.dates[1] == pd.Timestamp('2022-01-08 11:00:00')
+
+
+def test_transactions_outside_date_index_excluded():
+    """
+    Tests that transactions before the first or after the last day of
+    the date index are not dispatched.
+    """
+    date_index = pd.date_range('2022-01-04', '2022-01-06', freq=BDay())
+    transactions = _transactions(['2022-01-03', '2022-01-04', '2022-01-06 18:00:00', '2022-01-07', '2022-01-08'])
+    index = TransactionIndex(transactions, date_index)
+
+    assert index.on_day(0) == [transactions[1]]
+    assert index.on_day(1) == []
+    assert index.on_day(2) == [transactions[2]]
+    assert list(index.days) == [-1, 0, 2, -1, -1]
+    assert len(index) == 2
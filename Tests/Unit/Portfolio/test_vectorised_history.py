@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Infrastructure.portfolio_constructor import PortfolioConstructor
+from Infrastructure.Utilities.business_day_check import BDay
+from Infrastructure.Utilities.data_sourcer import PriceDataSource
+
+
+def _price_history(end_date, holiday=True):
+    """
+    Creates a deterministic price history for the test symbols, by default
+    with a missing business day to mimic an exchange holiday.
+    """
+    dates = pd.date_range('2022-01-03', end_date, freq=BDay())
+    if holiday:
+        dates = dates.drop(pd.Timestamp('2022-01-17'))
+    rng = np.random.default_rng(42)
+    data = {
+        symbol: start * np.cumprod(1 + rng.normal(0.0, 0.01, len(dates)))
+        for symbol, start in (('AAPL', 177.0), ('MSFT', 330.0), ('TLT', 148.0))
+    }
+    return pd.DataFrame(data, index=dates)
+
+
+def _trades():
+    """
+    Creates a trade book covering longs, shorts, position flips, funds
+    transactions, several fills per day and a weekend trade.
+    """
+    rows = [
+        ('AAPL', 100, 177.83, '2022-01-03 15:00:00', 2.0),
+        ('MSFT', 50, 334.75, '2022-01-03 16:00:00', 2.0),
+        ('TLT', -200, 148.2, '2022-01-04', 1.5),
+        ('SUBSCRIPTION', 25000.0, 0.0, '2022-01-05', 0.0),
+        ('AAPL', -40, 174.92, '2022-01-06 10:00:00', 2.0),
+        ('AAPL', 20, 172.0, '2022-01-06 14:30:00', 1.0),
+        ('MSFT', -80, 318.27, '2022-01-10', 2.0),
+        ('TLT', 250, 146.5, '2022-01-15', 1.5),
+        ('WITHDRAWAL', 10000.0, 0.0, '2022-01-18', 0.0),
+        ('TLT', 150, 145.1, '2022-01-19', 1.5),
+        ('AAPL', -80, 165.3, '2022-01-24', 2.0),
+        ('MSFT', 30, 296.71, '2022-01-28', 2.0),
+    ]
+    trades = pd.DataFrame(rows, columns=['Symbol', 'Quantity', 'Price', 'Date', 'Commission'])
+    trades['Date'] = pd.to_datetime(trades['Date'], format='ISO8601')
+    return trades
+
+
+@pytest.mark.parametrize('holiday', [True, False])
+@pytest.mark.parametrize('end_date', ['2022-01-31', '2022-01-17', '2022-01-29'])
+def test_vectorised_history_matches_object_history(monkeypatch, end_date, holiday):
+    """
+    Tests that the vectorised engine produces the same portfolio
+    timeseries, holdings and final portfolio state as the object-based
+    day-by-day construction. Without the holiday, the weekend trade in a
+    held symbol is filled on a day with a price bar.
+    """
+    end_date = pd.Timestamp(end_date)
+    history = _price_history('2022-01-31', holiday)
+    monkeypatch.setattr(PriceDataSource, 'get_price_history', lambda self, adjusted=True: history)
+
+    start_date = pd.Timestamp('2021-12-31')
+    obj = PortfolioConstructor(start_date, 100000.0, 'Test', 'USD')
+    obj.construct_portfolio_history(_trades(), end_date)
+    vec = PortfolioConstructor(start_date, 100000.0, 'Test', 'USD', engine='vectorised')
+    vec.construct_portfolio_history(_trades(), end_date)
+
+    # np.round and round() may disagree on the last cent of exact halves
+    pd.testing.assert_frame_equal(
+        obj.portfolio_timeseries.astype({'Date': 'datetime64[ns]'}),
+        vec.portfolio_timeseries.astype({'Date': 'datetime64[ns]'}),
+        check_dtype=False, atol=0.01
+    )
+    pd.testing.assert_frame_equal(
+        obj.holdings.reset_index(drop=True).astype({'Quantity': float}),
+        vec.holdings.reset_index(drop=True).astype({'Quantity': float}),
+        check_dtype=False, atol=0.01
+    )
+
+    assert vec.portfolio.cash == pytest.approx(obj.portfolio.cash)
+    assert vec.portfolio.total_realised_pnl == pytest.approx(obj.portfolio.total_realised_pnl)
+    assert vec.portfolio.total_market_value == pytest.approx(obj.portfolio.total_market_value)
+    assert len(vec.portfolio.history) == len(obj.portfolio.history)
+
+
+def test_unknown_history_engine():
+    """
+    Tests that an unknown engine name is rejected.
+    """
+    with pytest.raises(ValueError):
+        PortfolioConstructor('2022-01-01', 100000.0, 'Test', 'USD', engine='unknown')
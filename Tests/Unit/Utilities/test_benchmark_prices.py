@@ -0,0 +1,116 @@
+import pickle
+
+import pandas as pd
+
+from Infrastructure import settings
+from Infrastructure.portfolio_constructor import PortfolioConstructor
+from Infrastructure.Utilities.benchmark_prices import BenchmarkPrices, session_benchmark_prices
+from Infrastructure.Utilities.price_cache import PriceCache
+from Infrastructure.Utilities.price_providers import SyntheticPriceProvider
+
+TICKERS = list(PortfolioConstructor.bmk_name_map.values())
+
+
+class CountingProvider(SyntheticPriceProvider):
+    """
+    Synthetic provider recording every request.
+    """
+
+    def __init__(self, cacheable=False):
+        super().__init__()
+        self.cacheable = cacheable
+        self.requests = []
+
+    def get_history(self, symbols, start_date, end_date, adjusted=True):
+        self.requests.append((tuple(symbols), pd.Timestamp(start_date), pd.Timestamp(end_date)))
+        return super().get_history(symbols, start_date, end_date, adjusted)
+
+
+def test_benchmarks_are_fetched_together_once():
+    """
+    Tests that the first request fetches every benchmark in one request and
+    that the other benchmarks and earlier end dates are served from memory.
+    """
+    provider = CountingProvider()
+    store = BenchmarkPrices(TICKERS, provider)
+
+    spx = store.get_prices('^GSPC', '2022-01-03', '2022-06-30')
+    ndx = store.get_prices('^IXIC', '2022-01-03', '2022-03-31')
+
+    assert provider.requests == [(tuple(TICKERS), pd.Timestamp('2022-01-03'), pd.Timestamp('2022-06-30'))]
+    expected = provider.get_history(TICKERS, '2022-01-03', '2022-06-30')
+    pd.testing.assert_series_equal(spx, expected['^GSPC'])
+    pd.testing.assert_series_equal(ndx, expected['^IXIC'].loc[:'2022-03-31'])
+
+
+def test_store_extends_its_range():
+    """
+    Tests that a later end date only fetches the dates from the previous
+    end date on, and that an earlier start date refetches the whole range.
+    """
+    provider = CountingProvider()
+    store = BenchmarkPrices(TICKERS, provider)
+    store.prefetch('2022-01-03', '2022-06-30 16:00')
+
+    prices = store.get_prices('^DJI', '2022-01-03', '2022-08-31')
+    assert provider.requests[-1][1:] == (pd.Timestamp('2022-06-30'), pd.Timestamp('2022-08-31'))
+    pd.testing.assert_series_equal(prices, provider.get_history(['^DJI'], '2022-01-03', '2022-08-31')['^DJI'])
+
+    provider.requests.clear()
+    store.get_prices('^DJI', '2021-11-01', '2022-02-28')
+    assert provider.requests == [(tuple(TICKERS), pd.Timestamp('2021-11-01'), pd.Timestamp('2022-08-31'))]
+
+
+def test_cacheable_provider_goes_through_price_cache(tmp_path):
+    provider = CountingProvider(cacheable=True)
+    cache = PriceCache(directory=str(tmp_path), offline=False)
+
+    BenchmarkPrices(TICKERS, provider, cache).prefetch('2022-01-03', '2022-02-28')
+    provider.requests.clear()
+    prices = BenchmarkPrices(TICKERS, provider, cache).get_prices('^RUT', '2022-01-03', '2022-02-28')
+
+    assert provider.requests == []
+    assert prices.index[-1] == pd.Timestamp('2022-02-28')
+
+
+def test_session_store_is_shared_and_pickled_by_reference(monkeypatch):
+    """
+    Tests that constructors using the configured provider share the session
+    store, which stays shared when pickled, e.g. by a batch worker.
+    """
+    monkeypatch.setitem(settings.PRICE_PROVIDER, 'NAME', 'synthetic')
+    first = PortfolioConstructor('31/12/2021', 1000.0, 'First', 'USD')
+    second = PortfolioConstructor('31/12/2021', 1000.0, 'Second', 'USD')
+
+    assert first.benchmark_prices is second.benchmark_prices is session_benchmark_prices(TICKERS)
+    assert pickle.loads(pickle.dumps(first)).benchmark_prices is first.benchmark_prices
+
+    store = BenchmarkPrices(TICKERS, CountingProvider())
+    store.prefetch('2022-01-03', '2022-01-31')
+    copy = pickle.loads(pickle.dumps(store))
+    assert copy is not store
+    pd.testing.assert_frame_equal(copy.prices, store.prices)
+
+
+def test_benchmark_switch_only_rejoins_returns():
+    """
+    Tests that switching the benchmark of a built portfolio neither fetches
+    prices nor recomputes the portfolio returns.
+    """
+    provider = CountingProvider()
+    trades = pd.DataFrame({'Symbol': ['AAPL'], 'Quantity': [10.0], 'Price': [100.0],
+                           'Date': pd.to_datetime(['2022-01-03']), 'Commission': [1.0]})
+    end_date = pd.Timestamp('2022-03-31')
+    constructor = PortfolioConstructor(pd.Timestamp('2021-12-31'), 10000.0, 'Test', 'USD', provider=provider)
+    constructor.construct_portfolio_history(trades.copy(), end_date)
+    spx = constructor.construct_returns_dataframe('S&P 500', end_date)
+    ptf_returns = constructor.construct_portfolio_returns()
+
+    provider.requests.clear()
+    constructor.update_portfolio_history(trades.copy(), end_date)
+    hsi = constructor.construct_returns_dataframe('Hang Seng', end_date)
+
+    assert provider.requests == []
+    assert constructor.construct_portfolio_returns() is ptf_returns
+    pd.testing.assert_series_equal(hsi['Ptf Returns'], spx['Ptf Returns'])
+    assert not hsi['Bmk Returns'].equals(spx['Bmk Returns'])
@@ -0,0 +1,150 @@
+import warnings
+
+import empyrical as ep
+import numpy as np
+import pandas as pd
+import pytest
+import quantstats as qs
+
+from Infrastructure.Utilities import custom_statistics as cs
+
+
+@pytest.fixture(scope='module')
+def frame():
+    rng = np.random.default_rng(11)
+    dates = pd.bdate_range('2020-01-01', periods=400)
+    data = rng.normal([0.0006, 0.0002, -0.0003], [0.011, 0.02, 0.008], size=(len(dates), 3))
+    return pd.DataFrame(data, index=dates, columns=['A', 'B', 'C'])
+
+
+@pytest.fixture(scope='module')
+def benchmark(frame):
+    rng = np.random.default_rng(12)
+    return 0.6 * frame['A'] + pd.Series(rng.normal(0.0002, 0.006, len(frame)), index=frame.index)
+
+
+KERNELS = [
+    (cs.comp, qs.stats.comp),
+    (cs.cagr, qs.stats.cagr),
+    (cs.expected_return, qs.stats.expected_return),
+    (cs.volatility, qs.stats.volatility),
+    (cs.sharpe, qs.stats.sharpe),
+    (cs.sortino, qs.stats.sortino),
+    (cs.omega, ep.omega_ratio),
+    (cs.win_rate, qs.stats.win_rate),
+    (cs.avg_win, qs.stats.avg_win),
+    (cs.avg_loss, qs.stats.avg_loss),
+    (cs.payoff_ratio, qs.stats.payoff_ratio),
+    (cs.profit_factor, qs.stats.profit_factor),
+    (cs.kelly_criterion, qs.stats.kelly_criterion),
+    (cs.cpc_index, qs.stats.cpc_index),
+    (cs.outlier_win_ratio, qs.stats.outlier_win_ratio),
+    (cs.outlier_loss_ratio, qs.stats.outlier_loss_ratio),
+    (cs.tail_ratio, qs.stats.tail_ratio),
+    (cs.value_at_risk, qs.stats.value_at_risk),
+    (cs.conditional_value_at_risk, qs.stats.conditional_value_at_risk),
+    (cs.risk_of_ruin, qs.stats.risk_of_ruin),
+    (cs.skew, qs.stats.skew),
+    (cs.kurtosis, qs.stats.kurtosis),
+    (cs.max_drawdown, qs.stats.max_drawdown),
+    (cs.calmar, qs.stats.calmar),
+    (cs.recovery_factor, qs.stats.recovery_factor),
+]
+
+RELATIVE_KERNELS = [
+    (cs.beta, lambda returns, benchmark: ep.alpha_beta(returns, benchmark)[1]),
+    (cs.alpha, lambda returns, benchmark: ep.alpha_beta(returns, benchmark)[0]),
+    (cs.information_ratio, qs.stats.information_ratio),
+    (cs.treynor_ratio, qs.stats.treynor_ratio),
+    (cs.r_squared, qs.stats.r_squared),
+    (cs.up_capture, ep.up_capture),
+    (cs.down_capture, ep.down_capture),
+    (cs.batting_average, lambda returns, benchmark: (returns > benchmark).mean()),
+]
+
+
+def _library(function, *series):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return function(*series)
+
+
+@pytest.mark.parametrize('kernel, reference', KERNELS, ids=[kernel.__name__ for kernel, _ in KERNELS])
+def test_kernels_match_libraries(frame, kernel, reference):
+    """
+    Tests that a kernel evaluates every column of a 2-D array in one call,
+    gives a float for a 1-D array, and matches quantstats or empyrical.
+    """
+    expected = [_library(reference, frame[column]) for column in frame.columns]
+
+    np.testing.assert_allclose(kernel(frame.to_numpy()), expected, rtol=1e-9)
+    assert isinstance(kernel(frame['A'].to_numpy()), float)
+    assert kernel(frame['A']) == pytest.approx(expected[0], rel=1e-9)
+
+
+@pytest.mark.parametrize('kernel, reference', RELATIVE_KERNELS, ids=[kernel.__name__ for kernel, _ in RELATIVE_KERNELS])
+def test_relative_kernels_match_libraries(frame, benchmark, kernel, reference):
+    """
+    Tests the kernels of returns relative to a benchmark, which is
+    broadcast against every column.
+    """
+    expected = [_library(reference, frame[column], benchmark) for column in frame.columns]
+
+    np.testing.assert_allclose(kernel(frame.to_numpy(), benchmark.to_numpy()), expected, rtol=1e-9)
+    assert kernel(frame['A'], benchmark) == pytest.approx(expected[0], rel=1e-9)
+
+
+def test_drawdown_series_and_details(frame):
+    """
+    Tests the drawdown series and the details of its periods against quantstats.
+    """
+    returns = frame['B']
+    drawdown = cs.to_drawdown_series(returns.to_numpy())
+    expected = qs.stats.drawdown_details(qs.stats.to_drawdown_series(returns))
+
+    np.testing.assert_allclose(drawdown, qs.stats.to_drawdown_series(returns), atol=1e-12)
+    details = cs.drawdown_details(drawdown, returns.index)
+    assert details['days'].tolist() == expected['days'].tolist()
+    np.testing.assert_allclose(details['max drawdown'] * 100, expected['max drawdown'], rtol=1e-9)
+    assert returns.index[details['valley']].strftime('%Y-%m-%d').tolist() == expected['valley'].tolist()
+
+    by_column = cs.drawdown_details(cs.to_drawdown_series(frame.to_numpy()))
+    assert len(by_column) == 3
+    assert by_column[1]['days'].tolist() == (details['end'] - details['start'] + 1).tolist()
+
+
+def test_expected_return_by_group(frame):
+    returns = frame['A']
+    months = returns.index.year * 12 + returns.index.month
+    assert cs.expected_return(returns, groups=months) == pytest.approx(
+        qs.stats.expected_return(returns, aggregate='eom'), rel=1e-9
+    )
+
+
+def test_rolling_windows(frame):
+    """
+    Tests that a kernel applied to the rolling windows of a series gives the
+    rolling statistic.
+    """
+    returns = frame['A']
+    windows = cs.rolling_windows(returns.to_numpy(), 60)
+
+    assert windows.shape == (60, len(returns) - 59)
+    np.testing.assert_allclose(
+        cs.volatility(windows), returns.rolling(60).std().dropna() * np.sqrt(252), rtol=1e-9
+    )
+
+
+def test_missing_returns_are_skipped():
+    returns = np.array([0.01, np.nan, -0.02, np.inf, 0.03])
+    assert cs.comp(returns) == pytest.approx(1.01 * 0.98 * 1.03 - 1)
+    assert cs.win_rate(returns) == pytest.approx(2 / 3)
+    assert cs.volatility(returns, periods=1) == pytest.approx(np.std([0.01, -0.02, 0.03], ddof=1))
+
+def test_alpha_needs_two_paired_periods_per_column():
+    returns = np.array([[0.01, 0.01], [0.02, np.nan], [-0.01, np.nan], [0.03, np.nan]])
+    benchmark = np.array([0.005, 0.01, -0.02, 0.01])
+    alpha = cs.alpha(returns, benchmark, _beta=np.array([0.5, 0.5]))
+
+    assert np.isfinite(alpha[0])
+    assert np.isnan(alpha[1])
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+from Infrastructure.Utilities.data_sourcer import PriceDataSource, get_current_prices
+from Infrastructure.Utilities.price_providers import PriceProvider
+
+
+def make_source(monkeypatch):
+    history = pd.DataFrame(
+        {'AAPL': [10.0, 11.0, np.nan, 13.0], 'MSFT': [20.0, 21.0, 22.0, 23.0]},
+        index=pd.to_datetime(['2022-01-03', '2022-01-04', '2022-01-05', '2022-01-06'])
+    )
+    monkeypatch.setattr(PriceDataSource, 'get_price_history', lambda self, adjusted=True: history)
+    trades = pd.DataFrame({'Symbol': ['AAPL', 'MSFT'], 'Date': pd.to_datetime(['2022-01-03', '2022-01-03'])})
+    return PriceDataSource(trades, pd.Timestamp('2022-01-06'))
+
+
+def test_price_matrix_layout(monkeypatch):
+    """
+    Tests that the matrix has a row per date and a column per symbol plus
+    a trailing NaN row and column, and that the maps point into it.
+    """
+    source = make_source(monkeypatch)
+
+    assert source.prices.shape == (5, 3)
+    assert source.prices.dtype == np.float64
+    assert np.isnan(source.prices[-1]).all()
+    assert np.isnan(source.prices[:, -1]).all()
+    assert source.date_row(pd.Timestamp('2022-01-04')) == 1
+    assert list(source.symbol_columns(['MSFT', 'AAPL', 'GS'])) == [1, 0, -1]
+
+
+def test_missing_prices_are_nan(monkeypatch):
+    """
+    Tests that unknown dates, unknown symbols and gaps in the history all
+    resolve to NaN instead of raising.
+    """
+    source = make_source(monkeypatch)
+
+    assert source.get_price_from_history('AAPL', pd.Timestamp('2022-01-04')) == 11.0
+    assert np.isnan(source.get_price_from_history('AAPL', pd.Timestamp('2022-01-05')))
+    assert np.isnan(source.get_price_from_history('AAPL', pd.Timestamp('2022-01-07')))
+    assert np.isnan(source.get_price_from_history('GS', pd.Timestamp('2022-01-04')))
+
+
+def test_bulk_price_lookup(monkeypatch):
+    """
+    Tests looking up several symbols on one date and a whole block of
+    dates and symbols at once.
+    """
+    source = make_source(monkeypatch)
+    columns = source.symbol_columns(['MSFT', 'GS', 'AAPL'])
+
+    day = source.prices_for(source.date_row(pd.Timestamp('2022-01-06')), columns)
+    np.testing.assert_array_equal(day, [23.0, np.nan, 13.0])
+
+    rows = source.dates.get_indexer(pd.to_datetime(['2022-01-03', '2022-01-08']))
+    block = source.prices_for(rows[:, None], columns[None, :])
+    np.testing.assert_array_equal(block, [[20.0, np.nan, 10.0], [np.nan, np.nan, np.nan]])
+
+
+class StubProvider(PriceProvider):
+    """
+    Provider serving a fixed history and recording every request.
+    """
+
+    def __init__(self, history):
+        self.history = history
+        self.requests = []
+
+    def get_history(self, symbols, start_date, end_date, adjusted=True):
+        self.requests.append((list(symbols), pd.Timestamp(start_date), pd.Timestamp(end_date)))
+        return self.history.loc[start_date:end_date].reindex(columns=list(symbols))
+
+
+def test_current_prices_in_one_request():
+    """
+    Tests that the prices of several symbols are resolved with one request,
+    and that symbols without a close on the date get their last close and
+    are reported as stale.
+    """
+    history = pd.DataFrame(
+        {'AAPL': [10.0, 11.0, np.nan], 'MSFT': [20.0, 21.0, 22.0], 'GS': [np.nan, np.nan, np.nan]},
+        index=pd.to_datetime(['2022-01-04', '2022-01-05', '2022-01-06'])
+    )
+    provider = StubProvider(history)
+
+    current = get_current_prices(['MSFT', 'AAPL', 'GS', 'IBM'], pd.Timestamp('2022-01-06'), provider)
+
+    assert len(provider.requests) == 1
+    assert list(current.index) == ['MSFT', 'AAPL', 'GS', 'IBM']
+    np.testing.assert_array_equal(current['Price'], [22.0, 11.0, np.nan, np.nan])
+    assert current.loc['AAPL', 'Price Date'] == pd.Timestamp('2022-01-05')
+    assert current['Stale'].tolist() == [False, True, True, True]
+
+    saturday = get_current_prices(['MSFT'], pd.Timestamp('2022-01-08'), provider)
+    assert saturday.loc['MSFT', 'Price'] == 22.0
+    assert saturday.loc['MSFT', 'Stale']
+    assert get_current_prices(['MSFT'], pd.Timestamp('2021-06-01'), provider)['Stale'].all()
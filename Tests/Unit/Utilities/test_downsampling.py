@@ -0,0 +1,45 @@
+import numpy as np
+
+from Infrastructure.Utilities.downsampling import downsample, minmax_indices
+
+
+def test_minmax_indices_keep_extremes_of_every_bucket():
+    """
+    Tests that the reduced series keeps the first and last points and the
+    minimum and maximum of every bucket, within the 2 * buckets + 2 bound.
+    """
+    rng = np.random.default_rng(3)
+    values = np.cumsum(rng.normal(size=5000))
+    indices = minmax_indices(values, 100)
+
+    assert len(indices) <= 202
+    assert indices[0] == 0 and indices[-1] == len(values) - 1
+    assert np.all(np.diff(indices) > 0)
+    for bucket in np.array_split(np.arange(len(values)), 100):
+        assert bucket[np.argmin(values[bucket])] in indices
+        assert bucket[np.argmax(values[bucket])] in indices
+
+
+def test_short_series_and_missing_values():
+    assert minmax_indices(np.arange(10.0), 100).tolist() == list(range(10))
+
+    values = np.arange(1000.0)
+    values[:500] = np.nan
+    indices = minmax_indices(values, 10)
+    assert not np.isnan(values[indices[indices >= 500]]).any()
+    assert 999 in indices and 500 in indices
+
+
+def test_downsample_visible_range():
+    """
+    Tests that only the points from start to end, and the one just outside
+    each edge, are reduced.
+    """
+    x = np.arange(10000.0)
+    y = np.sin(x / 50)
+    reduced_x, reduced_y = downsample(x, y, 50, start=2000.5, end=2999.5)
+
+    assert reduced_x[0] == 2000.0 and reduced_x[-1] == 3000.0
+    assert len(reduced_x) <= 102
+    np.testing.assert_array_equal(reduced_y, y[reduced_x.astype(int)])
+    assert reduced_y.min() == y[2000:3001].min() and reduced_y.max() == y[2000:3001].max()
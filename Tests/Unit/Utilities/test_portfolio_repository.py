@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Infrastructure.Utilities.portfolio_repository import PortfolioRepository
+
+
+@pytest.fixture
+def repository(tmp_path):
+    return PortfolioRepository(directory=str(tmp_path))
+
+
+def make_trades():
+    return pd.DataFrame({
+        'Symbol': ['SUBSCRIPTION', 'AAPL', 'MSFT', 'WITHDRAWAL', 'AAPL'],
+        'Quantity': [50000, 10, 5, 1000, -4],
+        'Price': [0.0, 150.25, 300.5, 0.0, 160.0],
+        'Date': pd.to_datetime(['2022-01-03', '2022-01-04 10:30:00', '2022-01-05', '2022-02-01', '2022-02-02'],
+                               format='ISO8601'),
+        'Commission': [0.0, 1.0, 1.5, 0.0, 1.0]
+    })
+
+
+def test_portfolios_are_listed_in_creation_order(tmp_path, repository):
+    """
+    Tests that stored portfolios are listed from a new repository on the
+    same directory and that names are unique.
+    """
+    first = repository.add_portfolio('Main Portfolio', 100000.0, '2022-01-01', 'USD')
+    second = repository.add_portfolio('Growth', 5000, '2022-06-01', 'EUR')
+
+    with pytest.raises(ValueError):
+        repository.add_portfolio('Growth', 1.0, '2022-06-01', 'EUR')
+
+    portfolios = PortfolioRepository(directory=str(tmp_path)).portfolios()
+    assert portfolios == [
+        {'id': first, 'name': 'Main Portfolio', 'cash': 100000.0, 'start_date': '2022-01-01', 'currency': 'USD'},
+        {'id': second, 'name': 'Growth', 'cash': 5000.0, 'start_date': '2022-06-01', 'currency': 'EUR'}
+    ]
+
+
+def test_trades_round_trip_with_cash_flows(repository):
+    """
+    Tests that trades and cash flows are read back in the order they were
+    added, with the trade table dtypes, and that appending and replacing
+    trades increment the trades version.
+    """
+    portfolio_id = repository.add_portfolio('Main Portfolio', 100000.0, '2022-01-01', 'USD')
+    trades = make_trades()
+
+    assert repository.save_trades(portfolio_id, trades.iloc[:3]) == 1
+    assert repository.append_trades(portfolio_id, trades.iloc[3:].values.tolist()) == 2
+
+    loaded = repository.load_trades(portfolio_id)
+    pd.testing.assert_frame_equal(loaded.astype({'Symbol': object}), trades.astype({'Symbol': object}))
+    assert isinstance(loaded['Symbol'].dtype, pd.CategoricalDtype)
+
+    assert repository.save_trades(portfolio_id, trades.iloc[1:3]) == 3
+    assert list(repository.load_trades(portfolio_id)['Symbol']) == ['AAPL', 'MSFT']
+    assert repository.load_trades(repository.add_portfolio('Empty', 1.0, '2022-01-01', 'USD')).empty
+
+
+def test_timeseries_is_only_reused_for_current_trades(repository):
+    """
+    Tests that a stored time series is returned while the trades it was
+    computed from are unchanged and dropped with its portfolio.
+    """
+    portfolio_id = repository.add_portfolio('Main Portfolio', 100000.0, '2022-01-01', 'USD')
+    version = repository.save_trades(portfolio_id, make_trades())
+    dates = pd.date_range('2022-01-03', periods=4, freq='B', name='Date')
+    timeseries = pd.DataFrame({'Total Equity': [100.0, 101.0, 99.0, 102.0],
+                               'Ptf Returns': [0.0, 0.01, np.nan, 0.03]}, index=dates)
+
+    assert repository.load_timeseries(portfolio_id) is None
+    repository.save_timeseries(portfolio_id, timeseries, 'S&P 500', version)
+
+    stored, benchmark = repository.load_timeseries(portfolio_id)
+    assert benchmark == 'S&P 500'
+    pd.testing.assert_frame_equal(stored[['Total Equity', 'Ptf Returns']], timeseries, check_freq=False)
+    assert stored['Benchmark'].isna().all()
+
+    repository.append_trades(portfolio_id, [['AAPL', 1, 170.0, pd.Timestamp('2022-03-01'), 1.0]])
+    assert repository.load_timeseries(portfolio_id) is None
+
+    repository.delete_portfolio(portfolio_id)
+    assert repository.portfolios() == []
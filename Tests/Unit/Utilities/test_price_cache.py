@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Infrastructure.Utilities.business_day_check import BDay
+from Infrastructure.Utilities.price_cache import PriceCache
+
+
+class FakeProvider:
+    """
+    Price provider recording every requested range.
+    """
+
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, symbols, start, end):
+        self.requests.append((tuple(symbols), start, end))
+        dates = pd.date_range(start, end, freq=BDay())
+        return pd.DataFrame(
+            {symbol: np.arange(len(dates), dtype=float) + 100.0 for symbol in symbols}, index=dates
+        )
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(PriceCache, '_now', staticmethod(lambda: pd.Timestamp('2022-03-01 09:00:00')))
+    return PriceCache(directory=str(tmp_path), max_age_hours=12, offline=False)
+
+
+def test_first_request_fetches_full_range(cache):
+    """
+    Tests that an empty cache fetches the whole range in a single request
+    and returns the prices in symbol order.
+    """
+    provider = FakeProvider()
+    prices = cache.get_history(['MSFT', 'AAPL'], pd.Timestamp('2022-01-03'), pd.Timestamp('2022-01-31'), provider)
+
+    assert provider.requests == [(('MSFT', 'AAPL'), pd.Timestamp('2022-01-03'), pd.Timestamp('2022-01-31'))]
+    assert list(prices.columns) == ['MSFT', 'AAPL']
+    assert len(prices) == 21
+    assert prices.loc['2022-01-04', 'AAPL'] == 101.0
+
+
+def test_repeat_request_served_from_cache(cache):
+    """
+    Tests that a repeated request does not hit the provider.
+    """
+    provider = FakeProvider()
+    first = cache.get_history(['AAPL'], pd.Timestamp('2022-01-03'), pd.Timestamp('2022-01-31'), provider)
+    second = cache.get_history(['AAPL'], pd.Timestamp('2022-01-10'), pd.Timestamp('2022-01-31'), provider)
+
+    assert len(provider.requests) == 1
+    pd.testing.assert_frame_equal(first.loc['2022-01-10':], second)
+
+
+def test_later_request_fetches_only_missing_tail(cache):
+    """
+    Tests that extending the end date only fetches the new dates, and that
+    a new symbol is fetched in full.
+    """
+    provider = FakeProvider()
+    cache.get_history(['AAPL'], pd.Timestamp('2022-01-03'), pd.Timestamp('2022-01-31'), provider)
+    prices = cache.get_history(['AAPL', 'GS'], pd.Timestamp('2022-01-03'), pd.Timestamp('2022-02-15'), provider)
+
+    assert provider.requests[1:] == [
+        (('AAPL',), pd.Timestamp('2022-02-01'), pd.Timestamp('2022-02-15')),
+        (('GS',), pd.Timestamp('2022-01-03'), pd.Timestamp('2022-02-15'))
+    ]
+    assert prices['AAPL'].notna().all()
+    assert prices['GS'].notna().all()
+
+
+def test_provisional_tail_refreshed_once_expired(cache, monkeypatch):
+    """
+    Tests that a last bar fetched on its own day is re-fetched after the
+    maximum age, but not before.
+    """
+    provider = FakeProvider()
+    cache.get_history(['AAPL'], pd.Timestamp('2022-02-01'), pd.Timestamp('2022-03-01'), provider)
+
+    monkeypatch.setattr(PriceCache, '_now', staticmethod(lambda: pd.Timestamp('2022-03-01 18:00:00')))
+    cache.get_history(['AAPL'], pd.Timestamp('2022-02-01'), pd.Timestamp('2022-03-01'), provider)
+    assert len(provider.requests) == 1
+
+    monkeypatch.setattr(PriceCache, '_now', staticmethod(lambda: pd.Timestamp('2022-03-02 09:00:00')))
+    cache.get_history(['AAPL'], pd.Timestamp('2022-02-01'), pd.Timestamp('2022-03-01'), provider)
+    assert provider.requests[-1] == (('AAPL',), pd.Timestamp('2022-03-01'), pd.Timestamp('2022-03-01'))
+
+
+def test_offline_mode_serves_cache_only(tmp_path):
+    """
+    Tests that offline mode never calls the provider and returns what is
+    cached, leaving uncached symbols empty.
+    """
+    provider = FakeProvider()
+    PriceCache(directory=str(tmp_path)).get_history(
+        ['AAPL'], pd.Timestamp('2022-01-03'), pd.Timestamp('2022-01-31'), provider
+    )
+
+    offline_cache = PriceCache(directory=str(tmp_path), offline=True)
+    prices = offline_cache.get_history(
+        ['AAPL', 'GS'], pd.Timestamp('2022-01-03'), pd.Timestamp('2022-02-28'), provider
+    )
+
+    assert len(provider.requests) == 1
+    assert prices.index.max() == pd.Timestamp('2022-01-31')
+    assert prices['GS'].isna().all()
+
+
+def test_failed_fetch_is_retried(cache):
+    """
+    Tests that a fetch returning no prices does not mark the range as
+    cached, so the next request downloads it again.
+    """
+    failed = FakeProvider()
+    failed_prices = cache.get_history(
+        ['AAPL'], pd.Timestamp('2022-01-03'), pd.Timestamp('2022-01-04'), lambda *args: failed(*args).iloc[0:0]
+    )
+
+    assert failed_prices['AAPL'].isna().all()
+    assert cache.coverage('AAPL') is None
+
+    provider = FakeProvider()
+    prices = cache.get_history(['AAPL'], pd.Timestamp('2022-01-03'), pd.Timestamp('2022-01-04'), provider)
+
+    assert provider.requests == [(('AAPL',), pd.Timestamp('2022-01-03'), pd.Timestamp('2022-01-04'))]
+    assert prices['AAPL'].tolist() == [100.0, 101.0]
+
+
+def test_partially_failed_fetch_covers_only_priced_symbols(cache):
+    """
+    Tests that only symbols with prices in a multi-symbol fetch are marked
+    as cached.
+    """
+    def provider(symbols, start, end):
+        prices = FakeProvider()(symbols, start, end)
+        prices['GS'] = np.nan
+        return prices
+
+    cache.get_history(['AAPL', 'GS'], pd.Timestamp('2022-01-03'), pd.Timestamp('2022-01-31'), provider)
+
+    assert cache.coverage('AAPL') is not None
+    assert cache.coverage('GS') is None
+
+
+def test_weekend_tail_without_prices_is_covered(cache, monkeypatch):
+    """
+    Tests that an empty fetch of a range without business days extends the
+    coverage, so the weekend is not downloaded again on every request.
+    """
+    monkeypatch.setattr(PriceCache, '_now', staticmethod(lambda: pd.Timestamp('2022-01-10 09:00:00')))
+    provider = FakeProvider()
+    cache.get_history(['AAPL'], pd.Timestamp('2022-01-03'), pd.Timestamp('2022-01-07'), provider)
+    cache.get_history(['AAPL'], pd.Timestamp('2022-01-03'), pd.Timestamp('2022-01-09'), provider)
+    prices = cache.get_history(['AAPL'], pd.Timestamp('2022-01-03'), pd.Timestamp('2022-01-09'), provider)
+
+    assert provider.requests[1:] == [(('AAPL',), pd.Timestamp('2022-01-08'), pd.Timestamp('2022-01-09'))]
+    assert cache.coverage('AAPL')[1] == pd.Timestamp('2022-01-09')
+    assert len(prices) == 5
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Infrastructure import settings
+from Infrastructure.portfolio_constructor import PortfolioConstructor
+from Infrastructure.Utilities.data_sourcer import PriceDataSource
+from Infrastructure.Utilities.price_providers import FilePriceProvider, SyntheticPriceProvider, \
+    YahooPriceProvider, get_price_provider
+
+
+def test_synthetic_provider_is_deterministic():
+    """
+    Tests that synthetic prices only depend on the seed, the symbol and
+    the date, not on the other symbols or the requested range.
+    """
+    provider = SyntheticPriceProvider(seed=7)
+    full = provider.get_history(['AAPL', 'MSFT'], '2022-01-03', '2022-03-31')
+    partial = SyntheticPriceProvider(seed=7).get_history(['MSFT'], '2022-02-01', '2022-02-28')
+
+    pd.testing.assert_series_equal(full.loc['2022-02-01':'2022-02-28', 'MSFT'], partial['MSFT'])
+    assert list(full.columns) == ['AAPL', 'MSFT']
+    assert full.index[0] == pd.Timestamp('2022-01-03')
+    assert full.index[-1] == pd.Timestamp('2022-03-31')
+    assert (full > 0.0).all().all()
+    assert not np.allclose(full['AAPL'], full['MSFT'])
+
+    other_seed = SyntheticPriceProvider(seed=8).get_history(['MSFT'], '2022-02-01', '2022-02-28')
+    assert not np.allclose(partial['MSFT'], other_seed['MSFT'])
+
+
+def test_file_provider_reads_csv_bars(tmp_path):
+    """
+    Tests that the file provider reads the adjusted or raw close of each
+    symbol file within the requested range and leaves missing symbols empty.
+    """
+    bars = pd.DataFrame({
+        'Date': ['2022-01-03', '2022-01-04', '2022-01-05', '2022-01-06'],
+        'Close': [10.0, 11.0, 12.0, 13.0],
+        'Adj Close': [9.0, 10.0, 11.0, 12.0]
+    })
+    bars.to_csv(tmp_path / 'AAPL.csv', index=False)
+    provider = FilePriceProvider(str(tmp_path))
+
+    adjusted = provider.get_history(['AAPL', 'GS'], '2022-01-04', '2022-01-05')
+    raw = provider.get_history(['AAPL'], '2022-01-04', '2022-01-05', adjusted=False)
+
+    assert list(adjusted['AAPL']) == [10.0, 11.0]
+    assert adjusted['GS'].isna().all()
+    assert list(raw['AAPL']) == [11.0, 12.0]
+
+
+def test_price_provider_from_settings(monkeypatch):
+    """
+    Tests that the configured provider is created from the settings.
+    """
+    monkeypatch.setitem(settings.PRICE_PROVIDER, 'NAME', 'yahoo')
+    assert isinstance(get_price_provider(), YahooPriceProvider)
+
+    monkeypatch.setitem(settings.PRICE_PROVIDER, 'NAME', 'synthetic')
+    monkeypatch.setitem(settings.PRICE_PROVIDER, 'SEED', 3)
+    provider = get_price_provider()
+    assert isinstance(provider, SyntheticPriceProvider)
+    assert provider.seed == 3
+
+    monkeypatch.setitem(settings.PRICE_PROVIDER, 'NAME', 'unknown')
+    with pytest.raises(ValueError):
+        get_price_provider()
+
+
+def test_price_data_source_uses_provider():
+    """
+    Tests that the price history of the traded symbols comes from the
+    given provider without touching the cache.
+    """
+    trades = pd.DataFrame({
+        'Symbol': ['AAPL', 'SUBSCRIPTION', 'MSFT'],
+        'Quantity': [10, 1000.0, 5],
+        'Price': [100.0, 0.0, 200.0],
+        'Date': pd.to_datetime(['2022-01-03', '2022-01-04', '2022-01-05']),
+        'Commission': [1.0, 0.0, 1.0]
+    })
+    provider = SyntheticPriceProvider()
+    source = PriceDataSource(trades, pd.Timestamp('2022-01-31'), provider=provider)
+
+    assert source.cache is None
+    assert list(source.history.columns) == ['AAPL', 'MSFT']
+    pd.testing.assert_frame_equal(
+        source.history, provider.get_history(['AAPL', 'MSFT'], '2022-01-03', '2022-01-31')
+    )
+
+
+def test_portfolio_returns_with_synthetic_provider():
+    """
+    Tests that the whole portfolio pipeline, including the benchmark, runs
+    offline against the synthetic provider.
+    """
+    trades = pd.DataFrame({
+        'Symbol': ['AAPL', 'MSFT', 'AAPL'],
+        'Quantity': [100, 50, -40],
+        'Price': [100.0, 101.0, 102.0],
+        'Date': pd.to_datetime(['2022-01-03', '2022-01-03', '2022-02-01']),
+        'Commission': [2.0, 2.0, 2.0]
+    })
+    end_date = pd.Timestamp('2022-03-31')
+    constructor = PortfolioConstructor(pd.Timestamp('2021-12-31'), 100000.0, 'Test', 'USD',
+                                       provider=SyntheticPriceProvider())
+    constructor.construct_portfolio_history(trades, end_date)
+    returns = constructor.construct_returns_dataframe('S&P 500', end_date)
+
+    assert list(returns.columns) == ['Total Equity', 'Ptf Returns', 'Benchmark', 'Bmk Returns']
+    assert returns.index[-1] == end_date
+    assert returns['Benchmark'].notna().all()
+    assert set(constructor.holdings['Symbol']) == {'AAPL', 'MSFT'}
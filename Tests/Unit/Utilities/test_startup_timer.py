@@ -0,0 +1,55 @@
+import builtins
+import io
+import subprocess
+import sys
+
+from Infrastructure.Utilities.startup_timer import StartupTimer
+
+
+def test_timer_records_stages_and_new_imports():
+    """
+    Tests that the timer records the stages and the modules imported for
+    the first time while it is installed, and restores the import function
+    when reporting.
+    """
+    original_import = builtins.__import__
+    sys.modules.pop('colorsys', None)
+    stream = io.StringIO()
+
+    timer = StartupTimer(stream=stream)
+    with timer.stage('imports'):
+        import colorsys
+        import os
+    timer.report(threshold_ms=0.0)
+
+    assert builtins.__import__ is original_import
+    assert [name for name, _ in timer.stages] == ['imports']
+    assert [module for module, *_ in timer.imports] == ['colorsys']
+    report = stream.getvalue()
+    assert report.startswith('Start-up time: ')
+    assert 'import time: self [us] | cumulative | imported package' in report
+    assert report.rstrip().endswith('| colorsys')
+
+
+def test_disabled_timer_records_nothing():
+    stream = io.StringIO()
+    timer = StartupTimer(enabled=False, stream=stream)
+    with timer.stage('imports'):
+        import os
+    timer.report()
+
+    assert timer.stages == [] and timer.imports == []
+    assert stream.getvalue() == ''
+
+
+def test_main_window_does_not_import_analytics_or_plotting_libraries():
+    """
+    Tests that the modules imported to show the main window leave out the
+    libraries that are only needed to load a portfolio or draw a chart.
+    """
+    code = ("import sys; import Application.main_window; "
+            "print(sorted({'matplotlib', 'seaborn', 'quantstats', 'empyrical', 'yfinance', 'scipy'} & "
+            "set(sys.modules)))")
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+
+    assert output.strip() == '[]'
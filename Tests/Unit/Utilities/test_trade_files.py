@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Infrastructure.Utilities.trade_files import read_trades, write_trades
+
+
+@pytest.fixture
+def trades():
+    return pd.DataFrame({
+        'Symbol': ['AAPL', 'MSFT', 'AAPL', 'GS', 'MSFT'],
+        'Quantity': [100, -50, 25, 10, 5],
+        'Price': [177.83, 330.5, 180.0, 389.0, 335.25],
+        'Date': pd.to_datetime(['2022-01-03', '2022-01-03', '2022-02-01 15:30:00', '2022-03-01', '2022-03-02'],
+                               format='ISO8601'),
+        'Commission': [2.0, 2.0, 1.5, 2.0, 0.0]
+    })
+
+
+def test_csv_read_in_chunks(tmp_path, trades):
+    """
+    Tests that a CSV file read in chunks gives the trades with the trade
+    dtypes, skipping other columns and reporting the progress of every chunk.
+    """
+    file_name = str(tmp_path / 'trades.csv')
+    trades.assign(Broker='X')[['Broker'] + list(trades.columns)].to_csv(file_name, index=False)
+
+    progress = []
+    result = read_trades(file_name, chunksize=2, progress=lambda rows, percent: progress.append((rows, percent)))
+
+    assert list(result.columns) == list(trades.columns)
+    assert isinstance(result['Symbol'].dtype, pd.CategoricalDtype)
+    assert result['Quantity'].dtype == np.int64
+    assert result['Date'].dtype.kind == 'M'
+    pd.testing.assert_frame_equal(result.astype({'Symbol': object}), trades, check_dtype=False)
+    assert [rows for rows, _ in progress] == [2, 4, 5]
+    assert progress[-1][1] == 100
+
+
+def test_invalid_files(tmp_path, trades):
+    file_name = str(tmp_path / 'trades.csv')
+    trades.drop(columns='Price').to_csv(file_name, index=False)
+    with pytest.raises(ValueError, match="missing the columns \\['Price'\\]"):
+        read_trades(file_name)
+
+    trades.astype({'Price': object}).assign(Price=['1', '2', 'x', '4', '5']).to_csv(file_name, index=False)
+    with pytest.raises(ValueError, match='invalid values'):
+        read_trades(file_name)
+
+    trades.assign(Date=[None] + list(trades['Date'][1:])).to_csv(file_name, index=False)
+    with pytest.raises(ValueError, match="missing values in the columns \\['Date'\\]"):
+        read_trades(file_name)
+
+
+@pytest.mark.parametrize('extension', ['parquet', 'arrow'])
+def test_columnar_round_trip(tmp_path, trades, extension):
+    pytest.importorskip('pyarrow')
+    file_name = str(tmp_path / f'trades.{extension}')
+    write_trades(trades, file_name)
+
+    result = read_trades(file_name, chunksize=2)
+    pd.testing.assert_frame_equal(result.astype({'Symbol': object}), trades, check_dtype=False)
+    assert isinstance(result['Symbol'].dtype, pd.CategoricalDtype)
@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+import pytest
+import quantstats as qs
+
+from Application.WidgetTemplates.derived_series import DerivedSeries, DerivedSeriesCache
+
+
+@pytest.fixture(scope='module')
+def returns_series():
+    rng = np.random.default_rng(21)
+    dates = pd.bdate_range('2021-01-01', periods=300)
+    ptf_returns = rng.normal(0.0005, 0.012, len(dates))
+    bmk_returns = rng.normal(0.0003, 0.009, len(dates))
+    ptf_returns[0] = bmk_returns[0] = 0.0
+    return pd.DataFrame({
+        'Total Equity': 10000.0 * np.cumprod(1.0 + ptf_returns),
+        'Benchmark': 10000.0 * np.cumprod(1.0 + bmk_returns),
+        'Ptf Returns': ptf_returns,
+        'Bmk Returns': bmk_returns
+    }, index=dates)
+
+
+def test_cache_evicts_least_recently_used():
+    cache = DerivedSeriesCache(maxsize=2)
+    computed = []
+
+    def compute(name):
+        return lambda: computed.append(name) or name
+
+    cache.get(('P', 'a'), compute('a'))
+    cache.get(('P', 'b'), compute('b'))
+    assert cache.get(('P', 'a'), compute('a')) == 'a'
+    cache.get(('P', 'c'), compute('c'))
+
+    assert len(cache) == 2
+    assert cache.get(('P', 'a'), compute('a')) == 'a'
+    assert cache.get(('P', 'b'), compute('b')) == 'b'
+    assert computed == ['a', 'b', 'c', 'b']
+
+
+def test_invalidate_drops_only_the_portfolio(returns_series):
+    """
+    Tests that invalidating or releasing a portfolio drops its series and
+    keeps the ones of the other portfolios.
+    """
+    cache = DerivedSeriesCache()
+    first = DerivedSeries(returns_series, cache, portfolio='First')
+    second = DerivedSeries(returns_series, cache, portfolio='Second')
+    unnamed = DerivedSeries(returns_series, cache)
+
+    # Cumulative returns also cache the equity and returns they are derived from
+    first.cumulative_returns('Portfolio')
+    second.returns('Benchmark')
+    unnamed.equity('Portfolio')
+    assert len(cache) == 6
+
+    first.invalidate()
+    assert len(cache) == 3
+
+    DerivedSeries.release('Second', cache)
+    assert len(cache) == 1
+
+    unnamed.invalidate()
+    assert len(cache) == 0
+
+
+def test_series_are_cached_per_arguments(returns_series):
+    series = DerivedSeries(returns_series, DerivedSeriesCache())
+
+    assert series.cumulative_returns('Portfolio') is series.cumulative_returns('Portfolio')
+    assert series.returns('Portfolio', '2021-03-01') is series.returns('Portfolio', pd.Timestamp('2021-03-01'))
+    assert series.returns('Portfolio') is not series.returns('Benchmark')
+    assert series.rolling_volatility('Portfolio', 20) is not series.rolling_volatility('Portfolio', 60)
+
+
+@pytest.mark.parametrize('start_date', [None, pd.Timestamp('2021-04-15')])
+def test_line_series_match_inline_computation(returns_series, start_date):
+    """
+    Tests the series against the quantstats computations the charts made
+    inline before they were cached.
+    """
+    series = DerivedSeries(returns_series, DerivedSeriesCache())
+    filtered_data = returns_series.loc[start_date:]
+
+    for source, equity_column, returns_column in [("Portfolio", 'Total Equity', 'Ptf Returns'),
+                                                  ("Benchmark", 'Benchmark', 'Bmk Returns')]:
+        returns = filtered_data[equity_column].pct_change().fillna(0.0)
+
+        pd.testing.assert_series_equal(series.equity(source, start_date), filtered_data[equity_column])
+        pd.testing.assert_series_equal(series.returns(source, start_date), returns)
+        pd.testing.assert_series_equal(series.cumulative_returns(source, start_date),
+                                       (returns.add(1).cumprod() - 1) * 100)
+        pd.testing.assert_series_equal(series.drawdown(source, start_date), qs.stats.to_drawdown_series(returns),
+                                       check_freq=False)
+        pd.testing.assert_series_equal(
+            series.rolling_volatility(source, 30),
+            qs.stats.rolling_volatility(returns_series[returns_column], rolling_period=30) * 100,
+            check_freq=False, rtol=1e-9
+        )
+
+    pd.testing.assert_series_equal(
+        series.rolling_beta(30),
+        qs.stats.rolling_greeks(returns_series['Ptf Returns'], returns_series['Bmk Returns'], periods=30)['beta'],
+        check_freq=False, rtol=1e-9
+    )
+
+
+def test_rolling_series_shorter_than_period(returns_series):
+    series = DerivedSeries(returns_series.iloc[:10], DerivedSeriesCache())
+
+    assert series.rolling_volatility('Portfolio', 30).isna().all()
+    assert len(series.rolling_beta(30)) == 10
+
+
+def test_monthly_returns_match_inline_computation(returns_series):
+    series = DerivedSeries(returns_series, DerivedSeriesCache())
+    portfolio = qs.stats.monthly_returns(returns_series['Ptf Returns']) * 100
+    benchmark = qs.stats.monthly_returns(returns_series['Bmk Returns']) * 100
+
+    pd.testing.assert_frame_equal(series.monthly_returns("Portfolio"), portfolio)
+    pd.testing.assert_frame_equal(series.monthly_returns("Benchmark"), benchmark)
+    pd.testing.assert_frame_equal(series.monthly_returns("Ptf vs Bmk"), portfolio - benchmark)
+
+
+def test_release_of_closed_widget_keeps_reopened_series(returns_series):
+    """
+    Tests that releasing the key of a closed portfolio widget does not drop
+    the series of the widget the portfolio was reopened in.
+    """
+    cache = DerivedSeriesCache()
+    closed_key, reopened_key = object(), object()
+    DerivedSeries(returns_series, cache, portfolio=closed_key).returns('Portfolio')
+    reopened = DerivedSeries(returns_series, cache, portfolio=reopened_key)
+    returns = reopened.returns('Portfolio')
+
+    DerivedSeries.release(closed_key, cache)
+    assert len(cache) == 2
+    assert reopened.returns('Portfolio') is returns
@@ -0,0 +1,323 @@
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('PyQt6')
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QApplication
+
+from Application.WidgetTemplates.pandas_table_model import PandasModel, integer_format, percent_format
+from Infrastructure.statistics_engine import StatisticsEngine
+
+
+@pytest.fixture(scope='module', autouse=True)
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def reference_display(data, formatters, row, column):
+    """
+    Display string of a cell as rendered by the model before the render cache, straight from the dataframe.
+    """
+    value = data.iloc[row, column]
+
+    if formatters and value is not None:
+        formatter = formatters.get(data.columns[column]) or formatters.get(data.index[row])
+        if formatter is not None:
+            return formatter(value)
+
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+
+    if isinstance(value, float):
+        return f'{value:,.2f}'
+
+    if isinstance(value, (int, np.int64)):
+        return f'{value:,}'
+
+    if value is None:
+        return ''
+
+    return str(value)
+
+
+def displayed(model):
+    return [[model.data(model.index(row, column)) for column in range(model.columnCount())]
+            for row in range(model.rowCount())]
+
+
+def assert_matches_reference(model, formatters=None):
+    strings = displayed(model)
+    data = model.dataframe
+    assert model.rowCount() == len(data.index)
+    assert strings == [[reference_display(data, formatters, row, column) for column in range(len(data.columns))]
+                       for row in range(len(data.index))]
+
+
+def assert_matches_reference_loaded(model):
+    strings = displayed(model)
+    data = model.dataframe
+    assert strings == [[reference_display(data, None, row, column) for column in range(len(data.columns))]
+                       for row in range(model.rowCount())]
+
+
+@pytest.fixture
+def mixed_frame():
+    rows = 23
+    return pd.DataFrame({
+        'Date': pd.date_range('2022-01-03 16:00', periods=rows, freq='D'),
+        'Price': np.linspace(0.5, 12345.678, rows),
+        'Quantity': np.arange(rows, dtype=np.int64) * 1000 - 5000,
+        'Symbol': [f'SYM{row % 5}' for row in range(rows)],
+        'Note': [None if row % 3 else f'note {row}' for row in range(rows)],
+        'Flag': [row % 2 == 0 for row in range(rows)],
+    }).astype({'Note': object})
+
+
+def small_chunk_model(data, formatters=None, fetch_size=None):
+    model = PandasModel(data, formatters, fetch_size)
+    # Small chunks make the edits below cross chunk boundaries
+    model.chunk_size = 4
+    return model
+
+
+def test_mixed_dtypes_match_reference(mixed_frame):
+    """
+    Tests every rendered cell of a mixed dtype table, including missing
+    floats, against rendering straight from the dataframe.
+    """
+    mixed_frame.loc[5, 'Price'] = np.nan
+    model = small_chunk_model(mixed_frame)
+
+    assert_matches_reference(model)
+    assert model.data(model.index(0, 0)) == '2022-01-03 16:00:00'
+    assert model.data(model.index(5, 1)) == 'nan'
+    assert model.data(model.index(22, 2)) == '17,000'
+
+
+def test_statistics_row_formatters_match_reference():
+    """
+    Tests that statistics tables render percentages and durations by row
+    label, placeholders as empty strings, and that a column formatter
+    takes precedence over a row formatter.
+    """
+    formatters = {metric: percent_format for metric in StatisticsEngine.percent_metrics}
+    formatters.update({metric: integer_format for metric in StatisticsEngine.integer_metrics})
+    metrics = StatisticsEngine.risk_metrics + StatisticsEngine.additional_metrics
+    data = pd.DataFrame(np.full((len(metrics), 2), None), columns=StatisticsEngine.columns, index=metrics)
+
+    model = small_chunk_model(data, formatters)
+    assert_matches_reference(model, formatters)
+    assert model.data(model.index(0, 0)) == ''
+
+    rng = np.random.default_rng(5)
+    data = pd.DataFrame(rng.normal(0.0, 2.0, (len(metrics), 2)), columns=StatisticsEngine.columns, index=metrics)
+    data.loc['DD Duration'] = [1234.4, 56.0]
+    model.dataframe = data
+    assert_matches_reference(model, formatters)
+    assert model.data(model.index(metrics.index('DD Duration'), 0)) == '1,234'
+    assert model.data(model.index(metrics.index('VaR'), 1)).endswith(' %')
+
+    formatters['Benchmark'] = lambda value: 'column'
+    model = small_chunk_model(data, formatters)
+    assert_matches_reference(model, formatters)
+    assert model.data(model.index(metrics.index('VaR'), 1)) == 'column'
+
+
+def test_edits_invalidate_rendered_chunks(mixed_frame):
+    """
+    Tests that setData, insertRows, removeRows and sort only leave rendered
+    chunks that still match the dataframe.
+    """
+    model = small_chunk_model(mixed_frame)
+    assert_matches_reference(model)
+
+    model.setData(model.index(6, 1), 42.125)
+    model.setData(model.index(9, 3), 'EDITED')
+    assert model.data(model.index(6, 1)) == '42.12'
+    assert model.data(model.index(9, 3)) == 'EDITED'
+    assert_matches_reference(model)
+
+    new_row = [pd.Timestamp('2023-01-02'), 1.5, 7, 'NEW', None, True]
+    assert model.insertRows(model.rowCount(), 2, new_data=new_row)
+    assert model.rowCount() == 25
+    assert model.data(model.index(24, 3)) == 'NEW'
+    assert_matches_reference(model)
+
+    assert model.removeRows(2, 5)
+    assert model.rowCount() == 20
+    assert_matches_reference(model)
+
+    model.sort(1, Qt.SortOrder.DescendingOrder)
+    assert_matches_reference(model)
+    prices = model.dataframe['Price']
+    assert prices.is_monotonic_increasing
+    assert model.data(model.index(0, 1)) == f'{prices.iloc[0]:,.2f}'
+
+
+def test_large_tables_load_incrementally(mixed_frame):
+    """
+    Tests that only fetch_size rows are loaded at once and that fetchMore
+    loads the rest until canFetchMore turns false.
+    """
+    model = small_chunk_model(mixed_frame, fetch_size=10)
+
+    assert model.rowCount() == 10
+    assert model.canFetchMore()
+
+    model.fetchMore()
+    assert model.rowCount() == 20
+    assert model.canFetchMore()
+
+    model.fetchMore()
+    assert model.rowCount() == 23
+    assert not model.canFetchMore()
+
+    model.fetchMore()
+    assert model.rowCount() == 23
+    assert_matches_reference(model)
+
+    model.dataframe = mixed_frame.iloc[:5].copy()
+    assert model.rowCount() == 5
+    assert not model.canFetchMore()
+
+
+def record_signals(model):
+    signals = []
+    model.rowsInserted.connect(lambda parent, first, last: signals.append(('inserted', first, last)))
+    model.rowsRemoved.connect(lambda parent, first, last: signals.append(('removed', first, last)))
+    model.modelReset.connect(lambda: signals.append(('reset',)))
+    return signals
+
+
+def trade_rows(count, offset=0):
+    return [[pd.Timestamp('2023-01-02') + pd.Timedelta(days=row), 10.0 + row, row + offset, f'T{row + offset}', None,
+             False] for row in range(count)]
+
+
+def test_appended_rows_are_buffered(mixed_frame):
+    """
+    Tests that inserted rows stay in the append buffer until the dataframe
+    or a new cell is read, and are then shown in insertion order.
+    """
+    model = small_chunk_model(mixed_frame)
+    assert_matches_reference(model)
+    signals = record_signals(model)
+
+    for row in trade_rows(3):
+        assert model.insertRows(model.rowCount(), 1, new_data=row)
+    assert model.append_rows(trade_rows(4, offset=3))
+    assert not model.append_rows([])
+
+    assert signals == [('inserted', 23, 23), ('inserted', 24, 24), ('inserted', 25, 25), ('inserted', 26, 29)]
+    assert model.rowCount() == 30
+    assert len(model._data.index) == 23
+
+    assert model.data(model.index(29, 3)) == 'T6'
+    assert not model._pending
+    assert model.data(model.index(23, 0)) == '2023-01-02 00:00:00'
+    assert model.headerData(27, Qt.Orientation.Vertical) == '27'
+    assert_matches_reference(model)
+    assert model.dataframe['Symbol'].tolist()[23:] == [f'T{row}' for row in range(7)]
+
+
+def test_append_to_empty_table(mixed_frame):
+    model = small_chunk_model(mixed_frame.iloc[0:0].copy())
+    assert model.rowCount() == 0
+
+    model.append_rows(trade_rows(2))
+    assert model.rowCount() == 2
+    assert model.data(model.index(1, 2)) == '1'
+    assert_matches_reference(model)
+
+
+def test_remove_rows(mixed_frame):
+    """
+    Tests that a block of adjacent rows is removed with one row removal,
+    scattered rows with a model reset, and that buffered rows can be
+    removed before they are read.
+    """
+    model = small_chunk_model(mixed_frame)
+    assert_matches_reference(model)
+    model.append_rows(trade_rows(3))
+    signals = record_signals(model)
+
+    assert model.remove_rows([0, 3, 10, 24])
+    assert model.remove_rows([7, 5, 6])
+    assert not model.remove_rows([])
+    assert not model.remove_rows([1, 40])
+
+    assert signals == [('reset',), ('removed', 5, 7)]
+    assert model.rowCount() == 19
+    expected = pd.concat([mixed_frame['Symbol'], pd.Series(['T0', 'T1', 'T2'])], ignore_index=True)
+    expected = expected.drop([0, 3, 10, 24]).reset_index(drop=True).drop([5, 6, 7])
+    assert [model.data(model.index(row, 3)) for row in range(model.rowCount())] == expected.tolist()
+    assert_matches_reference(model)
+
+
+def test_partly_loaded_table_appends_and_removes(mixed_frame):
+    """
+    Tests that rows appended to a partly loaded table wait to be fetched,
+    and that removals keep the loaded row count in step.
+    """
+    model = small_chunk_model(mixed_frame, fetch_size=10)
+    signals = record_signals(model)
+
+    assert model.append_rows(trade_rows(4))
+    assert signals == []
+    assert model.rowCount() == 10
+    assert model.canFetchMore()
+
+    assert model.remove_rows([1, 3])
+    assert model.rowCount() == 8
+    assert_matches_reference_loaded(model)
+
+    model.fetchMore()
+    model.fetchMore()
+    assert model.rowCount() == 25
+    assert not model.canFetchMore()
+    assert model.data(model.index(24, 3)) == 'T3'
+    assert_matches_reference(model)
+
+    model.append_rows(trade_rows(1, offset=4))
+    assert model.rowCount() == 26
+    assert model.data(model.index(25, 3)) == 'T4'
+
+
+
+def test_rows_appended_one_at_a_time_only_convert_new_rows(mixed_frame):
+    """
+    Tests that reading each appended row right after its insert appends it
+    to the column arrays without concatenating the dataframe, which is
+    only done once it is read.
+    """
+    model = small_chunk_model(mixed_frame)
+    assert_matches_reference(model)
+    data = model._data
+
+    for row in trade_rows(40):
+        model.insertRows(model.rowCount(), 1, new_data=row)
+        assert model.data(model.index(model.rowCount() - 1, 3)) == row[3]
+        assert model.headerData(model.rowCount() - 1, Qt.Orientation.Vertical) == str(model.rowCount() - 1)
+
+    assert model._data is data
+    assert len(model._columns[0]) >= 63
+    assert_matches_reference(model)
+    assert len(model._data.index) == 63
+
+
+def test_append_changing_column_dtype_renders_column_again(mixed_frame):
+    model = small_chunk_model(mixed_frame)
+    assert model.data(model.index(0, 2)) == '-5,000'
+
+    row = trade_rows(1)[0]
+    row[2] = 0.5
+    model.append_rows([row])
+    assert model.data(model.index(23, 2)) == '0.50'
+    assert model.data(model.index(0, 2)) == '-5,000.00'
+    assert_matches_reference(model)
@@ -1,17 +1,33 @@
 import sys
-from PyQt6.QtWidgets import QApplication
-from Application.main_window import MainWindow
-import qdarktheme
+from Infrastructure.Utilities.startup_timer import StartupTimer
 
 """
 This is the main file of the application. It is responsible for starting the application and loading the main window.
 QuanTango is a personal project by me, and is not intended for commercial use. 
+
+Run with --startup-profile to print the start-up stages and the import times once the main window is shown. Analytics
+and plotting libraries are imported when a portfolio is first loaded or a chart first drawn, not at start-up.
 """
 
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    app.setStyleSheet(qdarktheme.load_stylesheet())
-    app.setQuitOnLastWindowClosed(True)
-    main_window = MainWindow()
-    main_window.show()
+    timer = StartupTimer(enabled='--startup-profile' in sys.argv)
+    sys.argv = [arg for arg in sys.argv if arg != '--startup-profile']
+
+    with timer.stage('imports'):
+        from PyQt6.QtCore import QTimer
+        from PyQt6.QtWidgets import QApplication
+        from Application.main_window import MainWindow
+        import qdarktheme
+
+    with timer.stage('application'):
+        app = QApplication(sys.argv)
+        app.setStyleSheet(qdarktheme.load_stylesheet())
+        app.setQuitOnLastWindowClosed(True)
+
+    with timer.stage('main window'):
+        main_window = MainWindow()
+        main_window.show()
+
+    # Runs once the event loop has painted the main window
+    QTimer.singleShot(0, timer.report)
     sys.exit(app.exec())